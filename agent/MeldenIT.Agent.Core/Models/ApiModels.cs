@@ -75,6 +75,9 @@ public class HeartbeatResponse
 
     [JsonPropertyName("config_updated")]
     public bool ConfigUpdated { get; set; }
+
+    [JsonPropertyName("device_token")]
+    public string? DeviceToken { get; set; }
 }
 
 public class InventorySyncRequest
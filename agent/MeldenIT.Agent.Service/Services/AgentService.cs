@@ -1,3 +1,4 @@
+using System.Net;
 using MeldenIT.Agent.Core.Models;
 using MeldenIT.Agent.Core.Services;
 
@@ -106,6 +107,14 @@ public class AgentService : IAgentService
 
             var response = await _apiClient.SendHeartbeatAsync(heartbeatRequest);
             
+            // The server renews legacy and soon-to-expire tokens through heartbeats
+            if (!string.IsNullOrEmpty(response.DeviceToken))
+            {
+                _logger.LogInformation("Device token renewed");
+                await _configManager.SaveDeviceTokenAsync(response.DeviceToken);
+                _apiClient.SetAuthenticationToken(response.DeviceToken);
+            }
+            
             if (response.ConfigUpdated)
             {
                 _logger.LogInformation("Configuration updated, reloading");
@@ -116,6 +125,12 @@ public class AgentService : IAgentService
             _logger.LogDebug("Heartbeat sent successfully");
             return true;
         }
+        catch (HttpRequestException ex) when (ex.StatusCode == HttpStatusCode.Unauthorized)
+        {
+            // Token expired, was revoked or predates signed tokens: register again for a new one
+            _logger.LogWarning("Device token rejected, re-registering");
+            return await RegisterAsync();
+        }
         catch (Exception ex)
         {
             _logger.LogError(ex, "Error sending heartbeat");
@@ -1,8 +1,11 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import agents, inventory, updates
+from app.api.v1.endpoints import agents, inventory, uploads, updates, jobs, debug
 
 api_router = APIRouter()
 
 api_router.include_router(agents.router, prefix="/agents", tags=["agents"])
+api_router.include_router(jobs.router, prefix="/agents", tags=["jobs"])
 api_router.include_router(inventory.router, prefix="/inventory", tags=["inventory"])
+api_router.include_router(uploads.router, prefix="/inventory/uploads", tags=["inventory"])
 api_router.include_router(updates.router, prefix="/update", tags=["updates"])
+api_router.include_router(debug.router, prefix="/debug", tags=["debug"])
@@ -0,0 +1,162 @@
+import csv
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+
+from app.core import codec
+from app.core.config import settings
+from app.core.ratelimit import rate_limiter
+from app.core.security import verify_device_token
+from app.schemas.agent import BatchItemResult, BatchResponse
+
+logger = logging.getLogger(__name__)
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+
+def body_type(request: Request) -> str:
+    return request.headers.get("content-type", "").split(";")[0].strip()
+
+
+async def iter_lines(request: Request) -> AsyncIterator[bytes]:
+    """Yield the non-blank lines of a streamed body"""
+    # Only the new chunk is split; a line cut by a chunk boundary is
+    # collected in parts and joined once its end arrives
+    partial: List[bytes] = []
+    async for chunk in request.stream():
+        *lines, rest = chunk.split(b"\n")
+        if lines:
+            lines[0] = b"".join(partial) + lines[0]
+            partial.clear()
+            for line in lines:
+                if line.strip():
+                    yield line
+        if rest:
+            partial.append(rest)
+    line = b"".join(partial)
+    if line.strip():
+        yield line
+
+
+async def iter_raw_items(request: Request) -> AsyncIterator[Any]:
+    """Yield decoded items from an array body (JSON or a negotiated binary format), NDJSON or CSV"""
+    content_type = body_type(request)
+
+    if content_type in NDJSON_TYPES:
+        async for line in iter_lines(request):
+            yield _decode_line(line)
+        return
+
+    if content_type in CSV_TYPES:
+        # The header row names the fields; quoted fields may not span lines
+        fields = None
+        async for line in iter_lines(request):
+            row = _decode_csv_line(line)
+            if fields is None:
+                fields = row or []
+            elif row is not None and len(row) == len(fields):
+                yield dict(zip(fields, row))
+            else:
+                yield None
+        return
+
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Body must be a JSON array or NDJSON"
+        )
+    if not isinstance(body, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Body must be a JSON array or NDJSON"
+        )
+    for item in body:
+        yield item
+
+
+def _decode_line(line: bytes) -> Any:
+    try:
+        return codec.loads(line)
+    except ValueError:
+        # Keep going; the bad line becomes a per-item error
+        return None
+
+
+def _decode_csv_line(line: bytes) -> Optional[List[str]]:
+    try:
+        return next(csv.reader([line.decode("utf-8-sig").rstrip("\r")]))
+    except (ValueError, csv.Error):
+        return None
+
+
+async def prepare_batch(request: Request, model: Type[BaseModel],
+                        route: str) -> Tuple[List[Tuple[int, BaseModel]], Dict[int, BatchItemResult]]:
+    """Validate, authenticate and rate-limit each batch item independently.
+
+    Returns the accepted items with their positions and the results for
+    items rejected up front.
+    """
+    accepted: List[Tuple[int, BaseModel]] = []
+    rejected: Dict[int, BatchItemResult] = {}
+
+    index = -1
+    async for raw in iter_raw_items(request):
+        index += 1
+        if index >= settings.BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Batch exceeds {settings.BATCH_MAX_ITEMS} items"
+            )
+
+        agent_guid = raw.get("agent_guid") if isinstance(raw, dict) else None
+        try:
+            item = model.model_validate(raw)
+        except ValidationError as e:
+            rejected[index] = _error(index, agent_guid, f"Invalid item: {e.error_count()} validation errors")
+            continue
+
+        try:
+            site_code = None
+            if settings.DEVICE_AUTH_ENABLED:
+                if not item.device_token:
+                    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Device token required")
+                claims = verify_device_token(item.device_token)
+                if claims.agent_guid != item.agent_guid:
+                    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                        detail="Device token does not belong to this agent")
+                site_code = claims.site_code
+            await rate_limiter.check(route, item.agent_guid, site_code)
+        except HTTPException as e:
+            rejected[index] = _error(index, item.agent_guid, e.detail)
+            continue
+
+        accepted.append((index, item))
+
+    return accepted, rejected
+
+
+def build_batch_response(processed: List[BatchItemResult],
+                         rejected: Dict[int, BatchItemResult]) -> BatchResponse:
+    """Merge service results with up-front rejections in request order"""
+    results = sorted(processed + list(rejected.values()), key=lambda result: result.index)
+    succeeded = sum(1 for result in results if result.status == "success")
+    return BatchResponse(
+        processed=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+
+def _error(index: int, agent_guid: Any, message: str) -> BatchItemResult:
+    return BatchItemResult(
+        index=index,
+        agent_guid=agent_guid if isinstance(agent_guid, str) else None,
+        status="error",
+        message=message
+    )
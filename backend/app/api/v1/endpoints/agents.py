@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from typing import Optional
+from app.api.v1.batch import CSV_TYPES, NDJSON_TYPES, body_type, iter_raw_items, prepare_batch, build_batch_response
+from app.core.config import settings
+from app.core.codec import CodecRoute
+from app.core.database import get_db, get_read_db
+from app.core.ratelimit import rate_limiter
+from app.core.security import (
+    DeviceClaims, bearer_scheme, get_device_claims, require_device_claims, ensure_agent, require_admin
+)
+from app.services.agent_import import AgentImport
 from app.services.agent_service import AgentService
 from app.schemas.agent import (
     AgentRegistrationRequest, AgentRegistrationResponse,
     HeartbeatRequest, HeartbeatResponse,
-    AgentConfigResponse
+    AgentConfigResponse, DeviceTokenResponse,
+    HeartbeatBatchItem, BatchResponse
 )
 
-router = APIRouter()
+router = APIRouter(route_class=CodecRoute)
 
 @router.post("/register", response_model=AgentRegistrationResponse)
 async def register_agent(
@@ -19,20 +31,73 @@ async def register_agent(
     service = AgentService(db)
     return await service.register_agent(request)
 
+@router.post("/import", dependencies=[Depends(require_admin)])
+async def import_agents(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Pre-register agents from CSV or NDJSON rows shaped like a registration request.
+
+    Streams back an NDJSON result per row, with the device token issued,
+    as each batch commits, and ends with a summary line.
+    """
+    if body_type(request) not in CSV_TYPES + NDJSON_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson"
+        )
+    # The response listens for disconnects on the channel the body arrives
+    # on, so the rows are read before results start streaming
+    await request.body()
+    agent_import = AgentImport(AgentService(db), settings.AGENT_IMPORT_BATCH_SIZE)
+    return StreamingResponse(agent_import.run(iter_raw_items(request)), media_type="application/x-ndjson")
+
 @router.post("/heartbeat", response_model=HeartbeatResponse)
 async def send_heartbeat(
     request: HeartbeatRequest,
+    db: AsyncSession = Depends(get_db),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+):
+    """Send agent heartbeat; the response carries a new device token when one is due"""
+    ensure_agent(claims, request.agent_guid)
+    await rate_limiter.check("heartbeat", request.agent_guid, claims.site_code if claims else None)
+    service = AgentService(db)
+    return await service.send_heartbeat(request, credentials.credentials if credentials else None)
+
+@router.post("/heartbeat:batch", response_model=BatchResponse)
+async def send_heartbeat_batch(
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    """Send agent heartbeat"""
+    """Send heartbeats for many agents (JSON array or NDJSON) from a site relay"""
+    accepted, rejected = await prepare_batch(request, HeartbeatBatchItem, "heartbeat")
+    service = AgentService(db)
+    processed = await service.send_heartbeats_batch(accepted)
+    return build_batch_response(processed, rejected)
+
+@router.post("/token/rotate", response_model=DeviceTokenResponse)
+async def rotate_device_token(
+    db: AsyncSession = Depends(get_db),
+    claims: DeviceClaims = Depends(require_device_claims)
+):
+    """Rotate the calling agent's device token"""
     service = AgentService(db)
-    return await service.send_heartbeat(request)
+    response = await service.rotate_device_token(claims)
+    if response is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+    return response
 
 @router.get("/{agent_guid}/config", response_model=AgentConfigResponse)
 async def get_agent_config(
     agent_guid: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
 ):
     """Get agent configuration"""
+    ensure_agent(claims, agent_guid)
     service = AgentService(db)
     return await service.get_agent_config(agent_guid)
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse
+from typing import Literal
+from app.core.codec import CodecRoute
+from app.core.config import settings
+from app.core.profiler import profiler, render_collapsed, render_flamegraph
+from app.core.security import require_admin
+
+router = APIRouter(route_class=CodecRoute)
+
+def require_profiling() -> None:
+    """Hide the profiler entirely unless it is switched on"""
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+
+def render_profile(counts, format: str) -> Response:
+    if format == "svg":
+        return Response(render_flamegraph(counts), media_type="image/svg+xml")
+    return PlainTextResponse(render_collapsed(counts))
+
+@router.get("/profile", dependencies=[Depends(require_profiling), Depends(require_admin)])
+async def profile_process(
+    seconds: float = Query(10, gt=0, description="Sampling duration, capped by PROFILING_MAX_SECONDS"),
+    format: Literal["collapsed", "svg"] = "collapsed"
+):
+    """Sample all threads for a while and return collapsed stacks or a flame graph"""
+    profile_id = await profiler.profile(seconds)
+    if profile_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running"
+        )
+    return render_profile(profiler.get(profile_id), format)
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiling), Depends(require_admin)])
+async def get_profile(profile_id: str, format: Literal["collapsed", "svg"] = "collapsed"):
+    """Fetch a per-request profile by the id from X-Debug-Profile-Id"""
+    counts = profiler.get(profile_id)
+    if counts is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return render_profile(counts, format)
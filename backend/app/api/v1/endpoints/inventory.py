@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.api.v1.batch import prepare_batch, build_batch_response
+from app.core.codec import CodecRoute
 from app.core.database import get_db
+from app.core.ratelimit import rate_limiter
+from app.core.security import DeviceClaims, get_device_claims, ensure_agent
 from app.services.agent_service import AgentService
 from app.schemas.agent import (
-    InventorySyncRequest, InventorySyncResponse
+    InventorySyncRequest, InventorySyncResponse,
+    InventoryBatchItem, BatchResponse,
+    SectionHashes, SectionNegotiationResponse, SectionUploadRequest, SectionUploadResponse
 )
 
-router = APIRouter()
+router = APIRouter(route_class=CodecRoute)
 
 @router.post("/delta", response_model=InventorySyncResponse)
 async def sync_delta_inventory(
     request: InventorySyncRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
     """Sync delta inventory changes"""
     if request.sync_type != "delta":
@@ -20,13 +29,29 @@ async def sync_delta_inventory(
             detail="Sync type must be 'delta'"
         )
     
+    ensure_agent(claims, request.agent_guid)
+    await rate_limiter.check("inventory", request.agent_guid, claims.site_code if claims else None)
+    
+    service = AgentService(db)
+    return await service.sync_inventory(request, idempotency_key)
+
+@router.post("/delta:batch", response_model=BatchResponse)
+async def sync_delta_inventory_batch(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """Sync delta inventories for many agents (JSON array or NDJSON) from a site relay"""
+    accepted, rejected = await prepare_batch(request, InventoryBatchItem, "inventory")
     service = AgentService(db)
-    return await service.sync_inventory(request)
+    processed = await service.sync_inventory_batch(accepted)
+    return build_batch_response(processed, rejected)
 
 @router.post("/full", response_model=InventorySyncResponse)
 async def sync_full_inventory(
     request: InventorySyncRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
     """Sync full inventory"""
     if request.sync_type != "full":
@@ -35,5 +60,35 @@ async def sync_full_inventory(
             detail="Sync type must be 'full'"
         )
     
+    ensure_agent(claims, request.agent_guid)
+    await rate_limiter.check("inventory", request.agent_guid, claims.site_code if claims else None)
+    
+    service = AgentService(db)
+    return await service.sync_inventory(request, idempotency_key)
+
+@router.post("/sections/negotiate", response_model=SectionNegotiationResponse)
+async def negotiate_inventory_sections(
+    request: SectionHashes,
+    db: AsyncSession = Depends(get_db),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
+):
+    """Compare section hashes with the stored inventory; returns the sections to upload"""
+    ensure_agent(claims, request.agent_guid)
+    # Each section sync starts here, so this is where it is rate limited
+    await rate_limiter.check("inventory", request.agent_guid, claims.site_code if claims else None)
+    
+    service = AgentService(db)
+    return await service.negotiate_sections(request)
+
+@router.post("/sections", response_model=SectionUploadResponse)
+async def upload_inventory_sections(
+    request: SectionUploadRequest,
+    db: AsyncSession = Depends(get_db),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Upload the sections requested by /sections/negotiate"""
+    ensure_agent(claims, request.agent_guid)
+    
     service = AgentService(db)
-    return await service.sync_inventory(request)
+    return await service.sync_sections(request, idempotency_key)
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.codec import CodecRoute
+from app.core.config import settings
+from app.core.database import get_db, AsyncSessionLocal
+from app.core.logging import bind_agent_guid
+from app.core.push import PushConnection, push_hub
+from app.core.security import (
+    DeviceClaims, require_device_claims, require_admin, verify_device_token
+)
+from app.services.job_service import JobService, job_message
+from app.schemas.agent import (
+    JobCreateRequest, JobInfo, JobStatusUpdate, JobPollResponse
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=CodecRoute)
+
+@router.post("/{agent_guid}/jobs", response_model=JobInfo, dependencies=[Depends(require_admin)])
+async def create_job(
+    agent_guid: str,
+    request: JobCreateRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Assign a job to an agent and push it immediately"""
+    service = JobService(db)
+    job = await service.create_job(agent_guid, request)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Agent not found"
+        )
+    return job
+
+@router.get("/jobs/poll", response_model=JobPollResponse)
+async def poll_jobs(
+    wait: int = Query(0, ge=0, description="Seconds to hold the request open when no job is pending"),
+    db: AsyncSession = Depends(get_db),
+    claims: DeviceClaims = Depends(require_device_claims)
+):
+    """Long-poll for jobs assigned to the calling agent"""
+    service = JobService(db)
+    jobs = await service.get_pending_jobs(claims.agent_guid)
+    if jobs or not wait:
+        await service.mark_delivered(claims.agent_guid, [job.id for job in jobs])
+        return JobPollResponse(jobs=jobs)
+
+    # Hand the connection back to the pool while we wait
+    await db.close()
+
+    future = push_hub.wait(claims.agent_guid)
+    try:
+        message = await asyncio.wait_for(future, min(wait, settings.PUSH_LONG_POLL_MAX_SECONDS))
+    except asyncio.TimeoutError:
+        return JobPollResponse()
+    finally:
+        push_hub.cancel_wait(claims.agent_guid, future)
+
+    await service.mark_delivered(claims.agent_guid, [message["job"]["id"]])
+    return JobPollResponse(jobs=[message["job"]])
+
+@router.post("/jobs/{job_id}/status", response_model=JobInfo)
+async def update_job_status(
+    job_id: int,
+    request: JobStatusUpdate,
+    db: AsyncSession = Depends(get_db),
+    claims: DeviceClaims = Depends(require_device_claims)
+):
+    """Report job progress from the agent"""
+    service = JobService(db)
+    job = await service.update_job_status(claims.agent_guid, job_id, request)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+@router.websocket("/channel")
+async def agent_channel(websocket: WebSocket, token: Optional[str] = None):
+    """Long-lived push channel for jobs and config changes.
+
+    The device token is taken from the Authorization header or the
+    `token` query parameter. Clients may send
+    {"type": "job_status", "job_id": ..., "status": ...} frames back.
+    """
+    authorization = websocket.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    try:
+        claims = verify_device_token(token or "")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    agent_guid = claims.agent_guid
+    bind_agent_guid(agent_guid)
+
+    async def mark_delivered(message: dict) -> None:
+        if message.get("type") == "job":
+            async with AsyncSessionLocal() as db:
+                await JobService(db).mark_delivered(agent_guid, [message["job"]["id"]])
+
+    async def send_jobs() -> None:
+        timeout = settings.PUSH_SEND_TIMEOUT_SECONDS
+        try:
+            # Catch up first; jobs pushed meanwhile wait in the outbox
+            async with AsyncSessionLocal() as db:
+                service = JobService(db)
+                jobs = await service.get_pending_jobs(agent_guid)
+                for job in jobs:
+                    await asyncio.wait_for(websocket.send_json(job_message(job)), timeout)
+                await service.mark_delivered(agent_guid, [job.id for job in jobs])
+            await connection.send_outbox(mark_delivered, timeout)
+        except Exception as e:
+            # Ends the receive loop below too; pending jobs are resent on reconnect
+            logger.warning("Dropping push channel for agent %s: %s", agent_guid, e)
+            try:
+                await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            except Exception:
+                pass
+
+    # Register before the sender catches up so jobs created in between are not missed
+    connection = PushConnection(websocket, settings.PUSH_QUEUE_SIZE)
+    previous = push_hub.attach(agent_guid, connection)
+    if previous is not None:
+        await previous.websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+    sender = asyncio.create_task(send_jobs())
+
+    try:
+        while True:
+            frame = await websocket.receive_json()
+            if not isinstance(frame, dict) or frame.get("type") != "job_status":
+                continue
+            try:
+                update = JobStatusUpdate.model_validate(frame)
+                job_id = int(frame["job_id"])
+            except (ValidationError, KeyError, TypeError, ValueError):
+                await connection.outbox.put({"type": "error", "message": "Invalid job_status frame"})
+                continue
+            async with AsyncSessionLocal() as db:
+                await JobService(db).update_job_status(agent_guid, job_id, update)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        push_hub.detach(agent_guid, connection)
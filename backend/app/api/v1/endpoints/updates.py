@@ -1,18 +1,63 @@
-from fastapi import APIRouter, Depends
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from typing import Optional
+from app.core.codec import CodecRoute
+from app.core.config import settings
+from app.core.database import get_read_db
+from app.core.files import RangeFileResponse
+from app.core.security import DeviceClaims, get_device_claims, ensure_agent
 from app.services.agent_service import AgentService
+from app.services.update_store import update_store
 from app.schemas.agent import (
     UpdateCheckRequest, UpdateCheckResponse
 )
 
-router = APIRouter()
+router = APIRouter(route_class=CodecRoute)
 
 @router.post("/check", response_model=UpdateCheckResponse)
 async def check_for_updates(
     request: UpdateCheckRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
 ):
     """Check for agent updates"""
+    ensure_agent(claims, request.agent_guid)
     service = AgentService(db)
-    return await service.check_for_updates(request)
+    return await service.check_for_updates(request, claims.site_code if claims else None)
+
+@router.api_route("/download/{name:path}", methods=["GET", "HEAD"])
+async def download_update(
+    name: str,
+    request: Request,
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
+):
+    """Download an update package; supports Range/If-Range for resuming"""
+    await run_in_threadpool(update_store.refresh_if_stale)
+    artifact = update_store.get(name)
+    if artifact is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Update package not found"
+        )
+    
+    etag = f'"{artifact.sha256}"'
+    
+    # Let nginx stream the file with sendfile (it handles Range itself)
+    if settings.UPDATE_ACCEL_REDIRECT_PREFIX:
+        return Response(headers={
+            "X-Accel-Redirect": f"{settings.UPDATE_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{artifact.name}",
+            "ETag": etag,
+            "Content-Type": "application/octet-stream"
+        })
+    
+    return RangeFileResponse(
+        artifact.path,
+        size=artifact.size,
+        etag=etag,
+        range_header=request.headers.get("range"),
+        if_range=request.headers.get("if-range"),
+        filename=os.path.basename(artifact.path),
+        method=request.method
+    )
@@ -0,0 +1,146 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.codec import CodecRoute
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.ratelimit import rate_limiter
+from app.core.security import DeviceClaims, get_device_claims, ensure_agent
+from app.services.agent_service import AgentService
+from app.services.upload_sessions import UploadError, UploadSession, UploadTooLarge, upload_sessions
+from app.schemas.agent import (
+    InventorySyncRequest, InventorySyncResponse,
+    UploadSessionRequest, UploadSessionStatus
+)
+
+router = APIRouter(route_class=CodecRoute)
+
+def _status(session: UploadSession) -> UploadSessionStatus:
+    return UploadSessionStatus(
+        session_id=session.session_id,
+        offset=session.received,
+        total_size=session.total_size,
+        chunk_size=settings.UPLOAD_CHUNK_BYTES,
+        committed=session.committed,
+        expires_at=datetime.utcfromtimestamp(session.expires_at)
+    )
+
+async def _get_session(session_id: str, claims: Optional[DeviceClaims]) -> UploadSession:
+    session = await run_in_threadpool(upload_sessions.get, session_id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found or expired"
+        )
+    ensure_agent(claims, session.agent_guid)
+    return session
+
+async def _discard(session: UploadSession, status_code: int, detail: str) -> HTTPException:
+    await run_in_threadpool(upload_sessions.delete, session.session_id)
+    return HTTPException(status_code=status_code, detail=detail)
+
+@router.post("", response_model=UploadSessionStatus, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    request: UploadSessionRequest,
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
+):
+    """Start a resumable inventory upload"""
+    if request.sync_type not in ("full", "delta"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Sync type must be 'full' or 'delta'"
+        )
+    if request.total_size > settings.UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Uploads are limited to {settings.UPLOAD_MAX_BYTES} bytes"
+        )
+
+    ensure_agent(claims, request.agent_guid)
+    await rate_limiter.check("inventory", request.agent_guid, claims.site_code if claims else None)
+
+    session = await run_in_threadpool(
+        upload_sessions.create, request.agent_guid, request.sync_type, request.total_size, request.sha256
+    )
+    return _status(session)
+
+@router.get("/{session_id}", response_model=UploadSessionStatus)
+async def get_upload_session(
+    session_id: str,
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
+):
+    """Where to resume an interrupted upload"""
+    return _status(await _get_session(session_id, claims))
+
+@router.put("/{session_id}", response_model=UploadSessionStatus)
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Position of the chunk in the upload"),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
+):
+    """Write a chunk of the inventory JSON (raw body) at an offset"""
+    session = await _get_session(session_id, claims)
+    if session.committed:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload already committed")
+
+    try:
+        session.received = await upload_sessions.write_chunk(session, offset, request.stream())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return _status(session)
+
+@router.post("/{session_id}/commit", response_model=InventorySyncResponse)
+async def commit_upload(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
+):
+    """Ingest a complete upload as a full or delta inventory sync"""
+    session = await _get_session(session_id, claims)
+    if session.committed:
+        return session.response
+    if session.received != session.total_size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload incomplete: {session.received} of {session.total_size} bytes received"
+        )
+
+    try:
+        inventory, digest = await upload_sessions.read_inventory(session)
+    except ValueError:
+        raise await _discard(session, status.HTTP_400_BAD_REQUEST, "Upload is not a JSON object")
+    if session.sha256 and digest != session.sha256:
+        raise await _discard(session, status.HTTP_400_BAD_REQUEST, "Upload does not match its sha256")
+
+    try:
+        sync_request = InventorySyncRequest(
+            agent_guid=session.agent_guid,
+            sync_type=session.sync_type,
+            inventory=inventory
+        )
+    except ValidationError as e:
+        await run_in_threadpool(upload_sessions.delete, session.session_id)
+        raise RequestValidationError(e.errors())
+
+    service = AgentService(db)
+    response = await service.sync_inventory(sync_request, f"upload:{session.session_id}")
+    if response.status == "success":
+        await run_in_threadpool(upload_sessions.complete, session, response.model_dump(mode="json"))
+    return response
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    session_id: str,
+    claims: Optional[DeviceClaims] = Depends(get_device_claims)
+):
+    """Abandon an upload and delete what was received"""
+    session = await _get_session(session_id, claims)
+    await run_in_threadpool(upload_sessions.delete, session.session_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionClass:
+    """Concurrency slot pool for one class of requests"""
+
+    def __init__(self, name: str, priority: int, max_concurrency: int,
+                 max_queue: int, queue_timeout: float):
+        self.name = name
+        self.priority = priority  # lower value = higher priority
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.queue_wait_seconds = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "priority": self.priority,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+            "queue_wait_seconds": round(self.queue_wait_seconds, 6),
+        }
+
+
+class AdmissionController:
+    """Admits requests per class, shedding lower priorities first under load"""
+
+    def __init__(self, classes: List[AdmissionClass], rules: List[Tuple[str, str]]):
+        self.classes = {cls.name: cls for cls in classes}
+        # Longest prefix wins so specific routes can override broad ones
+        self._rules = sorted(
+            ((prefix, self.classes[name]) for prefix, name in rules),
+            key=lambda rule: len(rule[0]),
+            reverse=True
+        )
+        self._by_priority = sorted(classes, key=lambda cls: cls.priority)
+
+    def classify(self, path: str) -> Optional[AdmissionClass]:
+        """Return the admission class for a request path, if any"""
+        for prefix, cls in self._rules:
+            if path.startswith(prefix):
+                return cls
+        return None
+
+    def _higher_priority_waiting(self, cls: AdmissionClass) -> bool:
+        for other in self._by_priority:
+            if other.priority >= cls.priority:
+                return False
+            if other._waiters:
+                return True
+        return False
+
+    async def acquire(self, cls: AdmissionClass) -> bool:
+        """Take a slot for the class, queueing up to its timeout"""
+        # A higher priority class is already queueing for the shared pool,
+        # so don't add more pressure from below
+        if self._higher_priority_waiting(cls):
+            cls.shed += 1
+            return False
+
+        if cls.in_flight < cls.max_concurrency and not cls._waiters:
+            cls.in_flight += 1
+            cls.admitted += 1
+            return True
+
+        if len(cls._waiters) >= cls.max_queue:
+            cls.shed += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        cls._waiters.append(future)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, cls.queue_timeout)
+        except asyncio.TimeoutError:
+            cls.timed_out += 1
+            cls.shed += 1
+            return False
+        except asyncio.CancelledError:
+            # Slot may have been handed over just before the client went away
+            if future.done() and not future.cancelled():
+                self.release(cls)
+            raise
+        finally:
+            cls.queue_wait_seconds += time.monotonic() - started
+            try:
+                cls._waiters.remove(future)
+            except ValueError:
+                pass
+
+        # Slot was handed over by release(); in_flight already accounts for it
+        cls.admitted += 1
+        return True
+
+    def release(self, cls: AdmissionClass) -> None:
+        """Return a slot, handing it directly to the next waiter if any"""
+        while cls._waiters:
+            waiter = cls._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        cls.in_flight -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {cls.name: cls.snapshot() for cls in self._by_priority}
+
+
+def build_admission_controller() -> AdmissionController:
+    """Create the controller from settings"""
+    classes = [
+        AdmissionClass(
+            "heartbeat", 0,
+            settings.ADMISSION_HEARTBEAT_CONCURRENCY,
+            settings.ADMISSION_HEARTBEAT_MAX_QUEUE,
+            settings.ADMISSION_HEARTBEAT_QUEUE_TIMEOUT
+        ),
+        AdmissionClass(
+            "delta", 1,
+            settings.ADMISSION_DELTA_CONCURRENCY,
+            settings.ADMISSION_DELTA_MAX_QUEUE,
+            settings.ADMISSION_DELTA_QUEUE_TIMEOUT
+        ),
+        AdmissionClass(
+            "bulk", 2,
+            settings.ADMISSION_BULK_CONCURRENCY,
+            settings.ADMISSION_BULK_MAX_QUEUE,
+            settings.ADMISSION_BULK_QUEUE_TIMEOUT
+        ),
+    ]
+    rules = [
+        ("/api/v1/agents/heartbeat", "heartbeat"),
+        ("/api/v1/inventory/delta", "delta"),
+        # Batches carry many agents' work; longer prefixes win, so they
+        # do not ride on the priority of the single-item routes
+        ("/api/v1/agents/heartbeat:batch", "bulk"),
+        ("/api/v1/inventory/delta:batch", "bulk"),
+        ("/api/v1/inventory/full", "bulk"),
+        ("/api/v1/agents/import", "bulk"),
+    ]
+    return AdmissionController(classes, rules)
+
+
+admission_controller = build_admission_controller()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that rejects overflow with 429 and Retry-After"""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cls = self.controller.classify(scope["path"])
+        if cls is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(cls):
+            logger.warning("Shedding %s request to %s", cls.name, scope["path"])
+            response = JSONResponse(
+                {"detail": "Server busy, retry later"},
+                status_code=429,
+                headers={"Retry-After": str(cls.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(cls)
@@ -0,0 +1,201 @@
+"""Codecs for request bodies, responses and JSON columns.
+
+JSON uses orjson when it is installed and FAST_JSON_ENABLED is set, and
+the standard library otherwise; both paths produce the same JSON.
+
+API routes also negotiate MessagePack and CBOR: a body sent as
+application/msgpack or application/cbor is decoded into the same
+structure FastAPI validates for JSON, and an Accept header preferring
+one of them gets the response in that format. Each binary format is
+available when its library (msgpack, cbor2) is installed.
+"""
+import json
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Union
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+FAST_JSON = orjson is not None and settings.FAST_JSON_ENABLED
+
+if FAST_JSON:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps_bytes(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        return orjson.dumps(obj, default=default, option=_OPTIONS)
+
+    DefaultJSONResponse = ORJSONResponse
+else:
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps_bytes(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        return json.dumps(obj, default=default).encode()
+
+    DefaultJSONResponse = JSONResponse
+
+
+def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+    return dumps_bytes(obj, default).decode()
+
+
+def canonical_dumps(obj: Any) -> bytes:
+    """Canonical JSON, the input to content hashes; the same bytes with or without orjson.
+
+    Compact UTF-8 with keys sorted by code point. Integers are plain
+    decimal digits. Floats use the shortest form that round-trips, with a
+    signed two-digit minimum exponent outside 1e-4 <= |x| < 1e16: 0.5,
+    100.0, 1e+16, 1e-07. NaN and infinities are rejected.
+    """
+    return json.dumps(
+        obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, allow_nan=False
+    ).encode()
+
+
+@dataclass(frozen=True)
+class WireFormat:
+    name: str
+    media_type: str
+    loads: Callable[[bytes], Any]
+    dumps: Callable[[Any], bytes]
+
+
+JSON_FORMAT = WireFormat("json", "application/json", loads, dumps_bytes)
+
+# Media types agents may use for each binary format
+BINARY_MEDIA_TYPES = {
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/cbor": "cbor",
+}
+
+
+def _binary_formats() -> Dict[str, WireFormat]:
+    formats = {}
+    if not settings.BINARY_WIRE_FORMATS_ENABLED:
+        return formats
+    if msgpack is not None:
+        formats["msgpack"] = WireFormat(
+            "msgpack", "application/msgpack",
+            lambda data: msgpack.unpackb(data, raw=False),
+            lambda obj: msgpack.packb(obj, use_bin_type=True)
+        )
+    if cbor2 is not None:
+        formats["cbor"] = WireFormat("cbor", "application/cbor", cbor2.loads, cbor2.dumps)
+    return formats
+
+
+BINARY_FORMATS = _binary_formats()
+
+_response_format: ContextVar[Optional[WireFormat]] = ContextVar("response_format", default=None)
+
+
+def request_format(content_type: Optional[str]) -> WireFormat:
+    """Format of a request body; 415 for a binary format that is not available"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    name = BINARY_MEDIA_TYPES.get(media_type)
+    if name is None:
+        return JSON_FORMAT
+    if name not in BINARY_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"{media_type} is not supported by this server"
+        )
+    return BINARY_FORMATS[name]
+
+
+def response_format(accept: Optional[str]) -> WireFormat:
+    """Most preferred available format in an Accept header; JSON wins ties and */*"""
+    best, best_q = JSON_FORMAT, -1.0
+    for part in (accept or "").split(","):
+        media_type, *params = part.split(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in ("application/json", "application/*", "*/*"):
+            candidate = JSON_FORMAT
+        else:
+            candidate = BINARY_FORMATS.get(BINARY_MEDIA_TYPES.get(media_type, ""))
+        if candidate is not None and q > 0 and (q > best_q or (q == best_q and candidate is JSON_FORMAT)):
+            best, best_q = candidate, q
+    return best
+
+
+class NegotiatedResponse(DefaultJSONResponse):
+    """Default response class: JSON, or the binary format the route negotiated"""
+
+    def render(self, content: Any) -> bytes:
+        wire = _response_format.get()
+        if wire is None:
+            return super().render(content)
+        self.media_type = wire.media_type
+        return wire.dumps(content)
+
+
+class CodecRequest(Request):
+    """Request whose .json() decodes the body with its wire format; FastAPI parses bodies through it"""
+
+    wire_format = JSON_FORMAT
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = self.wire_format.loads(await self.body())
+        return self._json
+
+
+class CodecRoute(APIRoute):
+    """Route class that decodes bodies with the codec and negotiates the response format"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            scope = request.scope
+            wire = request_format(request.headers.get("content-type"))
+            if wire is not JSON_FORMAT:
+                # FastAPI only reads bodies it considers JSON
+                headers = [(key, value) for key, value in scope["headers"] if key != b"content-type"]
+                scope = {**scope, "headers": headers + [(b"content-type", b"application/json")]}
+            codec_request = CodecRequest(scope, request.receive)
+            codec_request.wire_format = wire
+
+            negotiated = response_format(request.headers.get("accept"))
+            token = _response_format.set(None if negotiated is JSON_FORMAT else negotiated)
+            try:
+                response = await handler(codec_request)
+            finally:
+                _response_format.reset(token)
+            if BINARY_FORMATS:
+                response.headers.append("Vary", "Accept")
+            return response
+
+        return route_handler
@@ -1,15 +1,98 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from fastapi import Depends
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from typing import Any, Dict, List, Optional
 from app.core.config import settings
+from app.core import codec
+from app.core.metrics import CollectedMetric, db_pool_timeouts, db_pool_wait, registry
+from app.core.querystats import instrument_engine
+from app.core.tracing import trace_engine
+import asyncio
+import itertools
 import logging
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
+class TimedPool:
+    """Pool mixin that records how long checkouts wait for a connection"""
+
+    label = "primary"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            db_pool_timeouts.labels(self.label).inc()
+            raise
+        finally:
+            db_pool_wait.labels(self.label).observe(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.label = self.label
+        return pool
+
+class TimedQueuePool(TimedPool, AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection"""
+
+class TimedNullPool(TimedPool, NullPool):
+    """No pooling, for PgBouncer; the wait is the time to connect"""
+
+def _statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+def engine_options(pool_size: int, max_overflow: int) -> Dict[str, Any]:
+    """Pool and asyncpg arguments for create_async_engine from the DATABASE_* settings"""
+    if settings.DATABASE_PGBOUNCER:
+        # In transaction pooling each transaction may run on a different
+        # server connection: PgBouncer does the pooling, prepared statements
+        # must not outlive their transaction, and startup parameters such as
+        # statement_timeout are refused, so the timeout is enforced client side
+        connect_args: Dict[str, Any] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": _statement_name,
+        }
+        if settings.DATABASE_STATEMENT_TIMEOUT_MS:
+            connect_args["command_timeout"] = settings.DATABASE_STATEMENT_TIMEOUT_MS / 1000
+        return {"poolclass": TimedNullPool, "connect_args": connect_args}
+
+    connect_args = {"prepared_statement_cache_size": settings.DATABASE_PREPARED_STATEMENT_CACHE_SIZE}
+    if settings.DATABASE_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.DATABASE_STATEMENT_TIMEOUT_MS)}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+def build_engine(url: str, label: str, pool_size: int, max_overflow: int) -> AsyncEngine:
+    """Async engine with its own pool, instrumented under `label`"""
+    engine = create_async_engine(
+        url.replace("postgresql://", "postgresql+asyncpg://"),
+        echo=False,
+        future=True,
+        json_serializer=codec.dumps,
+        json_deserializer=codec.loads,
+        **engine_options(pool_size, max_overflow)
+    )
+    engine.sync_engine.pool.label = label
+    instrument_engine(engine.sync_engine)
+    trace_engine(engine.sync_engine)
+    return engine
+
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
-    echo=False,
-    future=True
+engine = build_engine(
+    settings.DATABASE_URL, "primary", settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW
 )
 
 # Create async session factory
@@ -19,6 +102,128 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Seconds the replica is behind; 0 when it is not a standby or has replayed
+# everything it received (an idle primary would otherwise look like growing
+# lag). NULL when no WAL receiver is streaming: a disconnected standby has
+# also replayed all it received. Reading the receiver status needs
+# pg_read_all_stats; without it the replica never takes reads.
+REPLICATION_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class Replica:
+    """A read replica, its session factory and its last measured lag"""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = build_engine(
+            url, name, settings.DATABASE_REPLICA_POOL_SIZE, settings.DATABASE_REPLICA_MAX_OVERFLOW
+        )
+        self.sessionmaker = async_sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.lag: Optional[float] = None  # None until measured, or when unreachable
+
+    @property
+    def healthy(self) -> bool:
+        return self.lag is not None and self.lag <= settings.DATABASE_REPLICA_MAX_LAG_SECONDS
+
+    async def measure_lag(self) -> Optional[float]:
+        """Seconds behind the primary; None when not streaming from it"""
+        async with self.engine.connect() as conn:
+            lag = (await conn.execute(REPLICATION_LAG_SQL)).scalar()
+        return None if lag is None else float(lag)
+
+class ReadRouter:
+    """Round-robins read sessions across replicas that are within the lag limit.
+
+    A replica takes reads only after a lag check has passed, so reads stay
+    on the primary until the first check and whenever every replica is
+    down or too far behind.
+    """
+
+    def __init__(self, replicas: List[Replica]):
+        self.replicas = replicas
+        self.routed: Dict[str, int] = {"primary": 0}
+        self._turn = itertools.count()
+
+    def pick(self) -> Optional[Replica]:
+        """Replica for the next read session, or None for the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        replica = healthy[next(self._turn) % len(healthy)] if healthy else None
+        name = replica.name if replica else "primary"
+        self.routed[name] = self.routed.get(name, 0) + 1
+        return replica
+
+    async def check(self) -> None:
+        """Measure the lag of every replica"""
+        for replica in self.replicas:
+            was_healthy = replica.healthy
+            try:
+                replica.lag = await asyncio.wait_for(
+                    replica.measure_lag(), settings.DATABASE_REPLICA_CHECK_SECONDS
+                )
+                if replica.lag is None:
+                    logger.warning("Replica %s is not streaming WAL from the primary", replica.name)
+            except Exception as e:
+                replica.lag = None
+                logger.warning("Replica %s is unreachable: %s", replica.name, e)
+            if was_healthy and not replica.healthy and replica.lag is not None:
+                logger.warning("Replica %s is %.1fs behind; reading from the primary", replica.name, replica.lag)
+            elif replica.healthy and not was_healthy:
+                logger.info("Replica %s is taking reads (%.1fs behind)", replica.name, replica.lag)
+
+    async def run(self, interval: float) -> None:
+        """Check periodically until cancelled"""
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "replicas": {
+                replica.name: {"lag_seconds": replica.lag, "healthy": replica.healthy}
+                for replica in self.replicas
+            },
+            "routed": dict(self.routed),
+        }
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+read_router = ReadRouter([
+    Replica(f"replica{number}", url) for number, url in enumerate(settings.DATABASE_REPLICA_URLS, 1)
+])
+
+def pool_metrics():
+    """Point-in-time connection pool and replica gauges for /metrics"""
+    pools = [("primary", engine)] + [(replica.name, replica.engine) for replica in read_router.replicas]
+    # PgBouncer mode keeps no pool here
+    pools = [(name, pool_engine.sync_engine.pool) for name, pool_engine in pools
+             if isinstance(pool_engine.sync_engine.pool, QueuePool)]
+    yield CollectedMetric("meldenit_db_pool_size", "gauge", "Configured pool size",
+                          [({"pool": name}, pool.size()) for name, pool in pools])
+    yield CollectedMetric("meldenit_db_pool_checked_out", "gauge", "Connections currently checked out",
+                          [({"pool": name}, pool.checkedout()) for name, pool in pools])
+    yield CollectedMetric("meldenit_db_pool_checked_in", "gauge", "Idle connections in the pool",
+                          [({"pool": name}, pool.checkedin()) for name, pool in pools])
+    yield CollectedMetric("meldenit_db_pool_overflow", "gauge", "Connections opened beyond the pool size",
+                          [({"pool": name}, pool.overflow()) for name, pool in pools])
+
+    replicas = read_router.replicas
+    yield CollectedMetric("meldenit_db_replica_lag_seconds", "gauge",
+                          "Replication lag at the last check (-1 if unreachable)",
+                          [({"pool": r.name}, -1 if r.lag is None else r.lag) for r in replicas])
+    yield CollectedMetric("meldenit_db_replica_healthy", "gauge", "1 if the replica is taking reads",
+                          [({"pool": r.name}, 1 if r.healthy else 0) for r in replicas])
+
+    yield CollectedMetric("meldenit_db_read_sessions", "counter", "Read-only sessions opened per pool",
+                          [({"pool": name}, count) for name, count in read_router.routed.items()])
+
+registry.register_collector(pool_metrics)
+
 class Base(DeclarativeBase):
     pass
 
@@ -28,7 +233,28 @@ async def get_db() -> AsyncSession:
         try:
             yield session
         except Exception as e:
-            logger.error(f"Database session error: {e}")
+            logger.error("Database session error: %s", e)
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+async def get_read_db(primary: AsyncSession = Depends(get_db)) -> AsyncSession:
+    """Dependency for read-only endpoints: a replica session, or the primary one.
+
+    Sessions connect lazily, so the unused primary session costs nothing;
+    taking it through get_db keeps its overrides working.
+    """
+    replica = read_router.pick()
+    if replica is None:
+        yield primary
+        return
+
+    async with replica.sessionmaker() as session:
+        try:
+            yield session
+        except Exception as e:
+            logger.error("Read replica %s session error: %s", replica.name, e)
             await session.rollback()
             raise
         finally:
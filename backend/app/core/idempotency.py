@@ -0,0 +1,110 @@
+"""Deduplication of retried inventory uploads.
+
+A request's key is the client's Idempotency-Key header or, without one,
+a fingerprint of its content (which includes collected_at), scoped to the
+agent. Recently answered keys are kept in memory so a retry to the same
+replica is answered without touching the database; the inventory row
+stores the key under a unique constraint, so a retry that reaches another
+replica (or arrives after a restart) fails its insert and is answered
+from the stored row instead.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+T = TypeVar("T")
+
+idempotent_replays = registry.counter(
+    "meldenit_idempotent_replays",
+    "Retried inventory uploads answered with the original response instead of being processed",
+    ("source",)
+)
+
+
+def derive_key(agent_guid: str, idempotency_key: Optional[str] = None,
+               fingerprint: Optional[bytes] = None) -> Optional[str]:
+    """SHA-256 dedup key for a request; None when it cannot be deduplicated"""
+    if not settings.IDEMPOTENCY_ENABLED:
+        return None
+    if idempotency_key:
+        material = b"key\0" + idempotency_key.encode()
+    elif fingerprint is not None:
+        material = b"content\0" + fingerprint
+    else:
+        return None
+    return hashlib.sha256(agent_guid.encode() + b"\0" + material).hexdigest()
+
+
+class IdempotencyCache:
+    """Responses of recently processed requests, bounded in size and age.
+
+    A request arriving while the first one with its key is still being
+    processed waits for that response rather than processing it again.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_monotonic, future resolving to the response or None)
+        self._entries: "OrderedDict[str, Tuple[float, asyncio.Future]]" = OrderedDict()
+
+    async def run(self, key: Optional[str], process: Callable[[], Awaitable[T]],
+                  cacheable: Callable[[T], bool] = lambda response: True) -> T:
+        """The cached response for `key`, or the result of `process()`.
+
+        Only responses passing `cacheable` are kept; when processing fails
+        or is not cacheable, waiting duplicates process the request
+        themselves.
+        """
+        if key is None:
+            return await process()
+
+        while True:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                break
+            response = await asyncio.shield(entry[1])
+            if response is not None:
+                idempotent_replays.labels("memory").inc()
+                return response
+
+        future = asyncio.get_running_loop().create_future()
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, future)
+        self._evict()
+
+        response = None
+        try:
+            response = await process()
+            return response
+        finally:
+            if response is None or not cacheable(response):
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] is future:
+                    del self._entries[key]
+                future.set_result(None)
+            else:
+                future.set_result(response)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self) -> None:
+        # Entries share one TTL, so insertion order is expiry order
+        now = time.monotonic()
+        while self._entries:
+            key, (expires, _) = next(iter(self._entries.items()))
+            if expires > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+
+
+idempotency_cache = IdempotencyCache(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_CACHE_TTL_SECONDS)
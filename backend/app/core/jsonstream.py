@@ -0,0 +1,114 @@
+"""Incremental parsing of large JSON documents.
+
+ObjectMemberParser takes a JSON object in arbitrary byte blocks and
+returns each top-level member as soon as its value is complete, so only
+the member being read is buffered rather than the whole document.
+"""
+import re
+from typing import Any, List, Tuple
+
+from app.core import codec
+
+_STRUCTURAL = re.compile(rb'[{}\[\],"]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+
+_QUOTE, _BACKSLASH, _COMMA = ord('"'), ord("\\"), ord(",")
+_OPEN = (ord("{"), ord("["))
+_CLOSE = (ord("}"), ord("]"))
+
+
+class ObjectMemberParser:
+    """Feed a JSON object in blocks; get its (key, value) members back as they complete"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._pos = 0  # scan position in the buffer
+        self._start = 0  # where the current member starts in the buffer
+        self._depth = 0
+        self._in_string = False
+        self._members = 0
+        self.done = False
+
+    def feed(self, data: bytes) -> List[Tuple[str, Any]]:
+        """Consume a block; raises ValueError on malformed JSON"""
+        if self.done:
+            if data.strip():
+                raise ValueError("Data after the end of the JSON object")
+            return []
+
+        buffer = self._buffer
+        buffer += data
+        pos = self._pos
+        members: List[Tuple[str, Any]] = []
+
+        while not self.done:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if buffer[match.start()] == _BACKSLASH:
+                    if match.end() >= len(buffer):
+                        # Rescan the escape once the escaped byte arrives
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+
+            match = _STRUCTURAL.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char, pos = buffer[match.start()], match.end()
+
+            if self._depth == 0:
+                if char != _OPEN[0] or buffer[:match.start()].strip():
+                    raise ValueError("Expected a JSON object")
+                self._depth = 1
+                self._start = pos
+            elif char == _QUOTE:
+                self._in_string = True
+            elif char in _OPEN:
+                self._depth += 1
+            elif char == _COMMA and self._depth > 1:
+                pass
+            else:
+                if self._depth == 1:
+                    if char == _CLOSE[1]:
+                        raise ValueError("Mismatched bracket")
+                    member = self._member(buffer, match.start(), closing=char != _COMMA)
+                    if member is not None:
+                        members.append(member)
+                    self._start = pos
+                self._depth -= char in _CLOSE
+                if self._depth == 0:
+                    self.done = True
+                    if buffer[pos:].strip():
+                        raise ValueError("Data after the end of the JSON object")
+
+        # Drop what has been consumed; only the current member is kept
+        consumed = self._start if not self.done else len(buffer)
+        del buffer[:consumed]
+        self._pos = pos - consumed
+        self._start -= consumed
+        return members
+
+    def close(self) -> None:
+        """Raise ValueError unless a complete object has been fed"""
+        if not self.done:
+            raise ValueError("Incomplete JSON object")
+
+    def _member(self, buffer: bytearray, end: int, closing: bool):
+        text = bytes(buffer[self._start:end])
+        if not text.strip():
+            if closing and self._members == 0:
+                return None  # empty object
+            raise ValueError("Empty object member")
+        self._members += 1
+        decoded = codec.loads(b"{" + text + b"}")
+        if not isinstance(decoded, dict) or len(decoded) != 1:
+            raise ValueError("Malformed object member")
+        return next(iter(decoded.items()))
@@ -1,27 +1,171 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import secrets
 import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
 from app.core.config import settings
+from app.core.metrics import registry
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+agent_guid_var: ContextVar[str] = ContextVar("agent_guid", default="-")
+
+log_records_dropped = registry.counter(
+    "meldenit_log_records_dropped",
+    "Log records dropped because the logging queue was full"
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def bind_agent_guid(agent_guid: str) -> None:
+    """Tag log records from the rest of this request with the agent"""
+    agent_guid_var.set(agent_guid)
+
+
+class ContextFilter(logging.Filter):
+    """Copies request_id and agent_guid from the request context onto records"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.agent_guid = agent_guid_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "agent_guid": getattr(record, "agent_guid", "-"),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+def build_file_handler() -> logging.Handler:
+    """Size-rotating file sink, or time-rotating when LOG_ROTATE_WHEN is set"""
+    if settings.LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            settings.LOG_FILE,
+            when=settings.LOG_ROTATE_WHEN,
+            backupCount=settings.LOG_FILE_BACKUP_COUNT,
+            encoding="utf-8",
+            delay=True
+        )
+    return logging.handlers.RotatingFileHandler(
+        settings.LOG_FILE,
+        maxBytes=settings.LOG_FILE_MAX_BYTES,
+        backupCount=settings.LOG_FILE_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True
+    )
+
 
 def setup_logging():
-    """Setup logging configuration"""
-    
+    """Setup logging configuration.
+
+    Application threads only put records on a queue; a listener thread
+    formats them and does the console and file I/O.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
     # Create formatter
-    formatter = logging.Formatter(settings.LOG_FORMAT)
-    
+    if settings.LOG_JSON:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(settings.LOG_FORMAT)
+
     # Setup console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    
+    handlers = [console_handler]
+
     # Setup file handler
-    file_handler = logging.FileHandler("app.log")
-    file_handler.setFormatter(formatter)
-    
+    if settings.LOG_FILE:
+        file_handler = build_file_handler()
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    # Hand records to the listener thread
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, settings.LOG_LEVEL.upper()))
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
-    
+    root_logger.addHandler(queue_handler)
+
     # Configure specific loggers
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestContextMiddleware:
+    """Assigns each request an id (or reuses X-Request-ID) for log correlation"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or secrets.token_hex(8)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        request_token = request_id_var.set(request_id)
+        agent_token = agent_guid_var.set("-")
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(request_token)
+            agent_guid_var.reset(agent_token)
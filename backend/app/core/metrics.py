@@ -0,0 +1,308 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Default latency buckets (seconds), tuned for sub-millisecond to multi-second requests
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _render(name: str, kind: str, documentation: str, samples: Iterable[Sample]) -> List[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for sample_name, labels, value in samples:
+        lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+
+def _counter_name(name: str) -> str:
+    """Counters are exposed, TYPE line and samples alike, as <name>_total"""
+    return name if name.endswith("_total") else f"{name}_total"
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Child for a label combination; cached so the hot path is a dict lookup"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    @property
+    def exposed_name(self) -> str:
+        return self.name
+
+    @abstractmethod
+    def _new_child(self):
+        """Fresh value holder for one label combination"""
+
+    @abstractmethod
+    def samples(self) -> Iterable[Sample]:
+        """(name, labels, value) for every series"""
+
+    def render(self) -> List[str]:
+        return _render(self.exposed_name, self.kind, self.documentation, self.samples())
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    @property
+    def exposed_name(self) -> str:
+        return _counter_name(self.name)
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterable[Sample]:
+        name = self.exposed_name
+        for values, child in self._children.items():
+            yield name, dict(zip(self.labelnames, values)), child.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in self._children.items():
+            yield self.name, dict(zip(self.labelnames, values)), child.value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in self._children.items():
+            labels = dict(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, cumulative
+
+
+class CollectedMetric(NamedTuple):
+    """Counter or gauge read from live state when /metrics is scraped"""
+    name: str
+    kind: str  # "counter" or "gauge"
+    documentation: str
+    samples: Iterable[Tuple[Dict[str, str], float]]  # (labels, value)
+
+    def render(self) -> List[str]:
+        name = _counter_name(self.name) if self.kind == "counter" else self.name
+        return _render(name, self.kind, self.documentation,
+                       ((name, labels, value) for labels, value in self.samples))
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in the Prometheus text format.
+
+    Metrics are plain Python objects updated without locks; everything that
+    records them runs on the event loop thread.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[CollectedMetric]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[CollectedMetric]]) -> None:
+        """Add a callback yielding point-in-time metrics at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "meldenit_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge(
+    "meldenit_http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+http_request_body_bytes = registry.histogram(
+    "meldenit_http_request_body_bytes",
+    "Request body size by route (inventory payload size distribution)",
+    ("route",),
+    buckets=SIZE_BUCKETS
+)
+snipeit_request_duration = registry.histogram(
+    "meldenit_snipeit_request_duration_seconds",
+    "Snipe-IT API call latency",
+    ("method", "endpoint", "status")
+)
+db_pool_wait = registry.histogram(
+    "meldenit_db_pool_wait_seconds",
+    "Time spent waiting for a database connection from the pool (connecting, without a pool)",
+    ("pool",)
+)
+db_pool_timeouts = registry.counter(
+    "meldenit_db_pool_timeouts",
+    "Checkouts that gave up after DATABASE_POOL_TIMEOUT_SECONDS",
+    ("pool",)
+)
+
+
+class MetricsMiddleware:
+    """Records per-route latency, in-flight requests and body sizes"""
+
+    def __init__(self, app: ASGIApp, body_size_prefixes: Sequence[str] = ("/api/v1/inventory",)):
+        self.app = app
+        self.body_size_prefixes = tuple(body_size_prefixes)
+        self._in_flight = http_requests_in_flight.labels()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self._in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._in_flight.dec()
+
+            # Route templates keep label cardinality bounded
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            http_request_duration.labels(scope["method"], route_path, str(status_code)).observe(elapsed)
+
+            if scope["path"].startswith(self.body_size_prefixes):
+                content_length = _content_length(scope)
+                if content_length is not None:
+                    http_request_body_bytes.labels(route_path).observe(content_length)
+
+
+def _content_length(scope: Scope) -> Optional[int]:
+    for key, value in scope["headers"]:
+        if key == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
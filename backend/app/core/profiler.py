@@ -0,0 +1,280 @@
+import asyncio
+import html
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+import traceback
+import zlib
+from collections import Counter, OrderedDict
+from typing import Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-debug-profile"
+
+event_loop_lag = registry.histogram(
+    "meldenit_event_loop_lag_seconds",
+    "Delay between when the event loop should have woken a task and when it did",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, thread_name: str) -> str:
+    """Frame chain as a root-first collapsed stack ("a;b;c")"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    labels.reverse()
+    return ";".join(labels)
+
+
+class StackSampler:
+    """Samples the stacks of every thread from a background thread.
+
+    Covers the event loop and threadpool workers alike; sampling costs one
+    sys._current_frames() call per interval while the profile runs.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude: Optional[int] = None) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == exclude:
+                continue
+            self.counts[collapse_stack(frame, names.get(ident, str(ident)))] += 1
+        self.samples += 1
+
+
+def render_collapsed(counts: Dict[str, int]) -> str:
+    """Brendan Gregg's collapsed format, readable by flamegraph.pl and speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+def render_flamegraph(counts: Dict[str, int], width: int = 1200, frame_height: int = 16) -> str:
+    """Minimal self-contained flame graph SVG"""
+    root: Dict = {"count": 0, "children": OrderedDict()}
+    for stack, count in sorted(counts.items()):
+        node = root
+        node["count"] += count
+        for label in stack.split(";"):
+            node = node["children"].setdefault(label, {"count": 0, "children": OrderedDict()})
+            node["count"] += count
+
+    total = root["count"] or 1
+    rects = []
+    max_depth = 0
+
+    def layout(node: Dict, x: float, depth: int) -> None:
+        nonlocal max_depth
+        for label, child in node["children"].items():
+            child_width = child["count"] / total * width
+            max_depth = max(max_depth, depth)
+            if child_width >= 0.5:
+                rects.append((label, child["count"], x, depth, child_width))
+                layout(child, x, depth + 1)
+            x += child_width
+
+    layout(root, 0.0, 0)
+    height = (max_depth + 1) * frame_height
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+    ]
+    for label, count, x, depth, rect_width in rects:
+        y = height - (depth + 1) * frame_height
+        hue = 20 + zlib.crc32(label.encode()) % 40
+        title = html.escape(f"{label} ({count} samples, {count / total:.1%})")
+        text = html.escape(label[:int(rect_width / 7)]) if rect_width > 21 else ""
+        parts.append(
+            f'<g><title>{title}</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{rect_width:.1f}" height="{frame_height - 1}" '
+            f'fill="hsl({hue},90%,60%)"/>'
+            f'<text x="{x + 2:.1f}" y="{y + frame_height - 4}">{text}</text></g>'
+        )
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+class Profiler:
+    """On-demand profiles, one sampler at a time, recent results kept in memory"""
+
+    def __init__(self, interval: float, max_seconds: float, keep: int = 20):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.keep = keep
+        self.busy = False
+        self._results: "OrderedDict[str, Counter]" = OrderedDict()
+
+    def start(self) -> Optional[StackSampler]:
+        """Start sampling, or None if another profile is running"""
+        if self.busy:
+            return None
+        self.busy = True
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler) -> str:
+        """Stop sampling and store the result; returns the profile id"""
+        try:
+            counts = sampler.stop()
+        finally:
+            self.busy = False
+        profile_id = secrets.token_hex(8)
+        self._results[profile_id] = counts
+        while len(self._results) > self.keep:
+            self._results.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str) -> Optional[Counter]:
+        return self._results.get(profile_id)
+
+    async def profile(self, seconds: float) -> Optional[str]:
+        """Sample the whole process for a while; None if a profile is already running"""
+        sampler = self.start()
+        if sampler is None:
+            return None
+        try:
+            await asyncio.sleep(min(seconds, self.max_seconds))
+        finally:
+            profile_id = self.finish(sampler)
+        return profile_id
+
+
+class ProfilingMiddleware:
+    """Profiles single requests carrying the admin token in X-Debug-Profile.
+
+    The profile id is returned in the X-Debug-Profile-Id response header
+    and the result fetched from /api/v1/debug/profiles/{id}. Samples cover
+    the whole process, so concurrent requests show up too.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._authorized(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = self.profiler.start()
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+
+        stopped = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal stopped
+            if message["type"] == "http.response.start":
+                # Stop before the body goes out so the id can travel in a header
+                stopped = True
+                MutableHeaders(scope=message)["X-Debug-Profile-Id"] = self.profiler.finish(sampler)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not stopped:
+                self.profiler.finish(sampler)
+
+    def _authorized(self, scope: Scope) -> bool:
+        if not settings.ADMIN_API_TOKEN:
+            return False
+        for key, value in scope["headers"]:
+            if key == PROFILE_HEADER.encode():
+                return secrets.compare_digest(value.decode("latin-1"), settings.ADMIN_API_TOKEN)
+        return False
+
+
+class LoopLagMonitor:
+    """Measures event loop lag and reports what blocked the loop.
+
+    A ticker task records how late each wake-up is. A watchdog thread
+    notices when ticks stop and logs the loop thread's stack while it is
+    still blocked, pointing at the offending code.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self.blocked = 0
+        self._last_tick = time.monotonic()
+        self._reported = False
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, loop.time() - expected)
+                self._last_tick = time.monotonic()
+                self._reported = False
+                event_loop_lag.observe(lag)
+                if lag > self.threshold:
+                    self.blocked += 1
+                    logger.warning("Event loop lag %.0f ms", lag * 1000)
+        finally:
+            self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.threshold / 2):
+            stalled = time.monotonic() - self._last_tick
+            if stalled < self.threshold + self.interval or self._reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._reported = True
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning("Event loop blocked for %.0f ms at:\n%s", stalled * 1000, stack)
+
+
+profiler = Profiler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000, settings.PROFILING_MAX_SECONDS)
+loop_lag_monitor = LoopLagMonitor(settings.LOOP_LAG_THRESHOLD_MS / 1000)
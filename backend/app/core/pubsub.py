@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core import codec
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PubSub(ABC):
+    """Fan-out of messages to every replica subscribed to a channel.
+
+    Handlers run one after another on the delivering task, so they must
+    hand messages off rather than wait on slow consumers.
+    """
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """Send a message to every subscriber of the channel"""
+
+    @abstractmethod
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        """Call `handler` with each message published on the channel"""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryPubSub(PubSub):
+    """Single-process pub/sub; handlers run in the publisher's task"""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                await handler(message)
+            except Exception as e:
+                logger.error("Pub/sub handler error on %s: %s", channel, e)
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+
+class RedisPubSub(PubSub):
+    """Redis-backed pub/sub for multi-replica deployments"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        await self._client.publish(channel, codec.dumps_bytes(message, default=str))
+
+    async def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+        await self._pubsub.subscribe(channel)
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        async for item in self._pubsub.listen():
+            channel = item["channel"].decode() if isinstance(item["channel"], bytes) else item["channel"]
+            try:
+                message = codec.loads(item["data"])
+            except ValueError:
+                logger.warning("Dropping malformed pub/sub message on %s", channel)
+                continue
+            for handler in self._handlers.get(channel, []):
+                try:
+                    await handler(message)
+                except Exception as e:
+                    logger.error("Pub/sub handler error on %s: %s", channel, e)
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        await self._pubsub.close()
+        await self._client.close()
+
+
+def build_pubsub() -> PubSub:
+    """Create the pub/sub backend from settings"""
+    if settings.PUSH_PUBSUB == "redis":
+        return RedisPubSub(settings.REDIS_URL)
+    return MemoryPubSub()
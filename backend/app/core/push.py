@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from starlette.websockets import WebSocket
+
+from app.core.pubsub import PubSub, build_pubsub
+
+logger = logging.getLogger(__name__)
+
+JOB_CHANNEL = "meldenit:agent-jobs"
+
+
+class PushConnection:
+    """An agent's WebSocket and the bounded queue of messages waiting to go out on it"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.outbox: asyncio.Queue = asyncio.Queue(queue_size)
+
+    async def send_outbox(self, on_sent: Callable[[Dict[str, Any]], Awaitable[None]],
+                          timeout: float) -> None:
+        """Send queued messages until the socket fails or takes longer than `timeout`"""
+        while True:
+            message = await self.outbox.get()
+            await asyncio.wait_for(self.websocket.send_json(message), timeout)
+            await on_sent(message)
+
+
+class PushHub:
+    """Registry of connected agents and delivery of server-initiated messages.
+
+    Each agent holds at most one WebSocket or a set of long-poll waiters.
+    Delivery only enqueues: every socket is drained by its own sender task,
+    so a slow agent delays nobody else's messages, nor the publisher.
+    """
+
+    def __init__(self, pubsub: PubSub):
+        self.pubsub = pubsub
+        self._sockets: Dict[str, PushConnection] = {}
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self.delivered = 0
+
+    @property
+    def connected(self) -> int:
+        return len(self._sockets)
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def start(self) -> None:
+        await self.pubsub.subscribe(JOB_CHANNEL, self._on_message)
+
+    async def stop(self) -> None:
+        await self.pubsub.close()
+
+    def attach(self, agent_guid: str, connection: PushConnection) -> Optional[PushConnection]:
+        """Register a connection, returning the one it replaces if any"""
+        previous = self._sockets.get(agent_guid)
+        self._sockets[agent_guid] = connection
+        return previous
+
+    def detach(self, agent_guid: str, connection: PushConnection) -> None:
+        if self._sockets.get(agent_guid) is connection:
+            del self._sockets[agent_guid]
+
+    def wait(self, agent_guid: str) -> asyncio.Future:
+        """Future resolved with the next message for a long-polling agent"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(agent_guid, set()).add(future)
+        return future
+
+    def cancel_wait(self, agent_guid: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(agent_guid)
+        if waiters is not None:
+            waiters.discard(future)
+            if not waiters:
+                del self._waiters[agent_guid]
+
+    async def publish(self, agent_guid: str, message: Dict[str, Any]) -> None:
+        """Send a message to an agent on whichever replica holds its connection"""
+        await self.pubsub.publish(JOB_CHANNEL, {"agent_guid": agent_guid, "message": message})
+
+    async def _on_message(self, data: Dict[str, Any]) -> None:
+        if await self.deliver(data["agent_guid"], data["message"]):
+            self.delivered += 1
+
+    async def deliver(self, agent_guid: str, message: Dict[str, Any]) -> bool:
+        """Hand a message to a locally connected agent; False if it isn't here"""
+        delivered = False
+
+        connection = self._sockets.get(agent_guid)
+        if connection is not None:
+            try:
+                connection.outbox.put_nowait(message)
+                delivered = True
+            except asyncio.QueueFull:
+                # Its sender is stuck and will time out; pending jobs are
+                # sent again when the agent reconnects
+                logger.warning("Push queue full for agent %s, dropping message", agent_guid)
+
+        for future in self._waiters.pop(agent_guid, ()):
+            if not future.done():
+                future.set_result(message)
+                delivered = True
+
+        return delivered
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "waiting": self.waiting,
+            "delivered": self.delivered,
+        }
+
+
+push_hub = PushHub(build_pubsub())
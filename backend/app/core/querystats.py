@@ -0,0 +1,113 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import registry
+
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+db_statements_per_request = registry.histogram(
+    "meldenit_db_statements_per_request",
+    "SQL statements executed per request",
+    ("route",),
+    buckets=STATEMENT_BUCKETS
+)
+db_commits_per_request = registry.histogram(
+    "meldenit_db_commits_per_request",
+    "Transaction commits per request",
+    ("route",),
+    buckets=STATEMENT_BUCKETS
+)
+db_time_per_request = registry.histogram(
+    "meldenit_db_time_per_request_seconds",
+    "Time spent executing SQL per request",
+    ("route",)
+)
+
+
+@dataclass
+class QueryStats:
+    statements: int = 0
+    commits: int = 0
+    db_time: float = 0.0  # seconds
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.db_time * 1000:.2f};'
+            f'desc="{self.statements} statements, {self.commits} commits"'
+        )
+
+
+# Set per request by QueryStatsMiddleware. SQLAlchemy runs the sync engine
+# inside a greenlet that inherits the caller's context, so engine events
+# see the same object.
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.db_time += time.perf_counter() - started.pop()
+    stats.statements += 1
+
+
+def _commit(conn):
+    stats = _current.get()
+    if stats is not None:
+        stats.commits += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach statement and commit counters to a (sync) engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "commit", _commit)
+
+
+class QueryStatsMiddleware:
+    """Counts SQL per request; reports it as Server-Timing and metrics"""
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.server_timing:
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None and (stats.statements or stats.commits):
+                db_statements_per_request.labels(route.path).observe(stats.statements)
+                db_commits_per_request.labels(route.path).observe(stats.commits)
+                db_time_per_request.labels(route.path).observe(stats.db_time)
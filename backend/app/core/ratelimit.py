@@ -0,0 +1,272 @@
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import DeviceClaims, verify_device_token
+
+logger = logging.getLogger(__name__)
+
+# Route already charged by RateLimitMiddleware for the current request
+_prechecked_var: ContextVar[Optional[str]] = ContextVar("rate_limit_prechecked", default=None)
+
+
+@dataclass(frozen=True)
+class BucketLimit:
+    """Token bucket parameters: refill rate (tokens/second) and burst capacity"""
+    rate: float
+    capacity: float
+
+    @classmethod
+    def per_minute(cls, per_minute: float, burst: float) -> "BucketLimit":
+        return cls(rate=per_minute / 60.0, capacity=float(burst))
+
+
+class BucketStore(ABC):
+    """Storage backend for token buckets"""
+
+    @abstractmethod
+    async def consume(self, buckets: Sequence[Tuple[str, BucketLimit]], cost: float = 1.0) -> float:
+        """Take `cost` tokens from every bucket or from none of them.
+
+        Returns 0.0 when allowed, otherwise the seconds until the request
+        would be allowed.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBucketStore(BucketStore):
+    """In-process buckets for single-node deployments"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [tokens, last_refill_monotonic], least recently used first
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def consume(self, buckets: Sequence[Tuple[str, BucketLimit]], cost: float = 1.0) -> float:
+        now = time.monotonic()
+        states = []
+        retry_after = 0.0
+
+        # No awaits below, so the check-and-take is atomic on the event loop
+        for key, limit in buckets:
+            state = self._buckets.get(key)
+            if state is None:
+                while len(self._buckets) >= self.max_keys:
+                    # Evict the least recently used bucket
+                    self._buckets.popitem(last=False)
+                state = [limit.capacity, now]
+                self._buckets[key] = state
+            else:
+                self._buckets.move_to_end(key)
+                state[0] = min(limit.capacity, state[0] + (now - state[1]) * limit.rate)
+                state[1] = now
+            if state[0] < cost:
+                retry_after = max(retry_after, (cost - state[0]) / limit.rate)
+            states.append(state)
+
+        if retry_after:
+            return retry_after
+
+        for state in states:
+            state[0] -= cost
+        return 0.0
+
+
+# KEYS: bucket keys; ARGV: cost, then (rate, capacity) per key.
+# Uses server time so replicas with skewed clocks share consistent buckets.
+_CONSUME_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tokens = {}
+local retry = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local current = tonumber(state[1])
+    if current == nil then
+        current = capacity
+    else
+        current = math.min(capacity, current + (now - tonumber(state[2])) * rate)
+    end
+    tokens[i] = current
+    if current < cost then
+        retry = math.max(retry, (cost - current) / rate)
+    end
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    local remaining = tokens[i]
+    if retry == 0 then
+        remaining = remaining - cost
+    end
+    redis.call('HSET', key, 'tokens', remaining, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return tostring(retry)
+"""
+
+
+class RedisBucketStore(BucketStore):
+    """Buckets shared across replicas, updated atomically by a Lua script"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+        self._consume = self._client.register_script(_CONSUME_SCRIPT)
+
+    async def consume(self, buckets: Sequence[Tuple[str, BucketLimit]], cost: float = 1.0) -> float:
+        keys = []
+        args = [cost]
+        for key, limit in buckets:
+            keys.append(key)
+            args.extend((limit.rate, limit.capacity))
+        return float(await self._consume(keys=keys, args=args))
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+class RateLimiter:
+    """Per-agent and per-site token bucket limits for agent endpoints"""
+
+    def __init__(self, store: BucketStore, agent_limits: Dict[str, BucketLimit],
+                 site_limit: Optional[BucketLimit] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.store = store
+        self.agent_limits = agent_limits
+        self.site_limit = site_limit
+        self.rejected: Dict[str, int] = {route: 0 for route in agent_limits}
+
+    async def check(self, route: str, agent_guid: str, site_code: Optional[str] = None) -> None:
+        """Raise 429 if the agent or its site is over its limit"""
+        if not self.enabled or _prechecked_var.get() == route:
+            return
+
+        buckets = []
+        limit = self.agent_limits.get(route)
+        if limit is not None:
+            buckets.append((f"rl:{route}:agent:{agent_guid}", limit))
+        if site_code and self.site_limit is not None:
+            buckets.append((f"rl:site:{site_code}", self.site_limit))
+        if not buckets:
+            return
+
+        try:
+            retry_after = await self.store.consume(buckets)
+        except Exception as e:
+            # Fail open: a limiter outage must not take ingestion down with it
+            logger.error("Rate limit store error: %s", e)
+            return
+
+        if retry_after:
+            self.rejected[route] = self.rejected.get(route, 0) + 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+
+def build_rate_limiter() -> RateLimiter:
+    """Create the limiter and its store from settings"""
+    if settings.RATE_LIMIT_STORE == "redis":
+        store = RedisBucketStore(settings.REDIS_URL)
+    else:
+        store = MemoryBucketStore()
+
+    agent_limits = {
+        "heartbeat": BucketLimit.per_minute(
+            settings.RATE_LIMIT_AGENT_HEARTBEAT_PER_MINUTE,
+            settings.RATE_LIMIT_AGENT_HEARTBEAT_BURST
+        ),
+        "inventory": BucketLimit.per_minute(
+            settings.RATE_LIMIT_AGENT_INVENTORY_PER_MINUTE,
+            settings.RATE_LIMIT_AGENT_INVENTORY_BURST
+        ),
+    }
+    site_limit = BucketLimit.per_minute(
+        settings.RATE_LIMIT_SITE_PER_MINUTE,
+        settings.RATE_LIMIT_SITE_BURST
+    )
+    return RateLimiter(store, agent_limits, site_limit, enabled=settings.RATE_LIMIT_ENABLED)
+
+
+rate_limiter = build_rate_limiter()
+
+
+# Single-agent POST routes and the bucket each one draws from; batches are
+# limited per item as they are read
+RATE_LIMITED_ROUTES = {
+    "/api/v1/agents/heartbeat": "heartbeat",
+    "/api/v1/inventory/delta": "inventory",
+    "/api/v1/inventory/full": "inventory",
+    "/api/v1/inventory/sections/negotiate": "inventory",
+    "/api/v1/inventory/uploads": "inventory",
+}
+
+
+def _token_claims(authorization: Optional[str]) -> Optional[DeviceClaims]:
+    """Verified device claims from an Authorization header, or None"""
+    if not settings.DEVICE_AUTH_ENABLED or not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return verify_device_token(token)
+    except HTTPException:
+        # The endpoint rejects it with the usual 401
+        return None
+
+
+class RateLimitMiddleware:
+    """ASGI middleware that rate limits token-bearing agent requests before their body is read.
+
+    The agent and site come from the device token, so an over-limit agent is
+    turned away without the server receiving or parsing its upload. Requests
+    without a valid token fall through to the endpoint, which checks the
+    agent named in the body once it is parsed.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter = rate_limiter,
+                 routes: Optional[Dict[str, str]] = None):
+        self.app = app
+        self.limiter = limiter
+        self.routes = routes if routes is not None else RATE_LIMITED_ROUTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            route = self.routes.get(scope["path"])
+        if route is None or not self.limiter.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        claims = _token_claims(Headers(scope=scope).get("authorization"))
+        if claims is not None:
+            try:
+                await self.limiter.check(route, claims.agent_guid, claims.site_code)
+            except HTTPException as e:
+                response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+                await response(scope, receive, send)
+                return
+            _prechecked_var.set(route)
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.logging import bind_agent_guid
+
+logger = logging.getLogger(__name__)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+@dataclass(frozen=True)
+class DeviceClaims:
+    """Verified contents of a device token"""
+    agent_guid: str
+    site_code: str
+    jti: str
+    expires_at: datetime
+
+
+def create_device_token(agent_guid: str, site_code: str) -> str:
+    """Issue a signed, expiring device token for an agent"""
+    now = datetime.utcnow()
+    claims = {
+        "sub": agent_guid,
+        "site": site_code,
+        "iat": now,
+        "exp": now + timedelta(days=settings.DEVICE_TOKEN_EXPIRE_DAYS),
+        "jti": secrets.token_hex(8),
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def read_token_claims(token: str) -> Optional[Dict]:
+    """Read claims without verifying, for revoking previously issued tokens"""
+    try:
+        return jwt.get_unverified_claims(token)
+    except JWTError:
+        # Opaque tokens issued before signed tokens were introduced
+        return None
+
+
+class RevocationList:
+    """In-memory set of revoked token ids, refreshed from the database"""
+
+    def __init__(self):
+        # jti -> expiry; entries are only useful until the token expires anyway
+        self._revoked: Dict[str, datetime] = {}
+        self.last_refresh: Optional[datetime] = None
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        self._revoked[jti] = expires_at
+
+    async def refresh(self, session_factory) -> None:
+        """Reload unexpired revocations from the database"""
+        from app.models.agent import RevokedToken
+
+        now = datetime.utcnow()
+        async with session_factory() as session:
+            result = await session.execute(
+                select(RevokedToken.jti, RevokedToken.expires_at)
+                .where(RevokedToken.expires_at > now)
+            )
+            revoked = {jti: expires_at for jti, expires_at in result.all()}
+
+        # Keep local additions that may not be visible to this replica yet
+        for jti, expires_at in self._revoked.items():
+            if expires_at > now:
+                revoked.setdefault(jti, expires_at)
+
+        self._revoked = revoked
+        self.last_refresh = now
+
+    async def run(self, session_factory, interval: float) -> None:
+        """Refresh periodically until cancelled"""
+        while True:
+            try:
+                await self.refresh(session_factory)
+            except Exception as e:
+                logger.error("Error refreshing token revocation list: %s", e)
+            await asyncio.sleep(interval)
+
+
+revocation_list = RevocationList()
+
+
+def verify_device_token(token: str) -> DeviceClaims:
+    """Verify signature, expiry and revocation without any I/O"""
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired device token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    jti = claims.get("jti")
+    if not jti or jti in revocation_list:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Device token revoked",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    return DeviceClaims(
+        agent_guid=claims["sub"],
+        site_code=claims.get("site", ""),
+        jti=jti,
+        expires_at=datetime.utcfromtimestamp(claims["exp"])
+    )
+
+
+def token_needs_renewal(token: Optional[str], agent_guid: str, stored_token: Optional[str]) -> bool:
+    """Whether a heartbeat presenting `token` should be answered with a new one.
+
+    Opaque tokens from before signed tokens are swapped while they are still
+    the agent's token of record; signed tokens are renewed once they are
+    within DEVICE_TOKEN_RENEW_DAYS of expiry.
+    """
+    if not token:
+        return False
+    if read_token_claims(token) is None:
+        return stored_token is not None and secrets.compare_digest(token.encode(), stored_token.encode())
+    try:
+        claims = verify_device_token(token)
+    except HTTPException:
+        return False
+    renew_after = claims.expires_at - timedelta(days=settings.DEVICE_TOKEN_RENEW_DAYS)
+    return claims.agent_guid == agent_guid and datetime.utcnow() >= renew_after
+
+
+async def require_device_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> DeviceClaims:
+    """Dependency that always requires a valid device token"""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Device token required",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    claims = verify_device_token(credentials.credentials)
+    bind_agent_guid(claims.agent_guid)
+    return claims
+
+
+async def get_device_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Optional[DeviceClaims]:
+    """Dependency for agent endpoints; None when device auth is disabled"""
+    if not settings.DEVICE_AUTH_ENABLED:
+        return None
+    return await require_device_claims(credentials)
+
+
+async def require_admin(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> None:
+    """Dependency for operator endpoints, authenticated with ADMIN_API_TOKEN"""
+    if not settings.ADMIN_API_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled"
+        )
+    if credentials is None or not secrets.compare_digest(credentials.credentials, settings.ADMIN_API_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def ensure_agent(claims: Optional[DeviceClaims], agent_guid: str) -> None:
+    """Reject requests made on behalf of another agent"""
+    bind_agent_guid(agent_guid)
+    if claims is not None and claims.agent_guid != agent_guid:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Device token does not belong to this agent"
+        )
@@ -0,0 +1,369 @@
+import functools
+import json
+import logging
+import queue
+import random
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "status", "_token")
+
+    sampled = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.status = "ok"
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error"] = f"{type(error).__name__}: {error}"
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": round(((self.end or time.time()) - self.start) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.record_error(exc)
+        _current_span.reset(self._token)
+        tracer.finish(self)
+
+
+class _NoopSpan:
+    """Stand-in for unsampled work; every operation is free"""
+
+    sampled = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]):
+    """W3C traceparent -> (trace_id, parent_id, sampled), or None if invalid"""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class SpanExporter(ABC):
+    """Receives finished spans in batches, on the exporter thread"""
+
+    @abstractmethod
+    def export(self, spans: List[Span]) -> None:
+        """Write a batch of finished spans"""
+
+    def shutdown(self) -> None:
+        pass
+
+
+class NdjsonFileExporter(SpanExporter):
+    """Appends one JSON object per span to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as file:
+            for span in spans:
+                file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class OtlpHttpExporter(SpanExporter):
+    """Sends spans to an OpenTelemetry collector using OTLP/HTTP JSON"""
+
+    def __init__(self, endpoint: str, service_name: str = "meldenit-backend"):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=5.0)
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "meldenit"},
+                    "spans": [self._encode(span) for span in spans],
+                }],
+            }]
+        }
+        try:
+            self._client.post(self.endpoint, json=payload).raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning("OTLP export failed: %s", e)
+
+    def _encode(self, span: Span) -> Dict[str, Any]:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(span.start * 1e9)),
+            "endTimeUnixNano": str(int((span.end or span.start) * 1e9)),
+            "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def shutdown(self) -> None:
+        self._client.close()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Tracer:
+    """Head-sampled tracer; finished spans are exported from a background thread"""
+
+    def __init__(self, exporter: Optional[SpanExporter], sample_rate: float,
+                 enabled: bool = True, queue_size: int = 10000, batch_size: int = 256):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.enabled = enabled and exporter is not None
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+    def start_span(self, name: str, parent: Optional[Span] = None, traceparent: Optional[str] = None,
+                   **attributes: Any):
+        """New span under the current one; a new trace is sampled at sample_rate"""
+        if not self.enabled:
+            return NOOP_SPAN
+
+        parent = parent or _current_span.get()
+        if parent is not None:
+            return Span(name, parent.trace_id, parent.span_id, attributes)
+
+        incoming = parse_traceparent(traceparent)
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+            return Span(name, trace_id, parent_id, attributes) if sampled else NOOP_SPAN
+
+        if random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        return Span(name, secrets.token_hex(16), None, attributes)
+
+    def span(self, name: str, **attributes: Any):
+        """Context manager for a child of the current span; no-op outside sampled traces"""
+        if not self.enabled:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+
+    def finish(self, span: Span) -> None:
+        span.end = time.time()
+        if self._thread is None:
+            self._start_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_worker(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            span = self._queue.get()
+            if span is None:
+                return
+            batch = [span]
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    break
+                if span is None:
+                    self._export(batch)
+                    return
+                batch.append(span)
+            self._export(batch)
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.error("Span export failed: %s", e)
+
+    def shutdown(self) -> None:
+        """Flush pending spans and stop the exporter thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+def traced(name: str):
+    """Decorator wrapping an async function in a child span"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject_traceparent(request: httpx.Request) -> None:
+    """Propagate the current trace to an outgoing HTTP request"""
+    span = _current_span.get()
+    if span is not None:
+        request.headers["traceparent"] = span.traceparent()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = tracer.span("db.query", statement=statement[:200], executemany=executemany)
+    if span.sampled:
+        conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        tracer.finish(spans.pop())
+
+
+def _handle_error(exception_context):
+    spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+    if spans:
+        span = spans.pop()
+        span.record_error(exception_context.original_exception)
+        tracer.finish(span)
+
+
+def trace_engine(engine: Engine) -> None:
+    """Emit a db.query span for every statement inside a sampled trace"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class TracingMiddleware:
+    """Opens the root span for each request, continuing an incoming traceparent"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        span = tracer.start_span(f"{scope['method']} {scope['path']}", traceparent=traceparent,
+                                 method=scope["method"], path=scope["path"])
+        if not span.sampled:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("status_code", message["status"])
+            await send(message)
+
+        with span:
+            await self.app(scope, receive, send_wrapper)
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"{scope['method']} {route.path}"
+
+
+def build_exporter() -> Optional[SpanExporter]:
+    if settings.TRACE_EXPORTER == "otlp":
+        return OtlpHttpExporter(settings.TRACE_OTLP_ENDPOINT)
+    if settings.TRACE_EXPORTER == "file":
+        return NdjsonFileExporter(settings.TRACE_FILE)
+    return None
+
+
+tracer = Tracer(
+    build_exporter() if settings.TRACING_ENABLED else None,
+    settings.TRACE_SAMPLE_RATE,
+    enabled=settings.TRACING_ENABLED
+)
@@ -1,15 +1,28 @@
 from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 from dotenv import load_dotenv
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.codec import NegotiatedResponse
+from app.core.database import engine, Base, AsyncSessionLocal, read_router
 from app.api.v1.api import api_router
-from app.core.logging import setup_logging
+from app.core.logging import RequestContextMiddleware, setup_logging, stop_logging
+from app.core.admission import AdmissionMiddleware, admission_controller
+from app.core.ratelimit import RateLimitMiddleware, rate_limiter
+from app.core.security import revocation_list
+from app.core.push import push_hub
+from app.core.metrics import CollectedMetric, MetricsMiddleware, registry
+from app.core.querystats import QueryStatsMiddleware
+from app.core.profiler import ProfilingMiddleware, loop_lag_monitor, profiler
+from app.core.tracing import TracingMiddleware, tracer
+from app.services.rollout import download_leases
+from app.services.upload_sessions import upload_sessions
 
 # Load environment variables
 load_dotenv()
@@ -28,17 +41,53 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
     
     logger.info("Database tables created/verified")
+    
+    # Keep the device token revocation list fresh
+    revocation_task = asyncio.create_task(
+        revocation_list.run(AsyncSessionLocal, settings.DEVICE_TOKEN_REVOCATION_REFRESH_SECONDS)
+    )
+    
+    # Expire abandoned resumable uploads
+    upload_purge_task = asyncio.create_task(
+        upload_sessions.run(settings.UPLOAD_SESSION_PURGE_INTERVAL_SECONDS)
+    )
+    
+    # Route reads to replicas that keep up
+    replica_task = None
+    if read_router.replicas:
+        replica_task = asyncio.create_task(read_router.run(settings.DATABASE_REPLICA_CHECK_SECONDS))
+    
+    # Subscribe to job fan-out for the push channel
+    await push_hub.start()
+    
+    # Watch for code blocking the event loop
+    lag_task = None
+    if settings.LOOP_LAG_MONITOR_ENABLED:
+        lag_task = asyncio.create_task(loop_lag_monitor.run())
     yield
     
     # Shutdown
     logger.info("Shutting down MeldenIT Backend API")
+    revocation_task.cancel()
+    upload_purge_task.cancel()
+    if lag_task is not None:
+        lag_task.cancel()
+    if replica_task is not None:
+        replica_task.cancel()
+        await read_router.dispose()
+    await push_hub.stop()
+    await rate_limiter.store.close()
+    await download_leases.close()
+    tracer.shutdown()
+    stop_logging()
 
 # Create FastAPI app
 app = FastAPI(
     title="MeldenIT Backend API",
     description="Merkez sunucu API'si - Snipe-IT entegrasyonlu envanter yönetimi",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=NegotiatedResponse
 )
 
 # Add CORS middleware
@@ -50,6 +99,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add admission control middleware
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+# Add rate limiting outside admission so over-limit agents never take a slot
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+# Add per-request SQL accounting
+if settings.QUERY_STATS_ENABLED:
+    app.add_middleware(QueryStatsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
+# Add per-request profiling for admins
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+# Add metrics middleware last so it wraps admission queueing and 429s
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Add tracing around everything but the request id
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+
+# Add request ids outermost so every log line in a request carries one
+app.add_middleware(RequestContextMiddleware)
+
+def component_metrics():
+    """Admission, rate limiter, push and rollout state for /metrics"""
+    classes = list(admission_controller.classes.values())
+    yield CollectedMetric("meldenit_admission_in_flight", "gauge", "Requests admitted per class",
+                          [({"class": cls.name}, cls.in_flight) for cls in classes])
+    yield CollectedMetric("meldenit_admission_queued", "gauge", "Requests waiting for admission per class",
+                          [({"class": cls.name}, cls.queued) for cls in classes])
+    yield CollectedMetric("meldenit_admission_shed", "counter", "Requests rejected by admission control",
+                          [({"class": cls.name}, cls.shed) for cls in classes])
+    yield CollectedMetric("meldenit_admission_timed_out", "counter", "Requests that timed out in the admission queue",
+                          [({"class": cls.name}, cls.timed_out) for cls in classes])
+
+    yield CollectedMetric("meldenit_rate_limited", "counter", "Requests rejected by the rate limiter",
+                          [({"route": route}, count) for route, count in rate_limiter.rejected.items()])
+
+    yield CollectedMetric("meldenit_push_connected", "gauge", "Agents connected to the push channel",
+                          [({}, push_hub.connected)])
+    yield CollectedMetric("meldenit_push_waiting", "gauge", "Agents holding a long-poll request",
+                          [({}, push_hub.waiting)])
+    yield CollectedMetric("meldenit_push_delivered", "counter", "Jobs delivered over the push channel",
+                          [({}, push_hub.delivered)])
+
+    yield CollectedMetric("meldenit_update_download_leases", "gauge", "Agents currently holding a download lease",
+                          [({}, download_leases.active)])
+    yield CollectedMetric("meldenit_update_downloads_deferred", "counter", "Update checks deferred by the download cap",
+                          [({}, download_leases.deferred)])
+
+registry.register_collector(component_metrics)
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
@@ -58,6 +162,26 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "MeldenIT Backend API"}
 
+@app.get("/healthz/admission")
+async def admission_stats():
+    """Per-class admission queue and shed counters"""
+    return admission_controller.snapshot()
+
+@app.get("/healthz/push")
+async def push_stats():
+    """Push channel connection counters"""
+    return push_hub.snapshot()
+
+@app.get("/healthz/database")
+async def database_stats():
+    """Replica lag and where read sessions went"""
+    return read_router.snapshot()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     """Root endpoint"""
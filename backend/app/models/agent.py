@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, JSON
+from sqlalchemy import Column, String, DateTime, Boolean, Text, Integer, JSON, UniqueConstraint
 from sqlalchemy.sql import func
 from app.core.database import Base
 from datetime import datetime
@@ -13,7 +13,7 @@ class Agent(Base):
     serial_number = Column(String(255), nullable=False)
     domain = Column(String(255), nullable=True)
     site_code = Column(String(50), nullable=False)
-    device_token = Column(String(255), unique=True, nullable=False)
+    device_token = Column(String(512), unique=True, nullable=False)
     version = Column(String(50), nullable=False)
     status = Column(String(50), default="active")
     last_heartbeat = Column(DateTime, nullable=True)
@@ -21,10 +21,11 @@ class Agent(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     is_online = Column(Boolean, default=True)
-    metadata = Column(JSON, nullable=True)
+    metadata_ = Column("metadata", JSON, nullable=True)
 
 class Inventory(Base):
     __tablename__ = "inventories"
+    __table_args__ = (UniqueConstraint("agent_id", "idempotency_key", name="uq_inventories_agent_idempotency_key"),)
     
     id = Column(Integer, primary_key=True, index=True)
     agent_id = Column(Integer, nullable=False, index=True)
@@ -34,8 +35,21 @@ class Inventory(Base):
     collected_at = Column(DateTime, default=func.now())
     synced_at = Column(DateTime, nullable=True)
     snipeit_updated = Column(Boolean, default=False)
+    idempotency_key = Column(String(64), nullable=True)  # see app.core.idempotency
     created_at = Column(DateTime, default=func.now())
 
+class InventorySection(Base):
+    __tablename__ = "inventory_sections"
+    __table_args__ = (UniqueConstraint("agent_id", "section", name="uq_inventory_sections_agent_section"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    agent_id = Column(Integer, nullable=False, index=True)
+    agent_guid = Column(String(36), nullable=False, index=True)
+    section = Column(String(50), nullable=False)  # one of SECTION_NAMES
+    content_hash = Column(String(64), nullable=False)
+    data = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 class Heartbeat(Base):
     __tablename__ = "heartbeats"
     
@@ -59,6 +73,7 @@ class Job(Base):
     result = Column(JSON, nullable=True)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime, default=func.now())
+    delivered_at = Column(DateTime, nullable=True)  # first sent to the agent
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
 
@@ -75,3 +90,12 @@ class AuditLog(Base):
     ip_address = Column(String(45), nullable=True)
     user_agent = Column(String(500), nullable=True)
     created_at = Column(DateTime, default=func.now())
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(64), unique=True, index=True, nullable=False)
+    agent_guid = Column(String(36), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, default=func.now())
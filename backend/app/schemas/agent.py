@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
+from app.schemas.inventory import InventoryData, SECTION_NAMES
 
 class AgentRegistrationRequest(BaseModel):
     agent_guid: str = Field(..., description="Agent GUID")
@@ -14,6 +15,9 @@ class AgentRegistrationResponse(BaseModel):
     device_token: str = Field(..., description="Device authentication token")
     policy: Dict[str, Any] = Field(..., description="Agent policy configuration")
 
+class DeviceTokenResponse(BaseModel):
+    device_token: str = Field(..., description="New device authentication token")
+
 class HeartbeatRequest(BaseModel):
     agent_guid: str = Field(..., description="Agent GUID")
     version: str = Field(..., description="Agent version")
@@ -24,11 +28,12 @@ class HeartbeatResponse(BaseModel):
     status: str = Field(..., description="Response status")
     message: Optional[str] = Field(None, description="Response message")
     config_updated: bool = Field(False, description="Whether config was updated")
+    device_token: Optional[str] = Field(None, description="Replacement device token, when the one sent is legacy or about to expire")
 
 class InventorySyncRequest(BaseModel):
     agent_guid: str = Field(..., description="Agent GUID")
     sync_type: str = Field(..., description="Sync type (delta or full)")
-    inventory: Dict[str, Any] = Field(..., description="Inventory data")
+    inventory: InventoryData = Field(..., description="Inventory data")
     last_sync: Optional[datetime] = Field(None, description="Last sync time")
 
 class InventorySyncResponse(BaseModel):
@@ -37,16 +42,93 @@ class InventorySyncResponse(BaseModel):
     snipeit_updated: bool = Field(False, description="Whether Snipe-IT was updated")
     next_sync: Optional[datetime] = Field(None, description="Next sync time")
 
+class SectionHashes(BaseModel):
+    agent_guid: str = Field(..., description="Agent GUID")
+    hashes: Dict[str, str] = Field(..., description="SHA-256 of each section's canonical JSON")
+
+    @field_validator("hashes")
+    @classmethod
+    def known_sections(cls, hashes: Dict[str, str]) -> Dict[str, str]:
+        unknown = set(hashes) - set(SECTION_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+        return hashes
+
+class SectionNegotiationResponse(BaseModel):
+    status: str = Field(..., description="Response status")
+    missing: List[str] = Field(..., description="Sections the server needs uploaded")
+
+class SectionUploadRequest(SectionHashes):
+    sections: InventoryData = Field(..., description="Changed sections only")
+    collected_at: Optional[datetime] = Field(None, description="Collection time")
+
+class SectionUploadResponse(InventorySyncResponse):
+    missing: List[str] = Field(default_factory=list, description="Sections still needed before the sync completes")
+
+class HeartbeatBatchItem(HeartbeatRequest):
+    device_token: Optional[str] = Field(None, description="Device token of the agent this item belongs to")
+
+class InventoryBatchItem(InventorySyncRequest):
+    device_token: Optional[str] = Field(None, description="Device token of the agent this item belongs to")
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the batch")
+    agent_guid: Optional[str] = Field(None, description="Agent GUID")
+    status: str = Field(..., description="Item status (success or error)")
+    message: Optional[str] = Field(None, description="Item message")
+
+class BatchResponse(BaseModel):
+    processed: int = Field(..., description="Number of items received")
+    succeeded: int = Field(..., description="Number of items stored")
+    failed: int = Field(..., description="Number of items rejected")
+    results: List[BatchItemResult] = Field(..., description="Per-item results in request order")
+
+class AgentImportResult(BatchItemResult):
+    device_token: Optional[str] = Field(None, description="Device authentication token issued")
+    created: Optional[bool] = Field(None, description="Whether the agent was new")
+
+class AgentImportSummary(BaseModel):
+    processed: int = Field(..., description="Number of rows received")
+    created: int = Field(..., description="Number of new agents")
+    updated: int = Field(..., description="Number of re-registered agents")
+    failed: int = Field(..., description="Number of rows rejected")
+    seconds: float = Field(..., description="Time taken")
+    rows_per_second: float = Field(..., description="Rows processed per second")
+
+class UploadSessionRequest(BaseModel):
+    agent_guid: str = Field(..., description="Agent GUID")
+    sync_type: str = Field(..., description="Sync type (delta or full)")
+    total_size: int = Field(..., gt=0, description="Size of the inventory JSON in bytes")
+    sha256: Optional[str] = Field(None, pattern="^[0-9a-fA-F]{64}$", description="SHA-256 of the inventory JSON")
+
+class UploadSessionStatus(BaseModel):
+    session_id: str = Field(..., description="Upload session ID")
+    offset: int = Field(..., description="Bytes received; the next chunk starts here")
+    total_size: int = Field(..., description="Declared size in bytes")
+    chunk_size: int = Field(..., description="Suggested chunk size in bytes")
+    committed: bool = Field(False, description="Whether the upload has been committed")
+    expires_at: datetime = Field(..., description="When the session expires without further chunks")
+
 class UpdateCheckRequest(BaseModel):
     agent_guid: str = Field(..., description="Agent GUID")
     current_version: str = Field(..., description="Current agent version")
 
+class UpdatePackage(BaseModel):
+    package_type: str = Field(..., description="Package type (full or patch)")
+    from_version: Optional[str] = Field(None, description="Version the patch applies to")
+    to_version: str = Field(..., description="Version after applying the package")
+    url: str = Field(..., description="Download URL, supports Range requests")
+    sha256: str = Field(..., description="SHA-256 of the package")
+    size_bytes: int = Field(..., description="Package size in bytes")
+
 class UpdateCheckResponse(BaseModel):
     update_available: bool = Field(False, description="Whether update is available")
     latest_version: Optional[str] = Field(None, description="Latest version")
-    download_url: Optional[str] = Field(None, description="Download URL")
+    download_url: Optional[str] = Field(None, description="Absolute URL of the full installer")
     release_notes: Optional[str] = Field(None, description="Release notes")
     force_update: bool = Field(False, description="Whether update is forced")
+    packages: List[UpdatePackage] = Field(default_factory=list, description="Packages to download and apply in order")
+    retry_after_seconds: Optional[int] = Field(None, description="Download slots are full; check again after this many seconds")
 
 class AgentConfigResponse(BaseModel):
     heartbeat_interval: int = Field(15, description="Heartbeat interval in minutes")
@@ -55,6 +137,30 @@ class AgentConfigResponse(BaseModel):
     max_retry_attempts: int = Field(3, description="Max retry attempts")
     retry_delay_seconds: int = Field(30, description="Retry delay in seconds")
 
+class JobCreateRequest(BaseModel):
+    job_type: Literal["sync", "update", "config"] = Field(..., description="Job type")
+    payload: Optional[Dict[str, Any]] = Field(None, description="Job payload")
+
+class JobStatusUpdate(BaseModel):
+    status: Literal["running", "completed", "failed"] = Field(..., description="New job status")
+    result: Optional[Dict[str, Any]] = Field(None, description="Job result")
+    error_message: Optional[str] = Field(None, description="Error message")
+
+class JobInfo(BaseModel):
+    id: int
+    agent_guid: str
+    job_type: str
+    status: str
+    payload: Optional[Dict[str, Any]]
+    created_at: Optional[datetime]
+    delivered_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class JobPollResponse(BaseModel):
+    jobs: List[JobInfo] = Field(default_factory=list, description="Jobs assigned to the agent")
+
 class AgentInfo(BaseModel):
     id: int
     agent_guid: str
@@ -0,0 +1,154 @@
+from pydantic import BaseModel, Field, PrivateAttr, TypeAdapter, model_validator
+from typing import Optional, Dict, Any, List
+from datetime import datetime
+import hashlib
+from app.core.codec import canonical_dumps
+
+# Mirrors agent/MeldenIT.Agent.Core/Models/InventoryData.cs. Defaults follow
+# the agent's property initialisers; unknown keys are ignored here but kept
+# in the stored payload (see InventoryData.as_dict).
+
+class DeviceIdentity(BaseModel):
+    hostname: str = Field("", description="Hostname")
+    domain: str = Field("", description="Domain")
+    ou: Optional[str] = Field(None, description="Organisational unit")
+    sid: Optional[str] = Field(None, description="Machine SID")
+    uuid: str = Field("", description="SMBIOS UUID")
+    serial_number: str = Field("", description="Serial number")
+    asset_tag: Optional[str] = Field(None, description="Asset tag")
+    logged_in_user: Optional[str] = Field(None, description="Interactive user")
+
+class CpuInfo(BaseModel):
+    name: str = Field("", description="CPU name")
+    cores: int = Field(0, description="Physical cores")
+    logical_processors: int = Field(0, description="Logical processors")
+    max_clock_speed: int = Field(0, ge=0, description="Maximum clock speed in MHz")
+
+class MemorySlot(BaseModel):
+    capacity_gb: float = Field(0.0, description="Module capacity in GB")
+    speed_mhz: int = Field(0, ge=0, description="Module speed in MHz")
+    manufacturer: Optional[str] = Field(None, description="Module manufacturer")
+    part_number: Optional[str] = Field(None, description="Module part number")
+
+class MemoryInfo(BaseModel):
+    total_gb: float = Field(0.0, description="Installed memory in GB")
+    slots: List[MemorySlot] = Field(default_factory=list, description="Memory modules")
+
+class PartitionInfo(BaseModel):
+    drive_letter: Optional[str] = Field(None, description="Drive letter")
+    size_gb: float = Field(0.0, description="Partition size in GB")
+    free_space_gb: float = Field(0.0, description="Free space in GB")
+    file_system: str = Field("", description="File system")
+
+class DiskInfo(BaseModel):
+    model: str = Field("", description="Disk model")
+    capacity_gb: float = Field(0.0, description="Disk capacity in GB")
+    type: str = Field("", description="Disk type (SSD, HDD, NVMe)")
+    partitions: List[PartitionInfo] = Field(default_factory=list, description="Partitions")
+
+class GpuInfo(BaseModel):
+    name: str = Field("", description="GPU name")
+    memory_mb: int = Field(0, ge=0, description="GPU memory in MB")
+    driver_version: Optional[str] = Field(None, description="Driver version")
+
+class HardwareInfo(BaseModel):
+    manufacturer: str = Field("", description="System manufacturer")
+    model: str = Field("", description="System model")
+    cpu: CpuInfo = Field(default_factory=CpuInfo, description="Processor")
+    memory: MemoryInfo = Field(default_factory=MemoryInfo, description="Memory")
+    disks: List[DiskInfo] = Field(default_factory=list, description="Physical disks")
+    gpu: Optional[GpuInfo] = Field(None, description="Graphics adapter")
+
+class InstalledSoftware(BaseModel):
+    name: str = Field("", description="Product name")
+    version: str = Field("", description="Product version")
+    publisher: Optional[str] = Field(None, description="Publisher")
+    install_date: Optional[datetime] = Field(None, description="Install date")
+
+_installed_software_list = TypeAdapter(List[InstalledSoftware])
+
+class SoftwareInfo(BaseModel):
+    os_name: str = Field("", description="Operating system name")
+    os_version: str = Field("", description="Operating system version")
+    os_build: str = Field("", description="Operating system build")
+    installed_software: List[Any] = Field(
+        default_factory=list,
+        description="Installed software; entries are validated on first use of installed()"
+    )
+    dotnet_versions: List[str] = Field(default_factory=list, description="Installed .NET versions")
+
+    _installed: Optional[List[InstalledSoftware]] = PrivateAttr(None)
+
+    def installed(self) -> List[InstalledSoftware]:
+        """Validated installed-software entries; raises ValidationError on a malformed entry"""
+        if self._installed is None:
+            self._installed = _installed_software_list.validate_python(self.installed_software)
+        return self._installed
+
+class NetworkAdapter(BaseModel):
+    name: str = Field("", description="Adapter name")
+    mac_address: str = Field("", description="MAC address")
+    connection_type: str = Field("", description="Connection type (Ethernet, WiFi, ...)")
+    is_connected: bool = Field(False, description="Whether the adapter is connected")
+
+class NetworkInfo(BaseModel):
+    adapters: List[NetworkAdapter] = Field(default_factory=list, description="Network adapters")
+    ipv4_addresses: List[str] = Field(default_factory=list, description="IPv4 addresses")
+    ipv6_addresses: List[str] = Field(default_factory=list, description="IPv6 addresses")
+    gateway: Optional[str] = Field(None, description="Default gateway")
+    dns_servers: List[str] = Field(default_factory=list, description="DNS servers")
+    wifi_ssid: Optional[str] = Field(None, description="Connected WiFi SSID")
+
+class BiosInfo(BaseModel):
+    name: str = Field("", description="BIOS name")
+    version: str = Field("", description="BIOS version")
+    release_date: Optional[datetime] = Field(None, description="BIOS release date")
+    tpm_enabled: bool = Field(False, description="Whether a TPM is enabled")
+    secure_boot: bool = Field(False, description="Whether Secure Boot is enabled")
+
+class UsageInfo(BaseModel):
+    uptime_hours: float = Field(0.0, description="Uptime in hours")
+    last_reboot: Optional[datetime] = Field(None, description="Last reboot time")
+    cpu_usage_avg: float = Field(0.0, description="Average CPU usage in percent")
+    memory_usage_avg: float = Field(0.0, description="Average memory usage in percent")
+    disk_io_avg: float = Field(0.0, description="Average disk I/O")
+
+class TaggingInfo(BaseModel):
+    location: Optional[str] = Field(None, description="Location")
+    site_code: str = Field("", description="Site code")
+    department: Optional[str] = Field(None, description="Department")
+    cost_center: Optional[str] = Field(None, description="Cost center")
+
+class InventoryData(BaseModel):
+    device_identity: DeviceIdentity = Field(default_factory=DeviceIdentity, description="Device identity")
+    hardware: HardwareInfo = Field(default_factory=HardwareInfo, description="Hardware")
+    software: SoftwareInfo = Field(default_factory=SoftwareInfo, description="Software")
+    network: NetworkInfo = Field(default_factory=NetworkInfo, description="Network")
+    bios: BiosInfo = Field(default_factory=BiosInfo, description="BIOS")
+    usage: UsageInfo = Field(default_factory=UsageInfo, description="Usage")
+    tagging: TaggingInfo = Field(default_factory=TaggingInfo, description="Tagging")
+    collected_at: Optional[datetime] = Field(None, description="Collection time")
+
+    _raw: Optional[Dict[str, Any]] = PrivateAttr(None)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _keep_raw(cls, data: Any, handler):
+        inventory = handler(data)
+        if isinstance(data, dict):
+            inventory._raw = data
+        return inventory
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The payload as the agent sent it, for storage without re-serialising"""
+        if self._raw is not None:
+            return self._raw
+        return self.model_dump(mode="json", exclude_unset=True)
+
+
+# Sections the agent hashes and uploads independently in a section sync
+SECTION_NAMES = ("device_identity", "hardware", "software", "network", "bios", "usage", "tagging")
+
+def section_hash(section: Any) -> str:
+    """SHA-256 hex digest of a section's canonical JSON (sorted keys, no whitespace, UTF-8)"""
+    return hashlib.sha256(canonical_dumps(section)).hexdigest()
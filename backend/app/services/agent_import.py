@@ -0,0 +1,108 @@
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import codec
+from app.core.metrics import registry
+from app.schemas.agent import AgentImportResult, AgentImportSummary, AgentRegistrationRequest
+from app.services.agent_service import AgentService
+
+logger = logging.getLogger(__name__)
+
+agents_imported = registry.counter(
+    "meldenit_agents_imported",
+    "Rows handled by bulk agent onboarding",
+    ("result",)
+)
+
+
+def _line(model) -> bytes:
+    return codec.dumps_bytes(model.model_dump(mode="json", exclude_none=True)) + b"\n"
+
+
+class AgentImport:
+    """Pre-registers agents in batches of one upsert each, as NDJSON result lines"""
+
+    def __init__(self, service: AgentService, batch_size: int):
+        self.service = service
+        self.batch_size = max(1, batch_size)
+        self.counts = {"created": 0, "updated": 0, "failed": 0}
+
+    async def run(self, items: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+        """Yield a result line per item as each batch commits, then a summary line"""
+        started = time.perf_counter()
+        batch: Dict[str, Tuple[int, AgentRegistrationRequest]] = {}
+        index = -1
+
+        async for raw in items:
+            index += 1
+            try:
+                request = AgentRegistrationRequest.model_validate(raw)
+            except ValidationError as e:
+                agent_guid = raw.get("agent_guid") if isinstance(raw, dict) else None
+                yield self._failed(index, agent_guid, f"Invalid row: {e.error_count()} validation errors")
+                continue
+
+            # One upsert cannot touch the same agent twice
+            if request.agent_guid in batch or len(batch) >= self.batch_size:
+                for line in await self._flush(batch):
+                    yield line
+            batch[request.agent_guid] = (index, request)
+
+        for line in await self._flush(batch):
+            yield line
+
+        seconds = time.perf_counter() - started
+        summary = AgentImportSummary(
+            processed=index + 1,
+            **self.counts,
+            seconds=round(seconds, 3),
+            rows_per_second=round((index + 1) / seconds, 1) if seconds > 0 else 0.0
+        )
+        logger.info("Imported %s agents (%s created, %s updated, %s failed) at %s rows/s",
+                    summary.processed, summary.created, summary.updated, summary.failed,
+                    summary.rows_per_second)
+        yield _line(summary)
+
+    async def _flush(self, batch: Dict[str, Tuple[int, AgentRegistrationRequest]]) -> List[bytes]:
+        if not batch:
+            return []
+        pending = list(batch.values())
+        batch.clear()
+
+        try:
+            agents = await self.service.register_agents([request for _, request in pending])
+        except SQLAlchemyError as e:
+            await self.service.db.rollback()
+            logger.error("Agent import batch of %s rejected: %s", len(pending), e)
+            return [self._failed(index, request.agent_guid, "Batch rejected by the database")
+                    for index, request in pending]
+
+        by_guid = {agent.agent_guid: agent for agent in agents}
+        lines = []
+        for index, request in pending:
+            agent = by_guid[request.agent_guid]
+            result = "created" if agent.created else "updated"
+            self.counts[result] += 1
+            agents_imported.labels(result).inc()
+            lines.append(_line(AgentImportResult(
+                index=index,
+                agent_guid=agent.agent_guid,
+                status="success",
+                device_token=agent.device_token,
+                created=agent.created
+            )))
+        return lines
+
+    def _failed(self, index: int, agent_guid: Any, message: str) -> bytes:
+        self.counts["failed"] += 1
+        agents_imported.labels("failed").inc()
+        return _line(AgentImportResult(
+            index=index,
+            agent_guid=agent_guid if isinstance(agent_guid, str) else None,
+            status="error",
+            message=message
+        ))
@@ -1,17 +1,34 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from app.models.agent import Agent, Heartbeat, Inventory, Job, AuditLog
+from sqlalchemy import Boolean, func, literal_column, select, update, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from fastapi.concurrency import run_in_threadpool
+from app.models.agent import Agent, Heartbeat, Inventory, InventorySection, Job, AuditLog, RevokedToken
 from app.schemas.agent import (
     AgentRegistrationRequest, AgentRegistrationResponse,
     HeartbeatRequest, HeartbeatResponse,
     InventorySyncRequest, InventorySyncResponse,
+    SectionHashes, SectionNegotiationResponse, SectionUploadRequest, SectionUploadResponse,
     UpdateCheckRequest, UpdateCheckResponse,
-    AgentConfigResponse
+    AgentConfigResponse, DeviceTokenResponse, BatchItemResult,
+    UpdatePackage
 )
+from app.schemas.inventory import InventoryData, SECTION_NAMES, section_hash
+from app.core import codec
 from app.core.config import settings
+from app.core.idempotency import derive_key, idempotency_cache, idempotent_replays
+from app.core.security import (
+    DeviceClaims, create_device_token, read_token_claims, revocation_list, token_needs_renewal
+)
+from app.core.tracing import traced
+from app.services.rollout import parse_version, rollout_policy, download_leases
+from app.services.update_store import update_store
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import logging
-import secrets
+import math
 
 logger = logging.getLogger(__name__)
 
@@ -19,52 +36,12 @@ class AgentService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    @traced("AgentService.register_agent")
     async def register_agent(self, request: AgentRegistrationRequest) -> AgentRegistrationResponse:
         """Register a new agent"""
-        logger.info(f"Registering agent {request.agent_guid}")
+        logger.info("Registering agent %s", request.agent_guid)
         
-        # Check if agent already exists
-        result = await self.db.execute(
-            select(Agent).where(Agent.agent_guid == request.agent_guid)
-        )
-        existing_agent = result.scalar_one_or_none()
-        
-        if existing_agent:
-            # Update existing agent
-            existing_agent.hostname = request.hostname
-            existing_agent.serial_number = request.serial
-            existing_agent.domain = request.domain
-            existing_agent.site_code = request.site_code
-            existing_agent.version = request.version
-            existing_agent.updated_at = datetime.utcnow()
-            agent = existing_agent
-        else:
-            # Create new agent
-            device_token = secrets.token_urlsafe(32)
-            agent = Agent(
-                agent_guid=request.agent_guid,
-                hostname=request.hostname,
-                serial_number=request.serial,
-                domain=request.domain,
-                site_code=request.site_code,
-                device_token=device_token,
-                version=request.version,
-                status="active",
-                is_online=True
-            )
-            self.db.add(agent)
-        
-        await self.db.commit()
-        await self.db.refresh(agent)
-        
-        # Log audit
-        await self._log_audit(
-            agent_id=agent.id,
-            agent_guid=agent.agent_guid,
-            action="agent_registered",
-            resource_type="agent",
-            resource_id=str(agent.id)
-        )
+        agent = (await self.register_agents([request]))[0]
         
         # Create policy response
         policy = {
@@ -80,9 +57,75 @@ class AgentService:
             policy=policy
         )
 
-    async def send_heartbeat(self, request: HeartbeatRequest) -> HeartbeatResponse:
-        """Process agent heartbeat"""
-        logger.debug(f"Processing heartbeat for agent {request.agent_guid}")
+    @traced("AgentService.register_agents")
+    async def register_agents(self, requests: List[AgentRegistrationRequest]) -> List[Row]:
+        """Insert or update agents with fresh device tokens: one upsert, one commit.
+
+        agent_guids must be unique within a call. Returns a row per agent
+        (id, agent_guid, device_token, previous_token, created); created is
+        true for agents the upsert inserted.
+        """
+        upsert = pg_insert(Agent).values([
+            dict(
+                agent_guid=request.agent_guid,
+                hostname=request.hostname,
+                serial_number=request.serial,
+                domain=request.domain,
+                site_code=request.site_code,
+                device_token=create_device_token(request.agent_guid, request.site_code),
+                version=request.version,
+                status="active",
+                is_online=True
+            )
+            for request in requests
+        ])
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[Agent.agent_guid],
+            set_={
+                **{name: upsert.excluded[name] for name in (
+                    "hostname", "serial_number", "domain", "site_code", "version", "device_token"
+                )},
+                "updated_at": func.now()
+            }
+        ).returning(
+            Agent.id, Agent.agent_guid, Agent.device_token,
+            # Rows ON CONFLICT updated carry this transaction in xmax; inserted rows have 0
+            literal_column("xmax = 0", Boolean).label("created")
+        ).cte("upserted")
+        
+        # The outer query reads the snapshot from before the upsert, so the
+        # joined row still holds the token being replaced
+        result = await self.db.execute(
+            select(upsert.c.id, upsert.c.agent_guid, upsert.c.device_token,
+                   Agent.device_token.label("previous_token"), upsert.c.created)
+            .outerjoin(Agent, Agent.agent_guid == upsert.c.agent_guid)
+        )
+        agents = result.all()
+        
+        revoked = []
+        for agent in agents:
+            # Re-registration replaces the previous token
+            if agent.previous_token:
+                revoked.append(self._revoke_token(agent.agent_guid, agent.previous_token))
+            self.db.add(AuditLog(
+                agent_id=agent.id,
+                agent_guid=agent.agent_guid,
+                action="agent_registered",
+                resource_type="agent",
+                resource_id=str(agent.id)
+            ))
+        await self.db.commit()
+        
+        # Only tokens whose revocation was committed are refused in memory
+        for token in filter(None, revoked):
+            revocation_list.add(token.jti, token.expires_at)
+        return agents
+
+    @traced("AgentService.send_heartbeat")
+    async def send_heartbeat(self, request: HeartbeatRequest,
+                             presented_token: Optional[str] = None) -> HeartbeatResponse:
+        """Process agent heartbeat, renewing the presented device token when due"""
+        logger.debug("Processing heartbeat for agent %s", request.agent_guid)
         
         # Get agent
         result = await self.db.execute(
@@ -91,7 +134,7 @@ class AgentService:
         agent = result.scalar_one_or_none()
         
         if not agent:
-            logger.warning(f"Agent {request.agent_guid} not found")
+            logger.warning("Agent %s not found", request.agent_guid)
             return HeartbeatResponse(
                 status="error",
                 message="Agent not found"
@@ -113,17 +156,39 @@ class AgentService:
         )
         self.db.add(heartbeat)
         
+        # A signed token is left to expire rather than revoked, so an agent
+        # that never receives this response can still renew next time. An
+        # opaque token stops matching the stored one here: if this response
+        # is lost, that agent gets a signed token only by re-registering.
+        renewed_token = None
+        if token_needs_renewal(presented_token, agent.agent_guid, agent.device_token):
+            renewed_token = create_device_token(agent.agent_guid, agent.site_code)
+            agent.device_token = renewed_token
+            logger.info("Renewing device token for agent %s", agent.agent_guid)
+        
         await self.db.commit()
         
         return HeartbeatResponse(
             status="success",
             message="Heartbeat received",
-            config_updated=False
+            config_updated=False,
+            device_token=renewed_token
         )
 
-    async def sync_inventory(self, request: InventorySyncRequest) -> InventorySyncResponse:
-        """Process inventory sync"""
-        logger.info(f"Processing {request.sync_type} inventory sync for agent {request.agent_guid}")
+    @traced("AgentService.sync_inventory")
+    async def sync_inventory(self, request: InventorySyncRequest,
+                             idempotency_key: Optional[str] = None) -> InventorySyncResponse:
+        """Process inventory sync; a retry of an earlier sync gets its response"""
+        fingerprint = None
+        if request.inventory.collected_at is not None:
+            fingerprint = codec.dumps_bytes(request.inventory.as_dict())
+        key = derive_key(request.agent_guid, idempotency_key, fingerprint)
+        return await idempotency_cache.run(
+            key, lambda: self._sync_inventory(request, key), _succeeded
+        )
+
+    async def _sync_inventory(self, request: InventorySyncRequest, key: Optional[str]) -> InventorySyncResponse:
+        logger.info("Processing %s inventory sync for agent %s", request.sync_type, request.agent_guid)
         
         # Get agent
         result = await self.db.execute(
@@ -132,7 +197,7 @@ class AgentService:
         agent = result.scalar_one_or_none()
         
         if not agent:
-            logger.warning(f"Agent {request.agent_guid} not found")
+            logger.warning("Agent %s not found", request.agent_guid)
             return InventorySyncResponse(
                 status="error",
                 message="Agent not found"
@@ -143,15 +208,23 @@ class AgentService:
             agent_id=agent.id,
             agent_guid=agent.agent_guid,
             sync_type=request.sync_type,
-            inventory_data=request.inventory,
-            synced_at=datetime.utcnow()
+            inventory_data=request.inventory.as_dict(),
+            synced_at=datetime.utcnow(),
+            idempotency_key=key
         )
         self.db.add(inventory)
         
         # Update agent last sync
         agent.last_sync = datetime.utcnow()
         
-        await self.db.commit()
+        agent_id = agent.id
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            stored = await self._stored_inventory(agent_id, key)
+            if stored is None:
+                raise
+            return InventorySyncResponse(**_replayed(stored))
         
         # TODO: Integrate with Snipe-IT
         snipeit_updated = await self._sync_to_snipeit(agent, request.inventory)
@@ -175,9 +248,283 @@ class AgentService:
             next_sync=datetime.utcnow() + timedelta(minutes=settings.AGENT_DELTA_SYNC_INTERVAL)
         )
 
-    async def check_for_updates(self, request: UpdateCheckRequest) -> UpdateCheckResponse:
+    @traced("AgentService.negotiate_sections")
+    async def negotiate_sections(self, request: SectionHashes) -> SectionNegotiationResponse:
+        """First phase of a section sync: which sections differ from the stored ones"""
+        result = await self.db.execute(
+            select(InventorySection.section, InventorySection.content_hash)
+            .where(InventorySection.agent_guid == request.agent_guid)
+        )
+        stored = dict(result.all())
+        missing = [name for name, digest in request.hashes.items() if stored.get(name) != digest]
+        
+        if not missing:
+            # Nothing changed; the sync is complete without an upload
+            await self.db.execute(
+                update(Agent).where(Agent.agent_guid == request.agent_guid).values(last_sync=datetime.utcnow())
+            )
+            await self.db.commit()
+        
+        return SectionNegotiationResponse(status="success", missing=missing)
+
+    @traced("AgentService.sync_sections")
+    async def sync_sections(self, request: SectionUploadRequest,
+                            idempotency_key: Optional[str] = None) -> SectionUploadResponse:
+        """Second phase of a section sync: store the uploaded sections"""
+        fingerprint = None
+        if request.collected_at is not None:
+            fingerprint = codec.canonical_dumps(
+                {"collected_at": request.collected_at.isoformat(), "hashes": request.hashes}
+            )
+        key = derive_key(request.agent_guid, idempotency_key, fingerprint)
+        return await idempotency_cache.run(
+            key, lambda: self._sync_sections(request, key), _succeeded
+        )
+
+    async def _sync_sections(self, request: SectionUploadRequest, key: Optional[str]) -> SectionUploadResponse:
+        logger.info("Processing section sync for agent %s", request.agent_guid)
+        
+        result = await self.db.execute(
+            select(Agent).where(Agent.agent_guid == request.agent_guid)
+        )
+        agent = result.scalar_one_or_none()
+        
+        if not agent:
+            logger.warning("Agent %s not found", request.agent_guid)
+            return SectionUploadResponse(status="error", message="Agent not found")
+        
+        uploaded = {
+            name: data for name, data in request.sections.as_dict().items()
+            if name in SECTION_NAMES
+        }
+        mismatched = [name for name, data in uploaded.items() if section_hash(data) != request.hashes.get(name)]
+        if mismatched:
+            return SectionUploadResponse(
+                status="error",
+                message="Section hash mismatch",
+                missing=mismatched
+            )
+        
+        result = await self.db.execute(
+            select(InventorySection).where(InventorySection.agent_id == agent.id)
+        )
+        stored = {row.section: (row.content_hash, row.data) for row in result.scalars()}
+        if uploaded:
+            # Upsert, so two uploads racing for a new agent's sections both
+            # succeed instead of one hitting the unique constraint
+            upsert = pg_insert(InventorySection).values([
+                dict(agent_id=agent.id, agent_guid=agent.agent_guid, section=name,
+                     content_hash=request.hashes[name], data=data)
+                for name, data in uploaded.items()
+            ])
+            await self.db.execute(upsert.on_conflict_do_update(
+                index_elements=[InventorySection.agent_id, InventorySection.section],
+                set_={"content_hash": upsert.excluded.content_hash, "data": upsert.excluded.data,
+                      "updated_at": func.now()}
+            ))
+            stored.update((name, (request.hashes[name], data)) for name, data in uploaded.items())
+        
+        missing = [
+            name for name, digest in request.hashes.items()
+            if name not in stored or stored[name][0] != digest
+        ]
+        if missing:
+            # Keep what arrived so the retry only needs the rest
+            await self.db.commit()
+            return SectionUploadResponse(
+                status="incomplete",
+                message="Sections missing on the server",
+                missing=missing
+            )
+        
+        # History keeps only what changed; the latest full inventory is
+        # the set of stored sections
+        now = datetime.utcnow()
+        changes = dict(uploaded)
+        if request.collected_at is not None:
+            changes["collected_at"] = request.collected_at.isoformat()
+        inventory = Inventory(
+            agent_id=agent.id,
+            agent_guid=agent.agent_guid,
+            sync_type="sections",
+            inventory_data=changes,
+            synced_at=now,
+            idempotency_key=key
+        )
+        self.db.add(inventory)
+        agent.last_sync = now
+        agent_id = agent.id
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            stored = await self._stored_inventory(agent_id, key)
+            if stored is None:
+                raise
+            return SectionUploadResponse(**_replayed(stored))
+        
+        full = {name: stored[name][1] for name in request.hashes}
+        full["collected_at"] = changes.get("collected_at")
+        snipeit_updated = await self._sync_to_snipeit(agent, InventoryData.model_validate(full))
+        inventory.snipeit_updated = snipeit_updated
+        await self.db.commit()
+        
+        await self._log_audit(
+            agent_id=agent.id,
+            agent_guid=agent.agent_guid,
+            action="inventory_synced",
+            resource_type="inventory",
+            resource_id=str(inventory.id),
+            details={"sync_type": "sections", "sections": sorted(uploaded), "snipeit_updated": snipeit_updated}
+        )
+        
+        return SectionUploadResponse(
+            status="success",
+            message="Inventory synced successfully",
+            snipeit_updated=snipeit_updated,
+            next_sync=now + timedelta(minutes=settings.AGENT_DELTA_SYNC_INTERVAL)
+        )
+
+    @traced("AgentService.send_heartbeats_batch")
+    async def send_heartbeats_batch(self, items: List[Tuple[int, HeartbeatRequest]]) -> List[BatchItemResult]:
+        """Process heartbeats from many agents in one transaction"""
+        if not items:
+            return []
+        
+        logger.debug("Processing heartbeat batch of %s items", len(items))
+        
+        agents = await self._get_agents([item.agent_guid for _, item in items])
+        now = datetime.utcnow()
+        
+        results = []
+        heartbeat_rows = []
+        agent_rows = {}
+        for index, item in items:
+            agent = agents.get(item.agent_guid)
+            if not agent:
+                results.append(self._batch_error(index, item.agent_guid, "Agent not found"))
+                continue
+            
+            heartbeat_rows.append({
+                "agent_id": agent.id,
+                "agent_guid": agent.agent_guid,
+                "status": item.status,
+                "version": item.version,
+                "last_sync": item.last_sync,
+                "received_at": now
+            })
+            # Last item wins when an agent appears more than once
+            agent_rows[agent.id] = {
+                "id": agent.id,
+                "last_heartbeat": now,
+                "is_online": True,
+                "status": item.status,
+                "version": item.version
+            }
+            results.append(BatchItemResult(
+                index=index,
+                agent_guid=item.agent_guid,
+                status="success",
+                message="Heartbeat received"
+            ))
+        
+        if heartbeat_rows:
+            await self.db.execute(insert(Heartbeat), heartbeat_rows)
+            await self.db.execute(update(Agent), list(agent_rows.values()))
+            await self.db.commit()
+        
+        return results
+
+    @traced("AgentService.sync_inventory_batch")
+    async def sync_inventory_batch(self, items: List[Tuple[int, InventorySyncRequest]]) -> List[BatchItemResult]:
+        """Process delta inventories from many agents in one transaction"""
+        if not items:
+            return []
+        
+        logger.info("Processing inventory batch of %s items", len(items))
+        
+        agents = await self._get_agents([item.agent_guid for _, item in items])
+        
+        results = []
+        pending = []
+        for index, item in items:
+            agent = agents.get(item.agent_guid)
+            if item.sync_type != "delta":
+                results.append(self._batch_error(index, item.agent_guid, "Sync type must be 'delta'"))
+            elif not agent:
+                results.append(self._batch_error(index, item.agent_guid, "Agent not found"))
+            else:
+                pending.append((index, item, agent))
+        
+        if not pending:
+            return results
+        
+        now = datetime.utcnow()
+        inventory_rows = [
+            {
+                "agent_id": agent.id,
+                "agent_guid": agent.agent_guid,
+                "sync_type": item.sync_type,
+                "inventory_data": item.inventory.as_dict(),
+                "synced_at": now,
+                "snipeit_updated": False
+            }
+            for _, item, agent in pending
+        ]
+        inventory_ids = (await self.db.scalars(
+            insert(Inventory).returning(Inventory.id, sort_by_parameter_order=True),
+            inventory_rows
+        )).all()
+        
+        await self.db.execute(
+            update(Agent),
+            [{"id": agent_id, "last_sync": now} for agent_id in {agent.id for _, _, agent in pending}]
+        )
+        await self.db.commit()
+        
+        # Snipe-IT is only told about inventories that were stored; the calls
+        # are network bound, so they run side by side
+        semaphore = asyncio.Semaphore(settings.BATCH_SNIPEIT_CONCURRENCY)
+        
+        async def push(agent: Agent, inventory: InventoryData) -> bool:
+            async with semaphore:
+                return await self._sync_to_snipeit(agent, inventory)
+        
+        snipeit_flags = await asyncio.gather(
+            *(push(agent, item.inventory) for _, item, agent in pending)
+        )
+        
+        updated = [{"id": inventory_id, "snipeit_updated": True}
+                   for inventory_id, snipeit_updated in zip(inventory_ids, snipeit_flags) if snipeit_updated]
+        if updated:
+            await self.db.execute(update(Inventory), updated)
+        await self.db.execute(insert(AuditLog), [
+            {
+                "agent_id": agent.id,
+                "agent_guid": agent.agent_guid,
+                "action": "inventory_synced",
+                "resource_type": "inventory",
+                "resource_id": str(inventory_id),
+                "details": {"sync_type": item.sync_type, "snipeit_updated": snipeit_updated, "batch": True}
+            }
+            for (_, item, agent), inventory_id, snipeit_updated in zip(pending, inventory_ids, snipeit_flags)
+        ])
+        await self.db.commit()
+        
+        for index, item, _ in pending:
+            results.append(BatchItemResult(
+                index=index,
+                agent_guid=item.agent_guid,
+                status="success",
+                message="Inventory synced successfully"
+            ))
+        
+        return results
+
+    @traced("AgentService.check_for_updates")
+    async def check_for_updates(self, request: UpdateCheckRequest,
+                                site_code: Optional[str] = None) -> UpdateCheckResponse:
         """Check for agent updates"""
-        logger.debug(f"Checking for updates for agent {request.agent_guid}")
+        logger.debug("Checking for updates for agent %s", request.agent_guid)
         
         if not settings.UPDATE_CHECK_ENABLED:
             return UpdateCheckResponse(update_available=False)
@@ -185,15 +532,58 @@ class AgentService:
         current_version = request.current_version
         latest_version = settings.LATEST_VERSION
         
-        # Simple version comparison (in production, use proper semver)
-        update_available = current_version != latest_version
+        latest = parse_version(latest_version)
+        if latest is None:
+            logger.error("LATEST_VERSION %r is not a valid version", latest_version)
+            return UpdateCheckResponse(update_available=False)
+        
+        # Agents reporting something unparseable are assumed to be outdated
+        current = parse_version(current_version)
+        update_available = current is None or current < latest
+        
+        if not update_available:
+            await download_leases.release(request.agent_guid)
+            return UpdateCheckResponse(update_available=False)
+        
+        eligible = rollout_policy.is_eligible(request.agent_guid, latest_version, site_code)
+        if not eligible and site_code is None and rollout_policy.pilot_sites:
+            # Without device auth there are no token claims to name the site
+            site_code = await self._get_site_code(request.agent_guid)
+            eligible = rollout_policy.is_eligible(request.agent_guid, latest_version, site_code)
+        if not eligible:
+            return UpdateCheckResponse(update_available=False)
+        
+        # Agents that only look at update_available must not start downloading
+        retry_after = await download_leases.acquire(request.agent_guid)
+        if retry_after:
+            return UpdateCheckResponse(
+                update_available=False,
+                latest_version=latest_version,
+                retry_after_seconds=max(1, math.ceil(retry_after))
+            )
+        
+        # download_url stays the full installer for agents that only know
+        # it; the smallest package chain the store can serve is in packages
+        await run_in_threadpool(update_store.refresh_if_stale)
+        packages = [
+            UpdatePackage(
+                package_type=artifact.kind,
+                from_version=artifact.from_version,
+                to_version=artifact.to_version,
+                url=f"/api/v1/update/download/{artifact.name}",
+                sha256=artifact.sha256,
+                size_bytes=artifact.size
+            )
+            for artifact in update_store.best_route(current_version, latest_version)
+        ]
         
         return UpdateCheckResponse(
-            update_available=update_available,
-            latest_version=latest_version if update_available else None,
-            download_url=settings.UPDATE_DOWNLOAD_URL if update_available else None,
-            release_notes="Bug fixes and improvements" if update_available else None,
-            force_update=False
+            update_available=True,
+            latest_version=latest_version,
+            download_url=settings.UPDATE_DOWNLOAD_URL,
+            release_notes="Bug fixes and improvements",
+            force_update=False,
+            packages=packages
         )
 
     async def get_agent_config(self, agent_guid: str) -> AgentConfigResponse:
@@ -206,7 +596,86 @@ class AgentService:
             retry_delay_seconds=settings.AGENT_RETRY_DELAY_SECONDS
         )
 
-    async def _sync_to_snipeit(self, agent: Agent, inventory_data: dict) -> bool:
+    @traced("AgentService.rotate_device_token")
+    async def rotate_device_token(self, claims: DeviceClaims) -> Optional[DeviceTokenResponse]:
+        """Issue a new device token and revoke the one used for the request"""
+        result = await self.db.execute(
+            select(Agent).where(Agent.agent_guid == claims.agent_guid)
+        )
+        agent = result.scalar_one_or_none()
+        
+        if not agent:
+            logger.warning("Agent %s not found", claims.agent_guid)
+            return None
+        
+        self.db.add(RevokedToken(
+            jti=claims.jti,
+            agent_guid=claims.agent_guid,
+            expires_at=claims.expires_at
+        ))
+        
+        agent.device_token = create_device_token(agent.agent_guid, agent.site_code)
+        await self.db.commit()
+        revocation_list.add(claims.jti, claims.expires_at)
+        
+        await self._log_audit(
+            agent_id=agent.id,
+            agent_guid=agent.agent_guid,
+            action="device_token_rotated",
+            resource_type="agent",
+            resource_id=str(agent.id)
+        )
+        
+        return DeviceTokenResponse(device_token=agent.device_token)
+
+    @traced("AgentService._get_agents")
+    async def _get_agents(self, agent_guids: List[str]) -> Dict[str, Agent]:
+        """Load many agents with one query, keyed by GUID"""
+        result = await self.db.execute(
+            select(Agent).where(Agent.agent_guid.in_(set(agent_guids)))
+        )
+        return {agent.agent_guid: agent for agent in result.scalars()}
+
+    async def _get_site_code(self, agent_guid: str) -> Optional[str]:
+        """The site an agent registered with, or None if it is unknown"""
+        result = await self.db.execute(
+            select(Agent.site_code).where(Agent.agent_guid == agent_guid)
+        )
+        return result.scalar_one_or_none()
+
+    def _batch_error(self, index: int, agent_guid: str, message: str) -> BatchItemResult:
+        return BatchItemResult(index=index, agent_guid=agent_guid, status="error", message=message)
+
+    def _revoke_token(self, agent_guid: str, token: str) -> Optional[RevokedToken]:
+        """Stage the revocation of a previously issued signed token; None for opaque tokens"""
+        claims = read_token_claims(token)
+        if not claims or "jti" not in claims:
+            return None
+        
+        revoked = RevokedToken(
+            jti=claims["jti"],
+            agent_guid=agent_guid,
+            expires_at=datetime.utcfromtimestamp(claims["exp"])
+        )
+        self.db.add(revoked)
+        return revoked
+
+    async def _stored_inventory(self, agent_id: int, key: Optional[str]) -> Optional[Inventory]:
+        """After a failed inventory insert: the row an earlier request with the same key stored"""
+        await self.db.rollback()
+        if key is None:
+            return None
+        result = await self.db.execute(
+            select(Inventory).where(Inventory.agent_id == agent_id, Inventory.idempotency_key == key)
+        )
+        stored = result.scalar_one_or_none()
+        if stored is not None:
+            logger.info("Inventory upload for agent %s is a retry of inventory %s", stored.agent_guid, stored.id)
+            idempotent_replays.labels("database").inc()
+        return stored
+
+    @traced("AgentService._sync_to_snipeit")
+    async def _sync_to_snipeit(self, agent: Agent, inventory_data: InventoryData) -> bool:
         """Sync inventory data to Snipe-IT"""
         try:
             from app.services.snipeit_service import SnipeItService
@@ -215,9 +684,10 @@ class AgentService:
             return await snipeit_service.sync_inventory_to_snipeit(agent.agent_guid, inventory_data)
             
         except Exception as e:
-            logger.error(f"Error syncing to Snipe-IT: {e}")
+            logger.error("Error syncing to Snipe-IT: %s", e)
             return False
 
+    @traced("AgentService._log_audit")
     async def _log_audit(self, agent_id: int, agent_guid: str, action: str, 
                         resource_type: str, resource_id: str = None, 
                         details: dict = None):
@@ -232,3 +702,17 @@ class AgentService:
         )
         self.db.add(audit_log)
         await self.db.commit()
+
+
+def _succeeded(response) -> bool:
+    return response.status == "success"
+
+
+def _replayed(stored: Inventory) -> dict:
+    """Fields of the success response originally given for a stored inventory"""
+    return dict(
+        status="success",
+        message="Inventory synced successfully",
+        snipeit_updated=bool(stored.snipeit_updated),
+        next_sync=stored.synced_at + timedelta(minutes=settings.AGENT_DELTA_SYNC_INTERVAL)
+    )
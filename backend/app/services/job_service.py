@@ -0,0 +1,96 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
+from app.models.agent import Agent, Job, AuditLog
+from app.schemas.agent import JobInfo, JobCreateRequest, JobStatusUpdate
+from app.core.push import push_hub
+from datetime import datetime
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class JobService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_job(self, agent_guid: str, request: JobCreateRequest) -> Optional[JobInfo]:
+        """Create a job and push it to the agent if it is connected"""
+        result = await self.db.execute(
+            select(Agent.id).where(Agent.agent_guid == agent_guid)
+        )
+        agent_id = result.scalar_one_or_none()
+
+        if agent_id is None:
+            logger.warning("Agent %s not found", agent_guid)
+            return None
+
+        job = Job(
+            agent_id=agent_id,
+            agent_guid=agent_guid,
+            job_type=request.job_type,
+            status="pending",
+            payload=request.payload
+        )
+        self.db.add(job)
+        self.db.add(AuditLog(
+            agent_id=agent_id,
+            agent_guid=agent_guid,
+            action="job_created",
+            resource_type="job",
+            details={"job_type": request.job_type}
+        ))
+        await self.db.commit()
+        await self.db.refresh(job)
+
+        job_info = JobInfo.model_validate(job)
+        await push_hub.publish(agent_guid, job_message(job_info))
+
+        logger.info("Created %s job %s for agent %s", request.job_type, job.id, agent_guid)
+        return job_info
+
+    async def get_pending_jobs(self, agent_guid: str) -> List[JobInfo]:
+        """Get jobs the agent has not picked up yet"""
+        result = await self.db.execute(
+            select(Job)
+            .where(Job.agent_guid == agent_guid, Job.status == "pending")
+            .order_by(Job.id)
+        )
+        return [JobInfo.model_validate(job) for job in result.scalars()]
+
+    async def mark_delivered(self, agent_guid: str, job_ids: List[int]) -> None:
+        """Record the first time each job was sent to its agent"""
+        if not job_ids:
+            return
+        await self.db.execute(
+            update(Job)
+            .where(Job.id.in_(job_ids), Job.agent_guid == agent_guid, Job.delivered_at.is_(None))
+            .values(delivered_at=func.now())
+        )
+        await self.db.commit()
+
+    async def update_job_status(self, agent_guid: str, job_id: int, update: JobStatusUpdate) -> Optional[JobInfo]:
+        """Record progress reported by the agent"""
+        result = await self.db.execute(
+            select(Job).where(Job.id == job_id, Job.agent_guid == agent_guid)
+        )
+        job = result.scalar_one_or_none()
+
+        if not job:
+            return None
+
+        now = datetime.utcnow()
+        job.status = update.status
+        if update.status == "running":
+            job.started_at = now
+        else:
+            job.completed_at = now
+            job.result = update.result
+            job.error_message = update.error_message
+
+        await self.db.commit()
+        return JobInfo.model_validate(job)
+
+
+def job_message(job: JobInfo) -> dict:
+    """Wire format for jobs pushed over the channel"""
+    return {"type": "job", "job": job.model_dump(mode="json")}
@@ -0,0 +1,253 @@
+import hashlib
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import lru_cache, total_ordering
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_VERSION_RE = re.compile(
+    r"^v?(?P<release>\d+(?:\.\d+){0,3})"
+    r"(?:-(?P<prerelease>[0-9A-Za-z.-]+))?"
+    r"(?:\+[0-9A-Za-z.-]+)?$"
+)
+
+
+@total_ordering
+class Version:
+    """Semantic version; also accepts 4-part .NET assembly versions"""
+
+    __slots__ = ("release", "prerelease", "_key")
+
+    def __init__(self, release: Tuple[int, ...], prerelease: Tuple = ()):
+        self.release = release
+        self.prerelease = prerelease
+        # Releases sort after their prereleases; numeric identifiers sort
+        # before alphanumeric ones (semver section 11)
+        self._key = (
+            release,
+            not prerelease,
+            tuple((0, part, "") if isinstance(part, int) else (1, 0, part) for part in prerelease)
+        )
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Version) and self._key == other._key
+
+    def __lt__(self, other: "Version") -> bool:
+        return self._key < other._key
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __repr__(self) -> str:
+        text = ".".join(str(part) for part in self.release)
+        if self.prerelease:
+            text += "-" + ".".join(str(part) for part in self.prerelease)
+        return f"Version({text})"
+
+
+@lru_cache(maxsize=4096)
+def parse_version(text: str) -> Optional[Version]:
+    """Parse a version string; cached since the fleet reports few distinct versions"""
+    match = _VERSION_RE.match(text.strip()) if text else None
+    if not match:
+        return None
+
+    release = tuple(int(part) for part in match.group("release").split("."))
+    release += (0,) * (4 - len(release))
+
+    prerelease = ()
+    if match.group("prerelease"):
+        prerelease = tuple(
+            int(part) if part.isdigit() else part
+            for part in match.group("prerelease").split(".")
+        )
+    return Version(release, prerelease)
+
+
+class RolloutPolicy:
+    """Decides which agents are offered the latest version.
+
+    Agents are placed in a stable bucket 0-99 by hashing their GUID with
+    the target version. Rings open on a schedule: ring N (percent of
+    fleet) opens N * ring_hours after the rollout starts. Pilot sites are
+    always in the first ring.
+    """
+
+    def __init__(self, rings: List[int], ring_hours: float,
+                 started_at: Optional[datetime], pilot_sites: List[str]):
+        self.rings = sorted(min(100, max(0, ring)) for ring in rings) or [100]
+        self.ring_hours = ring_hours
+        self.started_at = started_at
+        self.pilot_sites = set(pilot_sites)
+
+    def current_percent(self, now: Optional[datetime] = None) -> int:
+        """Share of the fleet the rollout has reached"""
+        if self.started_at is None:
+            return 100
+
+        now = now or datetime.utcnow()
+        if now < self.started_at:
+            return 0
+        elapsed_hours = (now - self.started_at).total_seconds() / 3600
+        ring_index = min(int(elapsed_hours // self.ring_hours), len(self.rings) - 1) if self.ring_hours > 0 else -1
+        return self.rings[ring_index]
+
+    def is_eligible(self, agent_guid: str, version: str, site_code: Optional[str] = None,
+                    now: Optional[datetime] = None) -> bool:
+        if self.started_at is None:
+            return True
+        if site_code and site_code in self.pilot_sites and (now or datetime.utcnow()) >= self.started_at:
+            return True
+        return rollout_bucket(agent_guid, version) < self.current_percent(now)
+
+
+def rollout_bucket(agent_guid: str, version: str) -> int:
+    """Stable 0-99 bucket for an agent within one release"""
+    digest = hashlib.sha256(f"{version}:{agent_guid}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") % 100
+
+
+class DownloadLeases(ABC):
+    """Caps how many agents are told to download at the same time.
+
+    An agent holds a lease from the update check that granted it a
+    download until the lease expires or it reports the new version.
+    """
+
+    def __init__(self, max_concurrent: int, lease_seconds: float):
+        self.max_concurrent = max_concurrent
+        self.lease_seconds = lease_seconds
+        self.active = 0  # leases held when last checked
+        self.deferred = 0
+
+    async def acquire(self, agent_guid: str) -> float:
+        """Take or renew the agent's lease.
+
+        Returns 0.0 when granted, otherwise the seconds until a lease
+        frees up.
+        """
+        if self.max_concurrent <= 0:
+            return 0.0
+        try:
+            retry_after = await self._acquire(agent_guid)
+        except Exception as e:
+            # Fail open: a store outage must not stop updates altogether
+            logger.error("Download lease store error: %s", e)
+            return 0.0
+        if retry_after:
+            self.deferred += 1
+        return retry_after
+
+    @abstractmethod
+    async def _acquire(self, agent_guid: str) -> float:
+        """Take or renew a lease under the cap; see acquire()"""
+
+    @abstractmethod
+    async def release(self, agent_guid: str) -> None:
+        """Give up the agent's lease, if it holds one"""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryDownloadLeases(DownloadLeases):
+    """Leases held in this process, for single-replica deployments"""
+
+    def __init__(self, max_concurrent: int, lease_seconds: float,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(max_concurrent, lease_seconds)
+        self._clock = clock
+        self._leases: Dict[str, float] = {}
+
+    async def _acquire(self, agent_guid: str) -> float:
+        now = self._clock()
+        for guid in [guid for guid, expires_at in self._leases.items() if expires_at <= now]:
+            del self._leases[guid]
+
+        if agent_guid in self._leases or len(self._leases) < self.max_concurrent:
+            self._leases[agent_guid] = now + self.lease_seconds
+            self.active = len(self._leases)
+            return 0.0
+
+        self.active = len(self._leases)
+        return min(self._leases.values()) - now
+
+    async def release(self, agent_guid: str) -> None:
+        self._leases.pop(agent_guid, None)
+        self.active = len(self._leases)
+
+
+# KEYS: lease sorted set (agent -> expiry); ARGV: agent, cap, lease seconds.
+# Returns {seconds until a lease frees up or 0 when granted, leases held}.
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local lease = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local held = redis.call('ZCARD', KEYS[1])
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) and held >= tonumber(ARGV[2]) then
+    local first = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {tostring(tonumber(first[2]) - now), held}
+end
+redis.call('ZADD', KEYS[1], now + lease, ARGV[1])
+redis.call('PEXPIRE', KEYS[1], math.ceil(lease * 1000) + 1000)
+return {'0', redis.call('ZCARD', KEYS[1])}
+"""
+
+
+class RedisDownloadLeases(DownloadLeases):
+    """Leases shared by every replica, in the Redis instance the rate limiter uses"""
+
+    KEY = "update:download-leases"
+
+    def __init__(self, url: str, max_concurrent: int, lease_seconds: float):
+        import redis.asyncio as redis
+
+        super().__init__(max_concurrent, lease_seconds)
+        self._client = redis.from_url(url)
+        self._acquire_script = self._client.register_script(_ACQUIRE_SCRIPT)
+
+    async def _acquire(self, agent_guid: str) -> float:
+        retry_after, held = await self._acquire_script(
+            keys=[self.KEY], args=[agent_guid, self.max_concurrent, self.lease_seconds]
+        )
+        self.active = int(held)
+        return float(retry_after)
+
+    async def release(self, agent_guid: str) -> None:
+        try:
+            await self._client.zrem(self.KEY, agent_guid)
+        except Exception as e:
+            logger.error("Download lease store error: %s", e)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def build_download_leases() -> DownloadLeases:
+    """Create the lease store from settings"""
+    if settings.UPDATE_DOWNLOAD_LEASE_STORE == "redis":
+        return RedisDownloadLeases(
+            settings.REDIS_URL,
+            settings.UPDATE_MAX_CONCURRENT_DOWNLOADS,
+            settings.UPDATE_DOWNLOAD_LEASE_SECONDS
+        )
+    return MemoryDownloadLeases(
+        settings.UPDATE_MAX_CONCURRENT_DOWNLOADS,
+        settings.UPDATE_DOWNLOAD_LEASE_SECONDS
+    )
+
+
+rollout_policy = RolloutPolicy(
+    settings.UPDATE_ROLLOUT_RINGS,
+    settings.UPDATE_ROLLOUT_RING_HOURS,
+    settings.UPDATE_ROLLOUT_STARTED_AT,
+    settings.UPDATE_ROLLOUT_PILOT_SITES
+)
+download_leases = build_download_leases()
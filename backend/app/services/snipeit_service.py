@@ -1,24 +1,66 @@
 import httpx
 import logging
-from typing import Dict, Any, Optional, List
+import re
+import time
+from pydantic import TypeAdapter
+from typing import Dict, Any, Optional, List, Union
 from app.core.config import settings
+from app.core.metrics import snipeit_request_duration
+from app.core.tracing import inject_traceparent, traced
+from app.schemas.inventory import DiskInfo, InventoryData, NetworkAdapter
 
 logger = logging.getLogger(__name__)
 
+_ID_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+
+# Helpers take typed sections, or plain dicts from older callers
+_disk_list = TypeAdapter(List[DiskInfo])
+_adapter_list = TypeAdapter(List[NetworkAdapter])
+
+async def _start_timer(request: httpx.Request) -> None:
+    request.extensions["meldenit_started"] = time.perf_counter()
+
+async def _inject_trace(request: httpx.Request) -> None:
+    inject_traceparent(request)
+
+async def _record_latency(response: httpx.Response) -> None:
+    request = response.request
+    started = request.extensions.get("meldenit_started")
+    if started is None:
+        return
+    # Collapse object ids so /hardware/123 and /hardware/456 share a series
+    endpoint = _ID_SEGMENT_RE.sub("/{id}", request.url.path)
+    snipeit_request_duration.labels(request.method, endpoint, str(response.status_code)).observe(
+        time.perf_counter() - started
+    )
+
 class SnipeItService:
-    def __init__(self):
-        self.base_url = settings.SNIPEIT_BASE_URL
-        self.api_token = settings.SNIPEIT_API_TOKEN
+    # Transport used when none is passed in; benchmarks point this at the emulator
+    default_transport: Optional[httpx.AsyncBaseTransport] = None
+
+    def __init__(self, base_url: Optional[str] = None, api_token: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url or settings.SNIPEIT_BASE_URL
+        self.api_token = api_token or settings.SNIPEIT_API_TOKEN
+        self.transport = transport or self.default_transport
         self.headers = {
             "Authorization": f"Bearer {self.api_token}",
             "Accept": "application/json",
             "Content-Type": "application/json"
         }
 
+    def _client(self) -> httpx.AsyncClient:
+        """HTTP client that records per-endpoint latency"""
+        return httpx.AsyncClient(
+            transport=self.transport,
+            event_hooks={"request": [_start_timer, _inject_trace], "response": [_record_latency]}
+        )
+
+    @traced("SnipeItService.search_hardware")
     async def search_hardware(self, serial: str = None, hostname: str = None) -> Optional[Dict[str, Any]]:
         """Search for existing hardware in Snipe-IT"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._client() as client:
                 params = {}
                 if serial:
                     params["search"] = serial
@@ -39,13 +81,14 @@ class SnipeItService:
                 return None
                 
         except Exception as e:
-            logger.error(f"Error searching hardware in Snipe-IT: {e}")
+            logger.error("Error searching hardware in Snipe-IT: %s", e)
             return None
 
+    @traced("SnipeItService.create_hardware")
     async def create_hardware(self, hardware_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Create new hardware in Snipe-IT"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._client() as client:
                 response = await client.post(
                     f"{self.base_url}/api/v1/hardware",
                     headers=self.headers,
@@ -57,13 +100,14 @@ class SnipeItService:
                 return response.json()
                 
         except Exception as e:
-            logger.error(f"Error creating hardware in Snipe-IT: {e}")
+            logger.error("Error creating hardware in Snipe-IT: %s", e)
             return None
 
+    @traced("SnipeItService.update_hardware")
     async def update_hardware(self, hardware_id: int, hardware_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update existing hardware in Snipe-IT"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._client() as client:
                 response = await client.patch(
                     f"{self.base_url}/api/v1/hardware/{hardware_id}",
                     headers=self.headers,
@@ -75,13 +119,14 @@ class SnipeItService:
                 return response.json()
                 
         except Exception as e:
-            logger.error(f"Error updating hardware in Snipe-IT: {e}")
+            logger.error("Error updating hardware in Snipe-IT: %s", e)
             return None
 
+    @traced("SnipeItService.get_models")
     async def get_models(self) -> List[Dict[str, Any]]:
         """Get available models from Snipe-IT"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._client() as client:
                 response = await client.get(
                     f"{self.base_url}/api/v1/models",
                     headers=self.headers,
@@ -93,13 +138,14 @@ class SnipeItService:
                 return data.get("rows", [])
                 
         except Exception as e:
-            logger.error(f"Error getting models from Snipe-IT: {e}")
+            logger.error("Error getting models from Snipe-IT: %s", e)
             return []
 
+    @traced("SnipeItService.get_categories")
     async def get_categories(self) -> List[Dict[str, Any]]:
         """Get available categories from Snipe-IT"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._client() as client:
                 response = await client.get(
                     f"{self.base_url}/api/v1/categories",
                     headers=self.headers,
@@ -111,13 +157,14 @@ class SnipeItService:
                 return data.get("rows", [])
                 
         except Exception as e:
-            logger.error(f"Error getting categories from Snipe-IT: {e}")
+            logger.error("Error getting categories from Snipe-IT: %s", e)
             return []
 
+    @traced("SnipeItService.get_status_labels")
     async def get_status_labels(self) -> List[Dict[str, Any]]:
         """Get available status labels from Snipe-IT"""
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._client() as client:
                 response = await client.get(
                     f"{self.base_url}/api/v1/statuslabels",
                     headers=self.headers,
@@ -129,49 +176,49 @@ class SnipeItService:
                 return data.get("rows", [])
                 
         except Exception as e:
-            logger.error(f"Error getting status labels from Snipe-IT: {e}")
+            logger.error("Error getting status labels from Snipe-IT: %s", e)
             return []
 
-    def map_inventory_to_snipeit(self, inventory_data: Dict[str, Any]) -> Dict[str, Any]:
+    def map_inventory_to_snipeit(self, inventory_data: Union[InventoryData, Dict[str, Any]]) -> Dict[str, Any]:
         """Map inventory data to Snipe-IT hardware format"""
         try:
-            device_identity = inventory_data.get("device_identity", {})
-            hardware = inventory_data.get("hardware", {})
-            software = inventory_data.get("software", {})
-            network = inventory_data.get("network", {})
-            bios = inventory_data.get("bios", {})
-            usage = inventory_data.get("usage", {})
-            tagging = inventory_data.get("tagging", {})
+            inventory = InventoryData.model_validate(inventory_data)
+            device_identity = inventory.device_identity
+            hardware = inventory.hardware
+            software = inventory.software
+            bios = inventory.bios
+            tagging = inventory.tagging
+            collected_at = inventory.collected_at.isoformat() if inventory.collected_at else "Unknown"
 
             # Basic hardware mapping
             snipeit_data = {
-                "name": device_identity.get("hostname", "Unknown"),
-                "serial": device_identity.get("serial_number", ""),
-                "asset_tag": self._generate_asset_tag(tagging.get("site_code", "UNKNOWN")),
-                "notes": f"Managed by MeldenIT Agent\nLast Sync: {inventory_data.get('collected_at', 'Unknown')}",
+                "name": device_identity.hostname or "Unknown",
+                "serial": device_identity.serial_number,
+                "asset_tag": self._generate_asset_tag(tagging.site_code or "UNKNOWN"),
+                "notes": f"Managed by MeldenIT Agent\nLast Sync: {collected_at}",
                 "status_id": 1,  # Ready to Deploy (default)
                 "model_id": 1,   # Generic Windows Workstation (default)
                 "category_id": 1,  # Computer (default)
                 "custom_fields": {
-                    "cpu": hardware.get("cpu", {}).get("name", ""),
-                    "ram": f"{hardware.get('memory', {}).get('total_gb', 0):.1f} GB",
-                    "disk": self._get_disk_info(hardware.get("disks", [])),
-                    "os_build": f"{software.get('os_name', '')} {software.get('os_version', '')}",
-                    "mac_address": self._get_primary_mac(network.get("adapters", [])),
-                    "uptime_hours": usage.get("uptime_hours", 0),
-                    "location": tagging.get("location", ""),
-                    "ou": device_identity.get("ou", ""),
-                    "logged_in_user": device_identity.get("logged_in_user", ""),
-                    "bios_version": bios.get("version", ""),
-                    "tpm_enabled": bios.get("tpm_enabled", False),
-                    "secure_boot": bios.get("secure_boot", False)
+                    "cpu": hardware.cpu.name,
+                    "ram": f"{hardware.memory.total_gb:.1f} GB",
+                    "disk": self._get_disk_info(hardware.disks),
+                    "os_build": f"{software.os_name} {software.os_version}",
+                    "mac_address": self._get_primary_mac(inventory.network.adapters),
+                    "uptime_hours": inventory.usage.uptime_hours,
+                    "location": tagging.location or "",
+                    "ou": device_identity.ou or "",
+                    "logged_in_user": device_identity.logged_in_user or "",
+                    "bios_version": bios.version,
+                    "tpm_enabled": bios.tpm_enabled,
+                    "secure_boot": bios.secure_boot
                 }
             }
 
             return snipeit_data
 
         except Exception as e:
-            logger.error(f"Error mapping inventory to Snipe-IT format: {e}")
+            logger.error("Error mapping inventory to Snipe-IT format: %s", e)
             return {}
 
     def _generate_asset_tag(self, site_code: str) -> str:
@@ -180,36 +227,40 @@ class SnipeItService:
         short_guid = str(uuid.uuid4())[:4].upper()
         return f"{site_code}-{short_guid}"
 
-    def _get_disk_info(self, disks: List[Dict[str, Any]]) -> str:
+    def _get_disk_info(self, disks: List[Union[DiskInfo, Dict[str, Any]]]) -> str:
         """Get disk information summary"""
         if not disks:
             return "Unknown"
         
-        total_capacity = sum(disk.get("capacity_gb", 0) for disk in disks)
-        disk_types = [disk.get("type", "Unknown") for disk in disks]
+        disks = _disk_list.validate_python(disks)
+        total_capacity = sum(disk.capacity_gb for disk in disks)
+        disk_types = [disk.type or "Unknown" for disk in disks]
         
         return f"{total_capacity:.1f} GB ({', '.join(set(disk_types))})"
 
-    def _get_primary_mac(self, adapters: List[Dict[str, Any]]) -> str:
+    def _get_primary_mac(self, adapters: List[Union[NetworkAdapter, Dict[str, Any]]]) -> str:
         """Get primary MAC address"""
+        adapters = _adapter_list.validate_python(adapters)
         for adapter in adapters:
-            if adapter.get("is_connected", False):
-                return adapter.get("mac_address", "")
+            if adapter.is_connected:
+                return adapter.mac_address
         
         # Return first MAC if no connected adapter found
         if adapters:
-            return adapters[0].get("mac_address", "")
+            return adapters[0].mac_address
         
         return ""
 
-    async def sync_inventory_to_snipeit(self, agent_guid: str, inventory_data: Dict[str, Any]) -> bool:
+    @traced("SnipeItService.sync_inventory_to_snipeit")
+    async def sync_inventory_to_snipeit(self, agent_guid: str,
+                                        inventory_data: Union[InventoryData, Dict[str, Any]]) -> bool:
         """Main method to sync inventory data to Snipe-IT"""
         try:
-            logger.info(f"Syncing inventory to Snipe-IT for agent {agent_guid}")
+            logger.info("Syncing inventory to Snipe-IT for agent %s", agent_guid)
             
-            device_identity = inventory_data.get("device_identity", {})
-            serial = device_identity.get("serial_number", "")
-            hostname = device_identity.get("hostname", "")
+            inventory_data = InventoryData.model_validate(inventory_data)
+            serial = inventory_data.device_identity.serial_number
+            hostname = inventory_data.device_identity.hostname
             
             # Search for existing hardware
             existing_hardware = None
@@ -227,22 +278,22 @@ class SnipeItService:
                 hardware_id = existing_hardware.get("id")
                 result = await self.update_hardware(hardware_id, snipeit_data)
                 if result:
-                    logger.info(f"Updated hardware {hardware_id} in Snipe-IT")
+                    logger.info("Updated hardware %s in Snipe-IT", hardware_id)
                     return True
                 else:
-                    logger.error(f"Failed to update hardware {hardware_id} in Snipe-IT")
+                    logger.error("Failed to update hardware %s in Snipe-IT", hardware_id)
                     return False
             else:
                 # Create new hardware
                 result = await self.create_hardware(snipeit_data)
                 if result:
                     hardware_id = result.get("id")
-                    logger.info(f"Created new hardware {hardware_id} in Snipe-IT")
+                    logger.info("Created new hardware %s in Snipe-IT", hardware_id)
                     return True
                 else:
                     logger.error("Failed to create new hardware in Snipe-IT")
                     return False
                     
         except Exception as e:
-            logger.error(f"Error syncing inventory to Snipe-IT: {e}")
+            logger.error("Error syncing inventory to Snipe-IT: %s", e)
             return False
@@ -0,0 +1,168 @@
+import hashlib
+import heapq
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Patch files are named "<from_version>__<to_version>.<ext>"
+PATCH_SEPARATOR = "__"
+
+
+@dataclass(frozen=True)
+class UpdateArtifact:
+    name: str  # path relative to the store root, also the download key
+    kind: str  # "full" or "patch"
+    to_version: str
+    from_version: Optional[str]
+    path: str
+    size: int
+    sha256: str
+    mtime: float
+
+
+class UpdateArtifactStore:
+    """Directory of update packages with cached content hashes.
+
+    Layout:
+        <root>/full/<version>.<ext>             complete installers
+        <root>/patches/<from>__<to>.<ext>       binary diffs between versions
+    """
+
+    def __init__(self, root: str, rescan_seconds: float = 60.0):
+        self.root = root
+        self.rescan_seconds = rescan_seconds
+        self._artifacts: Dict[str, UpdateArtifact] = {}
+        self._full: Dict[str, UpdateArtifact] = {}
+        self._patches: Dict[str, List[UpdateArtifact]] = {}
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh_if_stale(self) -> None:
+        """Rescan the directory if the last scan is old; blocking, run in a thread"""
+        if time.monotonic() - self._scanned_at < self.rescan_seconds:
+            return
+        with self._lock:
+            if time.monotonic() - self._scanned_at >= self.rescan_seconds:
+                self.refresh()
+
+    def refresh(self) -> None:
+        """Scan the store, hashing only new or changed files"""
+        artifacts: Dict[str, UpdateArtifact] = {}
+
+        for kind, subdir in (("full", "full"), ("patch", "patches")):
+            directory = os.path.join(self.root, subdir)
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                artifact = self._load(kind, subdir, entry)
+                if artifact is not None:
+                    artifacts[artifact.name] = artifact
+
+        full = {a.to_version: a for a in artifacts.values() if a.kind == "full"}
+        patches: Dict[str, List[UpdateArtifact]] = {}
+        for artifact in artifacts.values():
+            if artifact.kind == "patch":
+                patches.setdefault(artifact.from_version, []).append(artifact)
+
+        self._artifacts, self._full, self._patches = artifacts, full, patches
+        self._scanned_at = time.monotonic()
+
+    def _load(self, kind: str, subdir: str, entry: os.DirEntry) -> Optional[UpdateArtifact]:
+        name = f"{subdir}/{entry.name}"
+        stat = entry.stat()
+
+        cached = self._artifacts.get(name)
+        if cached is not None and cached.size == stat.st_size and cached.mtime == stat.st_mtime:
+            return cached
+
+        stem = os.path.splitext(entry.name)[0]
+        if kind == "patch":
+            from_version, separator, to_version = stem.partition(PATCH_SEPARATOR)
+            if not separator or not from_version or not to_version:
+                logger.warning("Ignoring patch with unexpected name: %s", name)
+                return None
+        else:
+            from_version, to_version = None, stem
+
+        return UpdateArtifact(
+            name=name,
+            kind=kind,
+            to_version=to_version,
+            from_version=from_version,
+            path=entry.path,
+            size=stat.st_size,
+            sha256=file_sha256(entry.path),
+            mtime=stat.st_mtime
+        )
+
+    def get(self, name: str) -> Optional[UpdateArtifact]:
+        return self._artifacts.get(name)
+
+    def full_package(self, version: str) -> Optional[UpdateArtifact]:
+        return self._full.get(version)
+
+    def best_route(self, from_version: str, to_version: str) -> List[UpdateArtifact]:
+        """Smallest set of packages that takes an agent from one version to another.
+
+        Chains of patches are compared by total size against the full
+        package; an empty list means the store cannot serve the update.
+        """
+        full = self._full.get(to_version)
+        chain = self._cheapest_patch_chain(from_version, to_version)
+
+        if chain and (full is None or sum(a.size for a in chain) < full.size):
+            return chain
+        return [full] if full is not None else []
+
+    def _cheapest_patch_chain(self, from_version: str, to_version: str) -> List[UpdateArtifact]:
+        # Dijkstra over the (small) graph of versions linked by patches
+        queue: List[Tuple[int, int, str]] = [(0, 0, from_version)]
+        best: Dict[str, int] = {from_version: 0}
+        previous: Dict[str, UpdateArtifact] = {}
+        counter = 0
+
+        while queue:
+            cost, _, version = heapq.heappop(queue)
+            if version == to_version:
+                break
+            if cost > best.get(version, cost):
+                continue
+            for patch in self._patches.get(version, ()):
+                next_cost = cost + patch.size
+                if next_cost < best.get(patch.to_version, next_cost + 1):
+                    best[patch.to_version] = next_cost
+                    previous[patch.to_version] = patch
+                    counter += 1
+                    heapq.heappush(queue, (next_cost, counter, patch.to_version))
+
+        if to_version not in previous:
+            return []
+
+        chain = []
+        version = to_version
+        while version != from_version:
+            patch = previous[version]
+            chain.append(patch)
+            version = patch.from_version
+        chain.reverse()
+        return chain
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+update_store = UpdateArtifactStore(settings.UPDATE_ARTIFACT_DIR, settings.UPDATE_ARTIFACT_RESCAN_SECONDS)
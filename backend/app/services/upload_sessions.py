@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import anyio
+
+from app.core.config import settings
+from app.core.jsonstream import ObjectMemberParser
+
+logger = logging.getLogger(__name__)
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    """A chunk that does not fit what the session has received"""
+
+
+class UploadTooLarge(UploadError):
+    """A chunk that would take the upload past its declared size"""
+
+
+@dataclass
+class UploadSession:
+    session_id: str
+    agent_guid: str
+    sync_type: str
+    total_size: int
+    sha256: Optional[str]
+    created_at: float
+    received: int = 0
+    last_activity: float = 0.0
+    response: Optional[Dict[str, Any]] = None  # set once committed, for retried commits
+
+    @property
+    def expires_at(self) -> float:
+        return self.last_activity + settings.UPLOAD_SESSION_TTL_SECONDS
+
+    @property
+    def committed(self) -> bool:
+        return self.response is not None
+
+
+class UploadSessionStore:
+    """Resumable uploads spooled to disk.
+
+    Layout:
+        <root>/<session_id>.json    session metadata
+        <root>/<session_id>.part    bytes received so far
+
+    The received size and last activity come from the part file, so a
+    session survives a restart and can be served by any replica sharing
+    the directory.
+    """
+
+    def __init__(self, root: str, chunk_size: int = 256 * 1024):
+        self.root = root
+        self.chunk_size = chunk_size
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def create(self, agent_guid: str, sync_type: str, total_size: int,
+               sha256: Optional[str] = None) -> UploadSession:
+        os.makedirs(self.root, exist_ok=True)
+        now = time.time()
+        session = UploadSession(
+            session_id=uuid.uuid4().hex,
+            agent_guid=agent_guid,
+            sync_type=sync_type,
+            total_size=total_size,
+            sha256=sha256.lower() if sha256 else None,
+            created_at=now,
+            last_activity=now
+        )
+        open(self._path(session.session_id, "part"), "wb").close()
+        self._save(session)
+        return session
+
+    def get(self, session_id: str) -> Optional[UploadSession]:
+        """The session, or None if it does not exist or has expired"""
+        if not _SESSION_ID.match(session_id):
+            return None
+        try:
+            with open(self._path(session_id, "json"), encoding="utf-8") as file:
+                session = UploadSession(**json.load(file))
+            stat = os.stat(self._path(session_id, "json"))
+        except (OSError, ValueError, TypeError):
+            return None
+
+        activity = stat.st_mtime
+        try:
+            part = os.stat(self._path(session_id, "part"))
+            session.received = part.st_size
+            activity = max(activity, part.st_mtime)
+        except OSError:
+            session.received = session.total_size if session.committed else 0
+        session.last_activity = activity
+
+        if session.expires_at < time.time():
+            return None
+        return session
+
+    async def write_chunk(self, session: UploadSession, offset: int, body: AsyncIterator[bytes]) -> int:
+        """Write a chunk starting at `offset`; returns the bytes received so far.
+
+        A chunk may start anywhere up to the bytes already received, so a
+        chunk interrupted mid-way can be re-sent. Whatever follows the
+        chunk is discarded.
+        """
+        async with self._lock(session.session_id):
+            received = self._received(session.session_id)
+            if offset > received:
+                raise UploadError(f"Chunk starts at {offset} but only {received} bytes were received")
+
+            position = offset
+            async with await anyio.open_file(self._path(session.session_id, "part"), "r+b") as file:
+                await file.seek(offset)
+                try:
+                    async for block in body:
+                        if position + len(block) > session.total_size:
+                            raise UploadTooLarge(f"Upload exceeds its declared size of {session.total_size} bytes")
+                        await file.write(block)
+                        position += len(block)
+                finally:
+                    # Keep what arrived, even from a dropped connection
+                    await file.truncate(position)
+            return position
+
+    async def read_inventory(self, session: UploadSession) -> Tuple[Dict[str, Any], str]:
+        """Parse the spooled body incrementally in a worker thread.
+
+        Returns the decoded object and the SHA-256 of its bytes; raises
+        ValueError when the body is not a JSON object.
+        """
+        async with self._lock(session.session_id):
+            return await anyio.to_thread.run_sync(self._read_inventory, session)
+
+    def _read_inventory(self, session: UploadSession) -> Tuple[Dict[str, Any], str]:
+        parser = ObjectMemberParser()
+        digest = hashlib.sha256()
+        inventory: Dict[str, Any] = {}
+        with open(self._path(session.session_id, "part"), "rb") as file:
+            for block in iter(lambda: file.read(self.chunk_size), b""):
+                digest.update(block)
+                inventory.update(parser.feed(block))
+        parser.close()
+        return inventory, digest.hexdigest()
+
+    def complete(self, session: UploadSession, response: Dict[str, Any]) -> None:
+        """Keep the commit response for retried commits and drop the spooled body"""
+        session.response = response
+        self._save(session)
+        self._remove(session.session_id, "part")
+        self._locks.pop(session.session_id, None)
+
+    def delete(self, session_id: str) -> None:
+        self._remove(session_id, "part")
+        self._remove(session_id, "json")
+        self._locks.pop(session_id, None)
+
+    def purge_expired(self) -> int:
+        """Remove expired sessions and stray part files; blocking, run in a thread"""
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = time.time() - settings.UPLOAD_SESSION_TTL_SECONDS
+        expired = set()
+        for entry in os.scandir(self.root):
+            session_id, _, suffix = entry.name.partition(".")
+            if suffix in ("json", "part") and _SESSION_ID.match(session_id):
+                try:
+                    if entry.stat().st_mtime < cutoff and self.get(session_id) is None:
+                        expired.add(session_id)
+                except OSError:
+                    continue
+        for session_id in expired:
+            self.delete(session_id)
+        if expired:
+            logger.info("Removed %s expired upload sessions", len(expired))
+        return len(expired)
+
+    async def run(self, interval: float) -> None:
+        """Purge expired sessions periodically until cancelled"""
+        while True:
+            try:
+                await anyio.to_thread.run_sync(self.purge_expired)
+            except Exception as e:
+                logger.error("Error purging upload sessions: %s", e)
+            await asyncio.sleep(interval)
+
+    def _received(self, session_id: str) -> int:
+        try:
+            return os.stat(self._path(session_id, "part")).st_size
+        except OSError:
+            raise UploadError("Upload session has no data file")
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    def _save(self, session: UploadSession) -> None:
+        data = asdict(session)
+        del data["received"], data["last_activity"]
+        path = self._path(session.session_id, "json")
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(path + ".tmp", path)
+
+    def _remove(self, session_id: str, suffix: str) -> None:
+        try:
+            os.remove(self._path(session_id, suffix))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, session_id: str, suffix: str) -> str:
+        return os.path.join(self.root, f"{session_id}.{suffix}")
+
+
+upload_sessions = UploadSessionStore(settings.UPLOAD_SESSION_DIR)
@@ -0,0 +1,4 @@
+"""Load and micro benchmarks for the backend.
+
+Run from the backend directory, e.g. `python -m benchmarks.fleet --help`.
+"""
@@ -0,0 +1,313 @@
+"""Simulated-fleet load generator.
+
+Each simulated agent follows the real agent's cadence, compressed by
+--time-scale: register, full sync, then heartbeats every
+AGENT_HEARTBEAT_INTERVAL, delta syncs every AGENT_DELTA_SYNC_INTERVAL and
+a daily full sync. Agents start at random offsets within one heartbeat
+interval, like a fleet that was not switched on at the same moment.
+
+    python -m benchmarks.fleet --agents 2000 --duration 120
+    python -m benchmarks.fleet --target http://localhost:8000 --agents 500
+
+Against the in-process app the database in DATABASE_URL is used. The
+report is JSON: throughput, p50/p95/p99 per endpoint and SQL statement
+counts read from the Server-Timing header. Runs with the same seed and
+options issue the same request mix, so reports can be compared.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.inventory import make_inventory, software_count_for
+
+_SERVER_TIMING_RE = re.compile(r'desc="(\d+) statements, (\d+) commits"')
+
+
+@dataclass
+class FleetConfig:
+    agents: int = 1000
+    duration: float = 60.0  # seconds of wall-clock load
+    time_scale: float = 60.0  # simulated seconds per real second
+    heartbeat_interval: float = 15 * 60  # simulated seconds
+    delta_interval: float = 360 * 60
+    full_interval: float = 24 * 3600
+    sites: int = 20
+    software_median: int = 150
+    seed: int = 1
+    target: str = "inproc"  # "inproc" or a base URL
+    connections: int = 200
+    disable_rate_limit: bool = True
+    snipeit_emulator: Optional[str] = None  # latency profile; in-process target only
+    section_sync: bool = False  # delta syncs negotiate section hashes and upload only changes
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    statements: int = 0
+    commits: int = 0
+    bytes_sent: int = 0
+
+    def record(self, latency: float, status: int, payload_size: int, server_timing: Optional[str]) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes_sent += payload_size
+        if server_timing:
+            match = _SERVER_TIMING_RE.search(server_timing)
+            if match:
+                self.statements += int(match.group(1))
+                self.commits += int(match.group(2))
+
+    def summary(self, elapsed: float) -> Dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "errors": self.errors,
+            "statuses": {str(code): n for code, n in sorted(self.statuses.items())},
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 2),
+                "p95": round(percentile(latencies, 95) * 1000, 2),
+                "p99": round(percentile(latencies, 99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            },
+            "db_statements_per_request": round(self.statements / count, 2) if count else 0.0,
+            "db_commits_per_request": round(self.commits / count, 2) if count else 0.0,
+            "request_bytes_avg": round(self.bytes_sent / count) if count else 0,
+        }
+
+
+class FleetStats:
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, path: str,
+                   payload: Dict, token: Optional[str] = None) -> Optional[httpx.Response]:
+        stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, content=body, headers=headers)
+        except httpx.HTTPError:
+            stats.errors += 1
+            return None
+        stats.record(time.perf_counter() - started, response.status_code, len(body),
+                     response.headers.get("server-timing"))
+        return response
+
+
+class SimulatedAgent:
+    def __init__(self, index: int, config: FleetConfig, rng: random.Random):
+        self.index = index
+        self.config = config
+        self.rng = random.Random(rng.getrandbits(64))
+        self.site_code = f"SITE{index % config.sites:03d}"
+        self.guid = f"bench-{config.seed}-{index:06d}"
+        self.inventory = make_inventory(
+            self.rng, index, software_count_for(self.rng, config.software_median), self.site_code
+        )
+        self.token: Optional[str] = None
+
+    def _scaled(self, simulated_seconds: float) -> float:
+        return simulated_seconds / self.config.time_scale
+
+    async def run(self, client: httpx.AsyncClient, stats: FleetStats, stop_at: float) -> None:
+        await asyncio.sleep(self.rng.uniform(0, self._scaled(self.config.heartbeat_interval)))
+        if time.monotonic() >= stop_at:
+            return
+
+        response = await stats.call(client, "register", "/api/v1/agents/register", {
+            "agent_guid": self.guid,
+            "hostname": self.inventory["device_identity"]["hostname"],
+            "serial": self.inventory["device_identity"]["serial_number"],
+            "domain": "bench.local",
+            "version": "1.0.0",
+            "site_code": self.site_code,
+        })
+        if response is None or response.status_code != 200:
+            return
+        self.token = response.json().get("device_token")
+
+        await self._sync(client, stats, "full")
+        now = time.monotonic()
+        # Offset the periodic work so agents do not run in lockstep
+        next_heartbeat = now + self._scaled(self.config.heartbeat_interval)
+        next_delta = now + self.rng.uniform(0, self._scaled(self.config.delta_interval))
+        next_full = now + self.rng.uniform(0, self._scaled(self.config.full_interval))
+
+        while True:
+            wake_at = min(next_heartbeat, next_delta, next_full)
+            if wake_at >= stop_at:
+                return
+            await asyncio.sleep(max(0.0, wake_at - time.monotonic()))
+
+            if wake_at == next_heartbeat:
+                await stats.call(client, "heartbeat", "/api/v1/agents/heartbeat", {
+                    "agent_guid": self.guid, "version": "1.0.0", "status": "healthy", "last_sync": None
+                }, self.token)
+                next_heartbeat += self._scaled(self.config.heartbeat_interval)
+            elif wake_at == next_delta:
+                await self._sync(client, stats, "delta")
+                next_delta += self._scaled(self.config.delta_interval)
+            else:
+                await self._sync(client, stats, "full")
+                next_full += self._scaled(self.config.full_interval)
+
+    async def _sync(self, client: httpx.AsyncClient, stats: FleetStats, sync_type: str) -> None:
+        self.inventory["usage"]["uptime_hours"] = round(self.inventory["usage"]["uptime_hours"] + 0.25, 2)
+        if sync_type == "delta" and self.config.section_sync:
+            await self._section_sync(client, stats)
+            return
+        await stats.call(client, f"inventory_{sync_type}", f"/api/v1/inventory/{sync_type}", {
+            "agent_guid": self.guid,
+            "sync_type": sync_type,
+            "inventory": self.inventory,
+            "last_sync": None,
+        }, self.token)
+
+
+    async def _section_sync(self, client: httpx.AsyncClient, stats: FleetStats) -> None:
+        from app.schemas.inventory import SECTION_NAMES, section_hash
+
+        hashes = {name: section_hash(self.inventory[name]) for name in SECTION_NAMES}
+        response = await stats.call(client, "sections_negotiate", "/api/v1/inventory/sections/negotiate", {
+            "agent_guid": self.guid, "hashes": hashes
+        }, self.token)
+        if response is None or response.status_code != 200 or not response.json().get("missing"):
+            return
+        await stats.call(client, "sections_upload", "/api/v1/inventory/sections", {
+            "agent_guid": self.guid,
+            "hashes": hashes,
+            "sections": {name: self.inventory[name] for name in response.json()["missing"]},
+            "collected_at": self.inventory["collected_at"],
+        }, self.token)
+
+
+@asynccontextmanager
+async def open_client(config: FleetConfig, app=None):
+    limits = httpx.Limits(max_connections=config.connections, max_keepalive_connections=config.connections)
+    if config.target != "inproc":
+        async with httpx.AsyncClient(base_url=config.target, limits=limits, timeout=60.0) as client:
+            yield client
+        return
+
+    if app is None:
+        from app.core.ratelimit import rate_limiter
+        from app.main import app
+
+        if config.disable_rate_limit:
+            rate_limiter.enabled = False
+
+    if config.snipeit_emulator:
+        from app.services.snipeit_service import SnipeItService
+        from benchmarks.snipeit_emulator import EmulatorConfig, LatencyProfile, SnipeItEmulator
+
+        emulator = SnipeItEmulator(EmulatorConfig(latency=LatencyProfile.parse(config.snipeit_emulator)))
+        SnipeItService.default_transport = httpx.ASGITransport(app=emulator.app)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+            yield client
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_fleet(config: FleetConfig, app=None) -> Dict:
+    """Run the simulation and return the JSON-serialisable report.
+
+    `app` overrides the in-process ASGI app (defaults to app.main.app).
+    """
+    rng = random.Random(config.seed)
+    agents = [SimulatedAgent(i, config, rng) for i in range(config.agents)]
+    stats = FleetStats()
+
+    async with open_client(config, app) as client:
+        started = time.monotonic()
+        stop_at = started + config.duration
+        await asyncio.gather(*(agent.run(client, stats, stop_at) for agent in agents))
+        elapsed = time.monotonic() - started
+
+    endpoints = {name: s.summary(elapsed) for name, s in sorted(stats.endpoints.items())}
+    total = sum(s["requests"] for s in endpoints.values())
+    return {
+        "config": asdict(config),
+        "environment": {"python": platform.python_version(), "git_revision": _git_revision()},
+        "elapsed_seconds": round(elapsed, 2),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = FleetConfig()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--agents", type=int, default=defaults.agents)
+    parser.add_argument("--duration", type=float, default=defaults.duration, help="wall-clock seconds")
+    parser.add_argument("--time-scale", type=float, default=defaults.time_scale,
+                        help="simulated seconds per real second")
+    parser.add_argument("--sites", type=int, default=defaults.sites)
+    parser.add_argument("--software-median", type=int, default=defaults.software_median,
+                        help="median installed-software entries per agent")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--target", default=defaults.target, help='"inproc" or a base URL')
+    parser.add_argument("--connections", type=int, default=defaults.connections)
+    parser.add_argument("--keep-rate-limit", action="store_true",
+                        help="leave the rate limiter on (in-process target only)")
+    parser.add_argument("--snipeit-emulator", metavar="LATENCY",
+                        help='answer Snipe-IT calls in-process, e.g. "lognormal:0.08:0.5"')
+    parser.add_argument("--section-sync", action="store_true",
+                        help="delta syncs send section hashes first and upload only changed sections")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    config = FleetConfig(
+        agents=args.agents, duration=args.duration, time_scale=args.time_scale, sites=args.sites,
+        software_median=args.software_median, seed=args.seed, target=args.target,
+        connections=args.connections, disable_rate_limit=not args.keep_rate_limit,
+        snipeit_emulator=args.snipeit_emulator, section_sync=args.section_sync
+    )
+    report = asyncio.run(run_fleet(config))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+# Shaped after agent/MeldenIT.Agent.Core/Models/InventoryData.cs
+
+PUBLISHERS = [
+    "Microsoft Corporation", "Google LLC", "Adobe Inc.", "Mozilla", "Oracle Corporation",
+    "Intel Corporation", "NVIDIA Corporation", "Dell Inc.", "Zoom Video Communications, Inc.",
+    "7-Zip", "Notepad++ Team", "Python Software Foundation", "Cisco Systems, Inc.", None,
+]
+PRODUCTS = [
+    "Office 365", "Chrome", "Acrobat Reader", "Firefox", "Java Runtime", "Graphics Driver",
+    "Display Driver", "Command Update", "Zoom", "7-Zip", "Notepad++", "Python", "AnyConnect",
+    "Visual C++ Redistributable", "Teams", "OneDrive", "Edge WebView2 Runtime", "Update Helper",
+]
+DISK_MODELS = [("Samsung SSD 980 PRO", "NVMe"), ("WDC WD10EZEX", "HDD"), ("Crucial MX500", "SSD")]
+MODELS = [("Dell Inc.", "OptiPlex 7090"), ("HP", "EliteDesk 800 G6"), ("LENOVO", "ThinkCentre M70q")]
+
+
+def software_count_for(rng: random.Random, median: int = 150, maximum: int = 5000) -> int:
+    """Installed-software count drawn from a long-tailed (log-normal) distribution"""
+    return max(10, min(maximum, int(rng.lognormvariate(math.log(median), 0.6))))
+
+
+def make_software(rng: random.Random, count: int) -> list:
+    base = datetime(2024, 1, 1)
+    return [
+        {
+            "name": f"{rng.choice(PRODUCTS)} {i}",
+            "version": f"{rng.randint(1, 30)}.{rng.randint(0, 9)}.{rng.randint(0, 9999)}",
+            "publisher": rng.choice(PUBLISHERS),
+            "install_date": (base + timedelta(days=rng.randint(0, 700))).isoformat() + "Z",
+        }
+        for i in range(count)
+    ]
+
+
+def make_inventory(rng: random.Random, index: int, software_count: int, site_code: str = "BENCH") -> Dict[str, Any]:
+    """Inventory payload in the agent's InventoryData shape"""
+    manufacturer, model = rng.choice(MODELS)
+    disk_model, disk_type = rng.choice(DISK_MODELS)
+    mac = ":".join(f"{rng.randint(0, 255):02x}" for _ in range(6))
+    return {
+        "device_identity": {
+            "hostname": f"{site_code}-PC{index:05d}",
+            "domain": "bench.local",
+            "ou": "OU=Computers,DC=bench,DC=local",
+            "sid": f"S-1-5-21-{rng.randint(10**9, 10**10)}-{index}",
+            "uuid": f"{rng.getrandbits(128):032x}",
+            "serial_number": f"SN{index:08d}",
+            "asset_tag": None,
+            "logged_in_user": f"user{index}",
+        },
+        "hardware": {
+            "manufacturer": manufacturer,
+            "model": model,
+            "cpu": {"name": "Intel Core i7-11700", "cores": 8, "logical_processors": 16, "max_clock_speed": 3200},
+            "memory": {
+                "total_gb": 16.0,
+                "slots": [
+                    {"capacity_gb": 8.0, "speed_mhz": 3200, "manufacturer": "Kingston", "part_number": "KF432C16BB/8"}
+                    for _ in range(2)
+                ],
+            },
+            "disks": [{
+                "model": disk_model,
+                "capacity_gb": 512.0,
+                "type": disk_type,
+                "partitions": [{"drive_letter": "C:", "size_gb": 500.0, "free_space_gb": 210.5, "file_system": "NTFS"}],
+            }],
+            "gpu": {"name": "Intel UHD Graphics 750", "memory_mb": 1024, "driver_version": "31.0.101.2111"},
+        },
+        "software": {
+            "os_name": "Microsoft Windows 11 Pro",
+            "os_version": "10.0.22631",
+            "os_build": "22631",
+            "installed_software": make_software(rng, software_count),
+            "dotnet_versions": ["v4.0.30319", "v8.0.0"],
+        },
+        "network": {
+            "adapters": [{"name": "Intel(R) Ethernet I219-LM", "mac_address": mac, "connection_type": "Ethernet", "is_connected": True}],
+            "ipv4_addresses": [f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"],
+            "ipv6_addresses": [],
+            "gateway": "10.0.0.1",
+            "dns_servers": ["10.0.0.2"],
+            "wifi_ssid": None,
+        },
+        "bios": {"name": manufacturer, "version": "1.21.0", "release_date": "2023-06-01T00:00:00Z",
+                 "tpm_enabled": True, "secure_boot": True},
+        "usage": {"uptime_hours": round(rng.uniform(1, 500), 1), "last_reboot": "2024-06-01T08:00:00Z",
+                  "cpu_usage_avg": round(rng.uniform(2, 60), 1), "memory_usage_avg": round(rng.uniform(20, 90), 1),
+                  "disk_io_avg": round(rng.uniform(0, 40), 1)},
+        "tagging": {"location": "HQ", "site_code": site_code, "department": "IT", "cost_center": "IT-001"},
+        "collected_at": "2024-06-01T12:00:00Z",
+    }
@@ -0,0 +1,370 @@
+"""Microbenchmarks for the per-sync CPU hot paths.
+
+Each case runs against inventories with 10 to 5,000 installed-software
+entries and reports ops/sec (median of several timed rounds) and the
+peak memory allocated by one call, measured with tracemalloc.
+
+    python -m benchmarks.micro run --output current.json
+    python -m benchmarks.micro compare benchmarks/baseline.json current.json
+    python -m benchmarks.micro compare benchmarks/baseline.json    # runs now
+
+`compare` exits 1 when a case is slower, or allocates more, than the
+baseline by more than --threshold (default 25%). Refresh the stored
+baseline on the reference machine with `run --output benchmarks/baseline.json`.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.inventory import make_inventory
+
+SIZES = (10, 100, 1000, 5000)
+DEFAULT_THRESHOLD = 0.25
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[Dict[str, Any]], Callable[[], Any]]  # inventory -> function under test
+    sized: bool = True  # False: the cost does not depend on the software count
+
+
+CASES: List[Case] = []
+
+
+def case(name: str, sized: bool = True):
+    """Register a benchmark case"""
+    def decorator(setup):
+        CASES.append(Case(name, setup, sized))
+        return setup
+    return decorator
+
+
+@case("validate_sync_request")
+def _validate_sync_request(inventory):
+    from app.schemas.agent import InventorySyncRequest
+
+    payload = {"agent_guid": "bench-agent", "sync_type": "full", "inventory": inventory, "last_sync": None}
+    return lambda: InventorySyncRequest.model_validate(payload)
+
+
+@case("validate_sync_request_dict")
+def _validate_sync_request_dict(inventory):
+    from pydantic import BaseModel
+
+    class UntypedInventorySyncRequest(BaseModel):
+        """The request schema before the inventory was typed, for comparison"""
+        agent_guid: str
+        sync_type: str
+        inventory: Dict[str, Any]
+        last_sync: Optional[Any] = None
+
+    payload = {"agent_guid": "bench-agent", "sync_type": "full", "inventory": inventory, "last_sync": None}
+    return lambda: UntypedInventorySyncRequest.model_validate(payload)
+
+
+@case("validate_installed_software")
+def _validate_installed_software(inventory):
+    from app.schemas.inventory import InventoryData
+
+    return lambda: InventoryData.model_validate(inventory).software.installed()
+
+
+@case("parse_sync_request_body")
+def _parse_sync_request_body(inventory):
+    from app.schemas.agent import InventorySyncRequest
+
+    body = json.dumps({"agent_guid": "bench-agent", "sync_type": "full", "inventory": inventory, "last_sync": None})
+    return lambda: InventorySyncRequest.model_validate(json.loads(body))
+
+
+@case("json_dumps_inventory")
+def _json_dumps_inventory(inventory):
+    return lambda: json.dumps(inventory)
+
+
+@case("json_loads_inventory")
+def _json_loads_inventory(inventory):
+    text = json.dumps(inventory)
+    return lambda: json.loads(text)
+
+
+@case("codec_dumps_inventory")
+def _codec_dumps_inventory(inventory):
+    from app.core import codec
+
+    return lambda: codec.dumps(inventory)
+
+
+@case("codec_loads_inventory")
+def _codec_loads_inventory(inventory):
+    from app.core import codec
+
+    text = json.dumps(inventory)
+    return lambda: codec.loads(text)
+
+
+def _inventory_endpoint_app(fast: bool):
+    """Inventory sync endpoint minus the database: parse, store as JSON, respond"""
+    from fastapi import APIRouter, FastAPI
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import APIRoute
+    from app.core import codec
+    from app.schemas.agent import InventorySyncRequest, InventorySyncResponse
+
+    router = APIRouter(route_class=codec.CodecRoute if fast else APIRoute)
+    serialize = codec.dumps if fast else json.dumps
+
+    @router.post("/api/v1/inventory/full", response_model=InventorySyncResponse)
+    async def sync_full_inventory(request: InventorySyncRequest):
+        serialize(request.inventory.as_dict())  # the JSON column write
+        return InventorySyncResponse(status="success", message="Inventory synced successfully")
+
+    app = FastAPI(default_response_class=codec.DefaultJSONResponse if fast else JSONResponse)
+    app.include_router(router)
+    return app
+
+
+def _inventory_endpoint(fast: bool):
+    def setup(inventory):
+        import asyncio
+        import httpx
+
+        loop = asyncio.new_event_loop()
+        transport = httpx.ASGITransport(app=_inventory_endpoint_app(fast))
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+        body = json.dumps({"agent_guid": "bench-agent", "sync_type": "full", "inventory": inventory}).encode()
+        headers = {"Content-Type": "application/json"}
+        return lambda: loop.run_until_complete(client.post("/api/v1/inventory/full", content=body, headers=headers))
+    return setup
+
+
+case("endpoint_inventory_sync_stdlib")(_inventory_endpoint(False))
+case("endpoint_inventory_sync_codec")(_inventory_endpoint(True))
+
+
+def _heartbeat_endpoint(instrumented: bool):
+    """Heartbeat endpoint minus the database, with or without the instrumentation middleware"""
+    def setup(inventory):
+        import asyncio
+        import httpx
+        from fastapi import APIRouter, FastAPI
+        from app.core import codec, tracing
+        from app.core.metrics import MetricsMiddleware
+        from app.core.querystats import QueryStatsMiddleware
+        from app.schemas.agent import HeartbeatRequest, HeartbeatResponse
+
+        router = APIRouter(route_class=codec.CodecRoute)
+
+        @router.post("/api/v1/agents/heartbeat", response_model=HeartbeatResponse)
+        async def heartbeat(request: HeartbeatRequest):
+            return HeartbeatResponse(status="success", message="Heartbeat received", config_updated=False)
+
+        app = FastAPI(default_response_class=codec.NegotiatedResponse)
+        app.include_router(router)
+
+        class DiscardExporter(tracing.SpanExporter):
+            def export(self, spans):
+                pass
+
+        # Every request sampled, as the worst case; swapped in only while timing
+        bench_tracer = tracing.Tracer(DiscardExporter(), sample_rate=1.0)
+        if instrumented:
+            # Same order as app.main: tracing outermost, then metrics, then query stats
+            app.add_middleware(QueryStatsMiddleware)
+            app.add_middleware(MetricsMiddleware)
+            app.add_middleware(tracing.TracingMiddleware)
+
+        loop = asyncio.new_event_loop()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+        body = json.dumps({"agent_guid": "bench-agent", "version": "1.0.0", "status": "healthy"}).encode()
+        headers = {"Content-Type": "application/json"}
+
+        def request():
+            previous, tracing.tracer = tracing.tracer, bench_tracer
+            try:
+                return loop.run_until_complete(client.post("/api/v1/agents/heartbeat", content=body, headers=headers))
+            finally:
+                tracing.tracer = previous
+        return request
+    return setup
+
+
+case("endpoint_heartbeat_bare", sized=False)(_heartbeat_endpoint(False))
+case("endpoint_heartbeat_instrumented", sized=False)(_heartbeat_endpoint(True))
+
+
+@case("map_inventory_to_snipeit")
+def _map_inventory_to_snipeit(inventory):
+    from app.services.snipeit_service import SnipeItService
+
+    service = SnipeItService()
+    return lambda: service.map_inventory_to_snipeit(inventory)
+
+
+@case("get_disk_info", sized=False)
+def _get_disk_info(inventory):
+    from app.services.snipeit_service import SnipeItService
+
+    service = SnipeItService()
+    disks = inventory["hardware"]["disks"] * 4
+    return lambda: service._get_disk_info(disks)
+
+
+def _run_unsuspended(coroutine) -> Any:
+    """Result of a coroutine that never suspends, without an event loop's overhead"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    coroutine.close()
+    raise RuntimeError("coroutine suspended")
+
+
+@case("rate_limit_check", sized=False)
+def _rate_limit_check(inventory):
+    from app.core.ratelimit import BucketLimit, MemoryBucketStore, RateLimiter
+
+    # A fleet's worth of agents over a few sites, with limits none of them reach
+    limiter = RateLimiter(
+        MemoryBucketStore(),
+        {"heartbeat": BucketLimit.per_minute(1_000_000, 1_000_000)},
+        BucketLimit.per_minute(1_000_000_000, 1_000_000_000)
+    )
+    agents = [(f"bench-agent-{n}", f"SITE{n % 20}") for n in range(10_000)]
+    turn = iter(range(1 << 62))
+
+    def check():
+        agent_guid, site_code = agents[next(turn) % len(agents)]
+        _run_unsuspended(limiter.check("heartbeat", agent_guid, site_code))
+    return check
+
+
+def measure(func: Callable[[], Any], min_time: float = 0.2, rounds: int = 5) -> Dict[str, float]:
+    """ops/sec over `rounds` timed rounds of at least `min_time` each, plus peak allocation"""
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / 10:
+            break
+        iterations *= 10
+    iterations = max(1, int(iterations * min_time / elapsed))
+
+    rates = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        rates.append(iterations / (time.perf_counter() - started))
+
+    tracemalloc.start()
+    try:
+        func()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ops_per_sec": round(statistics.median(rates), 2),
+        "peak_alloc_bytes": max(0, peak - baseline),
+    }
+
+
+def run(sizes=SIZES, keyword: Optional[str] = None, min_time: float = 0.2, rounds: int = 5) -> Dict[str, Any]:
+    """Run every (matching) case at every size and return the JSON report"""
+    inventories = {size: make_inventory(random.Random(size), 0, size) for size in sizes}
+    results = {}
+    for bench in CASES:
+        if keyword and keyword not in bench.name:
+            continue
+        for size in (sizes if bench.sized else sizes[:1]):
+            key = f"{bench.name}[{size}]" if bench.sized else bench.name
+            results[key] = measure(bench.setup(inventories[size]), min_time, rounds)
+    return {
+        "environment": {"python": platform.python_version(), "machine": platform.machine()},
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Describe every case that regressed by more than `threshold` (a fraction)"""
+    regressions = []
+    for key, now in sorted(current["results"].items()):
+        before = baseline["results"].get(key)
+        if before is None:
+            continue
+        if now["ops_per_sec"] < before["ops_per_sec"] * (1 - threshold):
+            change = now["ops_per_sec"] / before["ops_per_sec"] - 1
+            regressions.append(
+                f"{key}: {before['ops_per_sec']:.0f} -> {now['ops_per_sec']:.0f} ops/sec ({change:+.0%})"
+            )
+        if before["peak_alloc_bytes"] and now["peak_alloc_bytes"] > before["peak_alloc_bytes"] * (1 + threshold):
+            change = now["peak_alloc_bytes"] / before["peak_alloc_bytes"] - 1
+            regressions.append(
+                f"{key}: {before['peak_alloc_bytes']} -> {now['peak_alloc_bytes']} bytes allocated ({change:+.0%})"
+            )
+    return regressions
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    print(f"{'case':<40} {'ops/sec':>14} {'peak alloc':>14}")
+    for key, result in report["results"].items():
+        print(f"{key:<40} {result['ops_per_sec']:>14,.1f} {result['peak_alloc_bytes']:>14,}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("run", "compare"):
+        command = commands.add_parser(name)
+        if name == "compare":
+            command.add_argument("baseline")
+            command.add_argument("current", nargs="?", help="report to check; omitted runs the suite now")
+            command.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                 help="allowed slowdown or allocation growth, as a fraction")
+        command.add_argument("--sizes", type=lambda text: tuple(int(s) for s in text.split(",")), default=SIZES)
+        command.add_argument("-k", dest="keyword", help="only cases whose name contains this")
+        command.add_argument("--min-time", type=float, default=0.2, help="seconds per timed round")
+        command.add_argument("--rounds", type=int, default=5)
+        command.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare" and args.current:
+        with open(args.current, encoding="utf-8") as file:
+            report = json.load(file)
+    else:
+        report = run(args.sizes, args.keyword, args.min_time, args.rounds)
+        _print_table(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(json.dumps(report, indent=2) + "\n")
+
+    if args.command == "run":
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(baseline, report, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""In-memory Snipe-IT API stand-in.
+
+Implements the parts of the Snipe-IT REST API the backend uses, with
+programmable latency, throttling and failures:
+
+    GET    /api/v1/hardware?search=&limit=&offset=
+    GET    /api/v1/hardware/{id}
+    POST   /api/v1/hardware
+    PATCH  /api/v1/hardware/{id}
+    GET    /api/v1/models | /api/v1/categories | /api/v1/statuslabels
+
+Drive it in-process through httpx.ASGITransport, for example
+`SnipeItService(transport=httpx.ASGITransport(app=SnipeItEmulator().app))`,
+or serve it over HTTP:
+
+    python -m benchmarks.snipeit_emulator --port 9000 --latency lognormal:0.08:0.5
+"""
+import argparse
+import asyncio
+import math
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+_ID_RE = re.compile(r"/\d+$")
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+@dataclass
+class LatencyProfile:
+    """Response delay distribution, in seconds"""
+    kind: str = "fixed"  # "fixed", "uniform" or "lognormal"
+    value: float = 0.0  # fixed delay, uniform minimum or lognormal median
+    spread: float = 0.0  # uniform maximum or lognormal sigma
+
+    @classmethod
+    def parse(cls, text: str) -> "LatencyProfile":
+        """Parse "fixed:0.05", "uniform:0.01:0.2" or "lognormal:0.08:0.5" """
+        kind, *values = text.split(":")
+        numbers = [float(value) for value in values] + [0.0, 0.0]
+        return cls(kind, numbers[0], numbers[1])
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.value, self.spread)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.value), self.spread) if self.value > 0 else 0.0
+        return self.value
+
+
+@dataclass
+class EmulatorConfig:
+    api_token: Optional[str] = None  # None accepts any bearer token
+    latency: LatencyProfile = field(default_factory=LatencyProfile)
+    error_rate: float = 0.0  # share of requests answered with a random 5xx
+    throttle_rate: float = 0.0  # share of requests answered with 429 regardless of the limit
+    rate_limit_per_minute: int = 0  # Snipe-IT's API throttle; 0 disables it
+    seed: int = 0
+
+
+class SnipeItEmulator:
+    def __init__(self, config: Optional[EmulatorConfig] = None):
+        self.config = config or EmulatorConfig()
+        self.rng = random.Random(self.config.seed)
+        self.hardware: Dict[int, Dict[str, Any]] = {}
+        self.models = [{"id": i, "name": f"Model {i}", "category": {"id": 1, "name": "Computer"}} for i in range(1, 121)]
+        self.categories = [{"id": i, "name": f"Category {i}", "category_type": "asset"} for i in range(1, 16)]
+        self.status_labels = [
+            {"id": 1, "name": "Ready to Deploy", "type": "deployable"},
+            {"id": 2, "name": "Pending", "type": "pending"},
+            {"id": 3, "name": "Archived", "type": "archived"},
+        ]
+        self.requests: Dict[str, int] = {}
+        self._next_id = 1
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self.app = self._build_app()
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="Snipe-IT emulator", openapi_url=None)
+
+        @app.middleware("http")
+        async def behaviour(request: Request, call_next):
+            key = f"{request.method} {_ID_RE.sub('/{id}', request.url.path)}"
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            delay = self.config.latency.sample(self.rng)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if not self._authorized(request):
+                return JSONResponse({"message": "Unauthenticated."}, status_code=401)
+            throttled = self._throttle()
+            if throttled is not None:
+                return throttled
+            if self.config.error_rate and self.rng.random() < self.config.error_rate:
+                status_code = self.rng.choice((500, 502, 503))
+                return JSONResponse({"message": "Server Error"}, status_code=status_code)
+            return await call_next(request)
+
+        @app.get("/api/v1/hardware")
+        async def list_hardware(search: str = "", limit: int = DEFAULT_LIMIT, offset: int = 0):
+            rows = list(self.hardware.values())
+            if search:
+                needle = search.lower()
+                rows = [
+                    row for row in rows
+                    if any(needle in str(row.get(name) or "").lower() for name in ("name", "serial", "asset_tag"))
+                ]
+            return self._page(rows, limit, offset)
+
+        @app.get("/api/v1/hardware/{hardware_id}")
+        async def get_hardware(hardware_id: int):
+            row = self.hardware.get(hardware_id)
+            if row is None:
+                return {"status": "error", "messages": "Asset does not exist.", "payload": None}
+            return row
+
+        @app.post("/api/v1/hardware")
+        async def create_hardware(request: Request):
+            data = await request.json()
+            errors = {name: [f"The {name} field is required."] for name in ("model_id", "status_id") if not data.get(name)}
+            if errors:
+                return {"status": "error", "messages": errors, "payload": None}
+            row = self._store(self._next_id, data)
+            self._next_id += 1
+            return {"status": "success", "messages": "Asset created successfully. :)", "payload": row}
+
+        @app.patch("/api/v1/hardware/{hardware_id}")
+        async def update_hardware(hardware_id: int, request: Request):
+            row = self.hardware.get(hardware_id)
+            if row is None:
+                return {"status": "error", "messages": "Asset does not exist.", "payload": None}
+            row = self._store(hardware_id, {**row, **(await request.json())})
+            return {"status": "success", "messages": "Asset updated successfully.", "payload": row}
+
+        @app.get("/api/v1/models")
+        async def list_models(limit: int = DEFAULT_LIMIT, offset: int = 0):
+            return self._page(self.models, limit, offset)
+
+        @app.get("/api/v1/categories")
+        async def list_categories(limit: int = DEFAULT_LIMIT, offset: int = 0):
+            return self._page(self.categories, limit, offset)
+
+        @app.get("/api/v1/statuslabels")
+        async def list_status_labels(limit: int = DEFAULT_LIMIT, offset: int = 0):
+            return self._page(self.status_labels, limit, offset)
+
+        return app
+
+    def _store(self, hardware_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        row = {**data, "id": hardware_id, "updated_at": {"datetime": time.strftime("%Y-%m-%d %H:%M:%S")}}
+        self.hardware[hardware_id] = row
+        return row
+
+    @staticmethod
+    def _page(rows: List[Dict[str, Any]], limit: int, offset: int) -> Dict[str, Any]:
+        limit = max(1, min(limit, MAX_LIMIT))
+        offset = max(0, offset)
+        return {"total": len(rows), "rows": rows[offset:offset + limit]}
+
+    def _authorized(self, request: Request) -> bool:
+        authorization = request.headers.get("authorization", "")
+        if not authorization.lower().startswith("bearer "):
+            return False
+        return self.config.api_token is None or authorization[7:] == self.config.api_token
+
+    def _throttle(self) -> Optional[JSONResponse]:
+        limit = self.config.rate_limit_per_minute
+        if self.config.throttle_rate and self.rng.random() < self.config.throttle_rate:
+            return self._too_many_requests(limit, 1)
+        if not limit:
+            return None
+
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start, self._window_count = now, 0
+        if self._window_count >= limit:
+            return self._too_many_requests(limit, max(1, int(60 - (now - self._window_start)) + 1))
+        self._window_count += 1
+        return None
+
+    @staticmethod
+    def _too_many_requests(limit: int, retry_after: int) -> JSONResponse:
+        return JSONResponse(
+            {"status": "error", "messages": "Too Many Requests", "payload": None},
+            status_code=429,
+            headers={"Retry-After": str(retry_after), "X-RateLimit-Limit": str(limit), "X-RateLimit-Remaining": "0"},
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the Snipe-IT emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default="fixed:0", help='e.g. "lognormal:0.08:0.5" (seconds)')
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=120, help="requests per minute, 0 disables")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    emulator = SnipeItEmulator(EmulatorConfig(
+        latency=LatencyProfile.parse(args.latency),
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit_per_minute=args.rate_limit,
+        seed=args.seed
+    ))
+    uvicorn.run(emulator.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Wire format comparison for inventory uploads.
+
+Encodes agent-shaped inventories with 10 to 5,000 software entries in
+JSON and each available binary format (MessagePack, CBOR) and reports
+the body size, gzipped size, and encode/decode throughput.
+
+    python -m benchmarks.wire
+    python -m benchmarks.wire --sizes 150,5000 --output wire.json
+"""
+import argparse
+import gzip
+import json
+import random
+import sys
+from typing import Any, Dict, List, Optional
+
+from benchmarks.inventory import make_inventory
+from benchmarks.micro import SIZES, measure
+
+
+def compare_formats(sizes=SIZES, min_time: float = 0.1, rounds: int = 3) -> Dict[str, Any]:
+    from app.core.codec import BINARY_FORMATS, JSON_FORMAT
+
+    formats = [JSON_FORMAT, *BINARY_FORMATS.values()]
+    results = {}
+    for size in sizes:
+        inventory = make_inventory(random.Random(size), 0, size)
+        payload = {"agent_guid": "bench-agent", "sync_type": "full", "inventory": inventory}
+        for wire in formats:
+            body = wire.dumps(payload)
+            results[f"{wire.name}[{size}]"] = {
+                "bytes": len(body),
+                "gzip_bytes": len(gzip.compress(body)),
+                "encode_ops_per_sec": measure(lambda: wire.dumps(payload), min_time, rounds)["ops_per_sec"],
+                "decode_ops_per_sec": measure(lambda: wire.loads(body), min_time, rounds)["ops_per_sec"],
+            }
+    return {"formats": [wire.name for wire in formats], "results": results}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=lambda text: tuple(int(s) for s in text.split(",")), default=SIZES)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = compare_formats(args.sizes)
+    print(f"{'format':<18} {'bytes':>12} {'gzip':>10} {'encode/s':>12} {'decode/s':>12}")
+    for key, result in report["results"].items():
+        print(f"{key:<18} {result['bytes']:>12,} {result['gzip_bytes']:>10,} "
+              f"{result['encode_ops_per_sec']:>12,.0f} {result['decode_ops_per_sec']:>12,.0f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""Latest inventory sections per agent for section syncs
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create inventory_sections table
+    op.create_table('inventory_sections',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('agent_id', sa.Integer(), nullable=False),
+        sa.Column('agent_guid', sa.String(length=36), nullable=False),
+        sa.Column('section', sa.String(length=50), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('agent_id', 'section', name='uq_inventory_sections_agent_section')
+    )
+    op.create_index(op.f('ix_inventory_sections_id'), 'inventory_sections', ['id'], unique=False)
+    op.create_index(op.f('ix_inventory_sections_agent_id'), 'inventory_sections', ['agent_id'], unique=False)
+    op.create_index(op.f('ix_inventory_sections_agent_guid'), 'inventory_sections', ['agent_guid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_inventory_sections_agent_guid'), table_name='inventory_sections')
+    op.drop_index(op.f('ix_inventory_sections_agent_id'), table_name='inventory_sections')
+    op.drop_index(op.f('ix_inventory_sections_id'), table_name='inventory_sections')
+    op.drop_table('inventory_sections')
@@ -0,0 +1,27 @@
+"""Idempotency keys on inventories so retried uploads are stored once
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('inventories', sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_unique_constraint(
+        'uq_inventories_agent_idempotency_key', 'inventories', ['agent_id', 'idempotency_key']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_inventories_agent_idempotency_key', 'inventories', type_='unique')
+    op.drop_column('inventories', 'idempotency_key')
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Precompute binary patches between consecutive agent versions
+
+Reads <store>/full/<version>.<ext> and writes
+<store>/patches/<from>__<to>.bsdiff for each consecutive pair that does
+not have a patch yet. Requires the optional `bsdiff4` package.
+"""
+import argparse
+import os
+import sys
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.rollout import parse_version
+from app.services.update_store import PATCH_SEPARATOR
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def build_patches(store: str, max_distance: int):
+    """Create missing patches for up to `max_distance` previous versions"""
+    try:
+        import bsdiff4
+    except ImportError:
+        logger.error("bsdiff4 is not installed: pip install bsdiff4")
+        raise SystemExit(1)
+
+    full_dir = os.path.join(store, "full")
+    patch_dir = os.path.join(store, "patches")
+    os.makedirs(patch_dir, exist_ok=True)
+
+    packages = {}
+    for name in os.listdir(full_dir):
+        if name.startswith("."):
+            continue
+        version = os.path.splitext(name)[0]
+        if parse_version(version) is None:
+            logger.warning("Skipping %s: not a version number", name)
+            continue
+        packages[version] = os.path.join(full_dir, name)
+    # Numeric order, with prereleases before their release: 1.9.0, 1.10.0-rc.1, 1.10.0
+    versions = sorted(packages, key=parse_version)
+
+    for index, to_version in enumerate(versions):
+        for from_version in versions[max(0, index - max_distance):index]:
+            target = os.path.join(patch_dir, f"{from_version}{PATCH_SEPARATOR}{to_version}.bsdiff")
+            if os.path.exists(target):
+                continue
+            logger.info("Building patch %s -> %s", from_version, to_version)
+            # Hidden temp name so the server never picks up a partial file
+            partial = os.path.join(patch_dir, f".{os.path.basename(target)}.tmp")
+            bsdiff4.file_diff(packages[from_version], packages[to_version], partial)
+            os.replace(partial, target)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store", default=settings.UPDATE_ARTIFACT_DIR, help="Update artifact directory")
+    parser.add_argument("--max-distance", type=int, default=1,
+                        help="Build patches from this many previous versions (1 = consecutive only)")
+    args = parser.parse_args()
+    build_patches(args.store, args.max_distance)
+
+if __name__ == "__main__":
+    main()
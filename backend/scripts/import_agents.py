@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Pre-register agents for a site rollout through /api/v1/agents/import
+
+Reads a CSV file (with a header row) or NDJSON file of registration rows
+(agent_guid, hostname, serial, domain, version, site_code), streams it to
+the server and writes the NDJSON results, which hold the device token
+issued to each agent, to the output file.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import httpx
+
+# Add the app directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+
+
+def read_chunks(path: str, size: int = 65536):
+    with open(path, "rb") as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+def import_agents(path: str, url: str, token: str, output) -> dict:
+    """Upload `path` and copy result lines to `output`; returns the summary"""
+    content_type = "text/csv" if path.lower().endswith(".csv") else "application/x-ndjson"
+    summary = {}
+    with httpx.Client(timeout=httpx.Timeout(30.0, read=None)) as client:
+        with client.stream(
+            "POST", f"{url.rstrip('/')}/api/v1/agents/import",
+            content=read_chunks(path),
+            headers={"Content-Type": content_type, "Authorization": f"Bearer {token}"}
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                raise SystemExit(f"Import failed: HTTP {response.status_code} {response.text}")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                result = json.loads(line)
+                if "index" in result:
+                    output.write(line + "\n")
+                    if result["status"] != "success":
+                        print(f"row {result['index']}: {result.get('message')}", file=sys.stderr)
+                else:
+                    summary = result
+    return summary
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("file", help="CSV (.csv) or NDJSON file of registration rows")
+    parser.add_argument("--url", default="http://localhost:8000", help="Backend base URL")
+    parser.add_argument("--token", default=settings.ADMIN_API_TOKEN, help="Admin API token")
+    parser.add_argument("--output", default="-", help="Where to write the NDJSON results (- for stdout)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.output == "-":
+        summary = import_agents(args.file, args.url, args.token, sys.stdout)
+    else:
+        with open(args.output, "w") as output:
+            summary = import_agents(args.file, args.url, args.token, output)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{summary.get('processed', 0)} rows: {summary.get('created', 0)} created, "
+        f"{summary.get('updated', 0)} updated, {summary.get('failed', 0)} failed; "
+        f"{summary.get('rows_per_second', 0)} rows/s on the server, "
+        f"{summary.get('processed', 0) / elapsed:.1f} rows/s end to end",
+        file=sys.stderr
+    )
+    if summary.get("failed"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
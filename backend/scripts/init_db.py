@@ -24,13 +24,13 @@ async def init_db():
             await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
     except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
+        logger.error("Error creating database tables: %s", e)
         raise
 
 async def main():
     """Main function"""
     logger.info("Initializing database...")
-    logger.info(f"Database URL: {settings.DATABASE_URL}")
+    logger.info("Database URL: %s", settings.DATABASE_URL)
     await init_db()
     logger.info("Database initialization completed")
 
@@ -0,0 +1,99 @@
+import os
+import pytest
+import pytest_asyncio
+from contextlib import contextmanager
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models import agent  # noqa: F401  registers the tables on Base
+from app.core.querystats import QueryStats, _current, instrument_engine
+
+# Budgets run against a real database; point this at PostgreSQL to also
+# cover the statements only PostgreSQL can run
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite+aiosqlite://")
+
+
+class QueryBudget:
+    """Counts the SQL statements and commits an engine runs inside a block.
+
+    Counting happens in the engine events QueryStatsMiddleware relies on,
+    so INSERTs and UPDATEs flushed by commit(), lazy loads and N+1 selects
+    all count.
+    """
+
+    @contextmanager
+    def __call__(self, statements: int, commits: int):
+        stats = QueryStats()
+        token = _current.set(stats)
+        try:
+            yield stats
+        finally:
+            _current.reset(token)
+        assert stats.statements <= statements, (
+            f"Query budget exceeded: {stats.statements} statements (budget {statements})"
+        )
+        assert stats.commits <= commits, (
+            f"Commit budget exceeded: {stats.commits} commits (budget {commits})"
+        )
+
+
+@pytest.fixture
+def query_budget():
+    """Assert a block stays within a statement/commit budget:
+
+        with query_budget(statements=1, commits=1):
+            await service.send_heartbeat(request)
+    """
+    return QueryBudget()
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    """Engine on an empty schema, counted by query_budget"""
+    engine = create_async_engine(TEST_DATABASE_URL, poolclass=StaticPool)
+    instrument_engine(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db_session(db_engine):
+    """Session configured like AsyncSessionLocal, on the test engine"""
+    async with async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgres: needs TEST_DATABASE_URL to be a PostgreSQL database")
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_DATABASE_URL.startswith("postgresql"):
+        return
+    skip = pytest.mark.skip(reason="PostgreSQL-only SQL; set TEST_DATABASE_URL to run it")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def revocation_list(monkeypatch):
+    """The process-wide device token revocation list, empty for every test"""
+    from app.core.security import revocation_list
+
+    monkeypatch.setattr(revocation_list, "_revoked", {})
+    monkeypatch.setattr(revocation_list, "last_refresh", None)
+    return revocation_list
+
+
+@pytest.fixture(autouse=True)
+def idempotency_cache():
+    """The process-wide cache of answered uploads, emptied around every test"""
+    from app.core.idempotency import idempotency_cache
+
+    idempotency_cache.clear()
+    yield idempotency_cache
+    idempotency_cache.clear()
@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.admission import AdmissionClass, AdmissionController, AdmissionMiddleware, build_admission_controller
+
+@pytest.fixture
+def controller():
+    classes = [
+        AdmissionClass("heartbeat", 0, max_concurrency=1, max_queue=2, queue_timeout=0.2),
+        AdmissionClass("bulk", 2, max_concurrency=1, max_queue=1, queue_timeout=0.05),
+    ]
+    rules = [
+        ("/api/v1/agents/heartbeat", "heartbeat"),
+        ("/api/v1/inventory/full", "bulk"),
+    ]
+    return AdmissionController(classes, rules)
+
+class TestAdmissionController:
+
+    def test_classify(self, controller):
+        """Test path classification"""
+        assert controller.classify("/api/v1/agents/heartbeat").name == "heartbeat"
+        assert controller.classify("/api/v1/inventory/full").name == "bulk"
+        assert controller.classify("/healthz") is None
+
+    def test_batch_routes_are_bulk(self):
+        """Test batch routes do not inherit the class of their single-item prefix"""
+        controller = build_admission_controller()
+
+        assert controller.classify("/api/v1/agents/heartbeat").name == "heartbeat"
+        assert controller.classify("/api/v1/agents/heartbeat:batch").name == "bulk"
+        assert controller.classify("/api/v1/inventory/delta").name == "delta"
+        assert controller.classify("/api/v1/inventory/delta:batch").name == "bulk"
+
+    @pytest.mark.asyncio
+    async def test_queue_and_handover(self, controller):
+        """Test that a queued request gets the slot on release"""
+        heartbeat = controller.classes["heartbeat"]
+
+        assert await controller.acquire(heartbeat) is True
+        waiter = asyncio.create_task(controller.acquire(heartbeat))
+        await asyncio.sleep(0)
+        assert heartbeat.queued == 1
+
+        controller.release(heartbeat)
+        assert await waiter is True
+        assert heartbeat.in_flight == 1
+
+        controller.release(heartbeat)
+        assert heartbeat.in_flight == 0
+        assert heartbeat.admitted == 2
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_sheds(self, controller):
+        """Test that waiting past the queue timeout sheds the request"""
+        bulk = controller.classes["bulk"]
+
+        assert await controller.acquire(bulk) is True
+        assert await controller.acquire(bulk) is False
+        assert bulk.timed_out == 1
+        assert bulk.shed == 1
+        assert bulk.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_lower_priority_shed_while_higher_queued(self, controller):
+        """Test that bulk requests are shed while heartbeats are queueing"""
+        heartbeat = controller.classes["heartbeat"]
+        bulk = controller.classes["bulk"]
+
+        assert await controller.acquire(heartbeat) is True
+        waiter = asyncio.create_task(controller.acquire(heartbeat))
+        await asyncio.sleep(0)
+
+        assert await controller.acquire(bulk) is False
+        assert bulk.shed == 1
+
+        controller.release(heartbeat)
+        assert await waiter is True
+
+class TestAdmissionMiddleware:
+
+    def test_rejects_with_retry_after(self, controller):
+        """Test overflow is rejected with 429 and Retry-After"""
+        app = FastAPI()
+        app.add_middleware(AdmissionMiddleware, controller=controller)
+
+        @app.post("/api/v1/inventory/full")
+        async def full():
+            return {"status": "success"}
+
+        bulk = controller.classes["bulk"]
+        bulk.in_flight = bulk.max_concurrency
+        bulk.max_queue = 0
+
+        with TestClient(app) as client:
+            response = client.post("/api/v1/inventory/full")
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert bulk.shed == 1
@@ -0,0 +1,110 @@
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.exc import OperationalError
+from app.api.v1.endpoints import agents
+from app.core.database import get_db
+from app.services.agent_service import AgentService
+
+HEADERS = {"Authorization": "Bearer admin-token"}
+FIELDS = ("agent_guid", "hostname", "serial", "domain", "version", "site_code")
+
+def row(n):
+    return {"agent_guid": f"guid-{n}", "hostname": f"PC-{n}", "serial": f"S{n}",
+            "domain": "corp.local", "version": "1.0.0", "site_code": "HQ"}
+
+def csv_body(rows):
+    lines = [",".join(FIELDS)] + [",".join(r[field] for field in FIELDS) for r in rows]
+    return ("\n".join(lines) + "\n").encode()
+
+def ndjson_body(rows):
+    return b"".join(json.dumps(r).encode() + b"\n" for r in rows)
+
+def results(response):
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return lines[:-1], lines[-1]
+
+@pytest.fixture
+def register_agents(monkeypatch):
+    async def upsert(requests):
+        # guid-0 and guid-1 exist already; guid-1 was imported without a token
+        return [Mock(id=n, agent_guid=r.agent_guid, device_token=f"token-{r.agent_guid}",
+                     previous_token="old" if r.agent_guid == "guid-0" else None,
+                     created=r.agent_guid not in ("guid-0", "guid-1"))
+                for n, r in enumerate(requests)]
+    mock = AsyncMock(side_effect=upsert)
+    monkeypatch.setattr(AgentService, "register_agents", mock)
+    return mock
+
+@pytest.fixture
+def client(monkeypatch, register_agents):
+    monkeypatch.setattr(agents.settings, "ADMIN_API_TOKEN", "admin-token")
+    monkeypatch.setattr(agents.settings, "AGENT_IMPORT_BATCH_SIZE", 2)
+    app = FastAPI()
+    app.include_router(agents.router, prefix="/api/v1/agents")
+    app.dependency_overrides[get_db] = lambda: AsyncMock()
+    return TestClient(app)
+
+class TestAgentImport:
+
+    @pytest.mark.parametrize("content_type,body", [("text/csv", csv_body), ("application/x-ndjson", ndjson_body)])
+    def test_import_streams_tokens(self, client, register_agents, content_type, body):
+        """Test rows are upserted in batches and every agent gets its token back"""
+        response = client.post("/api/v1/agents/import", content=body([row(n) for n in range(5)]),
+                               headers={**HEADERS, "Content-Type": content_type})
+
+        assert response.status_code == 200
+        lines, summary = results(response)
+        assert [line["device_token"] for line in lines] == [f"token-guid-{n}" for n in range(5)]
+        assert [line["created"] for line in lines] == [False, False, True, True, True]
+        assert [len(call.args[0]) for call in register_agents.await_args_list] == [2, 2, 1]
+        assert summary["processed"] == 5
+        assert (summary["created"], summary["updated"], summary["failed"]) == (3, 2, 0)
+        assert summary["rows_per_second"] > 0
+
+    def test_lines_split_across_chunks(self, client, register_agents):
+        """Test rows cut at any chunk boundary, and a last line without a newline, are read whole"""
+        body = ndjson_body([row(n) for n in range(3)]).rstrip(b"\n")
+        chunks = [body[start:start + 7] for start in range(0, len(body), 7)]
+
+        response = client.post("/api/v1/agents/import", content=iter(chunks),
+                               headers={**HEADERS, "Content-Type": "application/x-ndjson"})
+
+        lines, summary = results(response)
+        assert [line["agent_guid"] for line in lines] == ["guid-0", "guid-1", "guid-2"]
+        assert summary["failed"] == 0
+
+    def test_invalid_rows_and_duplicates(self, client, register_agents):
+        """Test bad rows are reported and a repeated agent starts a new batch"""
+        body = csv_body([row(1), row(1)]) + b"guid-x,only-two-fields\n"
+
+        response = client.post("/api/v1/agents/import", content=body,
+                               headers={**HEADERS, "Content-Type": "text/csv"})
+
+        lines, summary = results(response)
+        assert [line["status"] for line in lines] == ["success", "error", "success"]
+        assert lines[1]["index"] == 2
+        assert [len(call.args[0]) for call in register_agents.await_args_list] == [1, 1]
+        assert summary["failed"] == 1
+
+    def test_database_error_fails_the_batch(self, client, register_agents):
+        """Test a rejected batch is reported per row and the import carries on"""
+        register_agents.side_effect = [OperationalError("INSERT", {}, Exception("down")),
+                                       [Mock(id=3, agent_guid="guid-3", device_token="t", previous_token=None, created=True)]]
+
+        response = client.post("/api/v1/agents/import", content=ndjson_body([row(1), row(2), row(3)]),
+                               headers={**HEADERS, "Content-Type": "application/x-ndjson"})
+
+        lines, summary = results(response)
+        assert [line["status"] for line in lines] == ["error", "error", "success"]
+        assert summary["failed"] == 2
+
+    def test_requires_admin_and_row_format(self, client):
+        """Test the admin token and a CSV or NDJSON body are required"""
+        body = ndjson_body([row(1)])
+
+        assert client.post("/api/v1/agents/import", content=body,
+                           headers={"Content-Type": "application/x-ndjson"}).status_code == 401
+        assert client.post("/api/v1/agents/import", json=[row(1)], headers=HEADERS).status_code == 415
@@ -1,5 +1,8 @@
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.agent_service import AgentService
 from app.schemas.agent import (
@@ -7,6 +10,7 @@ from app.schemas.agent import (
     InventorySyncRequest, UpdateCheckRequest
 )
 from app.models.agent import Agent
+from app.core.security import DeviceClaims
 from datetime import datetime
 
 @pytest.fixture
@@ -60,17 +64,24 @@ def sample_update_check_request():
 
 class TestAgentService:
     
+    @staticmethod
+    def upserted(db, previous_token=None):
+        """Make the upsert return one agent, new unless previous_token is given"""
+        def execute(statement):
+            values = statement.compile(dialect=postgresql.dialect()).params
+            result = Mock()
+            result.all.return_value = [Mock(id=1, agent_guid=values["agent_guid_m0"],
+                                            device_token=values["device_token_m0"],
+                                            previous_token=previous_token,
+                                            created=previous_token is None)]
+            return result
+        db.execute = AsyncMock(side_effect=execute)
+        db.add = Mock()
+    
     @pytest.mark.asyncio
     async def test_register_agent_new(self, agent_service, sample_registration_request):
         """Test registering a new agent"""
-        # Mock database query to return no existing agent
-        agent_service.db.execute.return_value.scalar_one_or_none.return_value = None
-        
-        # Mock database operations
-        agent_service.db.add = Mock()
-        agent_service.db.commit = AsyncMock()
-        agent_service.db.refresh = AsyncMock()
-        agent_service._log_audit = AsyncMock()
+        self.upserted(agent_service.db)
         
         result = await agent_service.register_agent(sample_registration_request)
         
@@ -78,32 +89,49 @@ class TestAgentService:
         assert result.policy is not None
         assert result.policy["heartbeat_interval"] == 15
         
-        # Verify database operations
+        # One upsert, the audit entry added to the same commit
+        agent_service.db.execute.assert_awaited_once()
         agent_service.db.add.assert_called_once()
-        agent_service.db.commit.assert_called_once()
-        agent_service._log_audit.assert_called_once()
+        agent_service.db.commit.assert_awaited_once()
     
     @pytest.mark.asyncio
-    async def test_register_agent_existing(self, agent_service, sample_registration_request):
-        """Test updating an existing agent"""
-        # Mock existing agent
-        existing_agent = Mock()
-        existing_agent.hostname = "OLD-PC"
-        existing_agent.serial_number = "OLD123"
-        
-        agent_service.db.execute.return_value.scalar_one_or_none.return_value = existing_agent
-        agent_service.db.commit = AsyncMock()
-        agent_service.db.refresh = AsyncMock()
-        agent_service._log_audit = AsyncMock()
+    async def test_register_agent_existing(self, agent_service, sample_registration_request, revocation_list):
+        """Test re-registering an agent revokes its previous token"""
+        from app.core.security import create_device_token, read_token_claims
+        previous_token = create_device_token("test-guid-123", "TEST")
+        self.upserted(agent_service.db, previous_token)
         
         result = await agent_service.register_agent(sample_registration_request)
         
-        assert result.device_token is not None
-        assert existing_agent.hostname == sample_registration_request.hostname
-        assert existing_agent.serial_number == sample_registration_request.serial
+        assert result.device_token != previous_token
+        assert read_token_claims(previous_token)["jti"] in revocation_list
+        assert agent_service.db.add.call_count == 2  # revoked token and audit entry
+        agent_service.db.commit.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_register_agent_failed_commit_keeps_token(self, agent_service, sample_registration_request,
+                                                            revocation_list):
+        """Test the previous token stays valid when the re-registration is not committed"""
+        from app.core.security import create_device_token, read_token_claims
+        previous_token = create_device_token("test-guid-123", "TEST")
+        self.upserted(agent_service.db, previous_token)
+        agent_service.db.commit.side_effect = OperationalError("COMMIT", {}, Exception("down"))
         
-        agent_service.db.commit.assert_called_once()
-        agent_service._log_audit.assert_called_once()
+        with pytest.raises(OperationalError):
+            await agent_service.register_agent(sample_registration_request)
+        
+        assert read_token_claims(previous_token)["jti"] not in revocation_list
+    
+    @pytest.mark.asyncio
+    async def test_register_agents_is_one_upsert(self, agent_service, sample_registration_request):
+        """Test the registration statement is a single INSERT ... ON CONFLICT ... RETURNING"""
+        self.upserted(agent_service.db)
+        
+        await agent_service.register_agents([sample_registration_request])
+        
+        sql = str(agent_service.db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (agent_guid) DO UPDATE" in sql
+        assert "RETURNING" in sql and "xmax = 0 AS created" in sql
     
     @pytest.mark.asyncio
     async def test_send_heartbeat_success(self, agent_service, sample_heartbeat_request):
@@ -113,7 +141,7 @@ class TestAgentService:
         agent.id = 1
         agent.agent_guid = sample_heartbeat_request.agent_guid
         
-        agent_service.db.execute.return_value.scalar_one_or_none.return_value = agent
+        agent_service.db.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=agent))
         agent_service.db.commit = AsyncMock()
         
         result = await agent_service.send_heartbeat(sample_heartbeat_request)
@@ -127,13 +155,39 @@ class TestAgentService:
     @pytest.mark.asyncio
     async def test_send_heartbeat_agent_not_found(self, agent_service, sample_heartbeat_request):
         """Test heartbeat when agent not found"""
-        agent_service.db.execute.return_value.scalar_one_or_none.return_value = None
+        agent_service.db.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=None))
         
         result = await agent_service.send_heartbeat(sample_heartbeat_request)
         
         assert result.status == "error"
         assert result.message == "Agent not found"
     
+    @pytest.mark.asyncio
+    async def test_send_heartbeat_renews_legacy_token(self, agent_service, sample_heartbeat_request):
+        """Test an agent still on an opaque token is handed a signed one"""
+        from app.core.security import verify_device_token
+        agent = Mock(id=1, agent_guid="test-guid-123", site_code="TEST", device_token="legacy-token")
+        agent_service.db.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=agent))
+        
+        result = await agent_service.send_heartbeat(sample_heartbeat_request, "legacy-token")
+        
+        assert verify_device_token(result.device_token).agent_guid == "test-guid-123"
+        assert agent.device_token == result.device_token
+        agent_service.db.commit.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_send_heartbeat_keeps_current_token(self, agent_service, sample_heartbeat_request):
+        """Test a signed token far from expiry is not renewed"""
+        from app.core.security import create_device_token
+        token = create_device_token("test-guid-123", "TEST")
+        agent = Mock(id=1, agent_guid="test-guid-123", site_code="TEST", device_token=token)
+        agent_service.db.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=agent))
+        
+        result = await agent_service.send_heartbeat(sample_heartbeat_request, token)
+        
+        assert result.device_token is None
+        assert agent.device_token == token
+    
     @pytest.mark.asyncio
     async def test_sync_inventory_success(self, agent_service, sample_inventory_sync_request):
         """Test successful inventory sync"""
@@ -142,7 +196,7 @@ class TestAgentService:
         agent.id = 1
         agent.agent_guid = sample_inventory_sync_request.agent_guid
         
-        agent_service.db.execute.return_value.scalar_one_or_none.return_value = agent
+        agent_service.db.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=agent))
         agent_service.db.commit = AsyncMock()
         agent_service._sync_to_snipeit = AsyncMock(return_value=True)
         agent_service._log_audit = AsyncMock()
@@ -160,7 +214,7 @@ class TestAgentService:
     @pytest.mark.asyncio
     async def test_sync_inventory_agent_not_found(self, agent_service, sample_inventory_sync_request):
         """Test inventory sync when agent not found"""
-        agent_service.db.execute.return_value.scalar_one_or_none.return_value = None
+        agent_service.db.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=None))
         
         result = await agent_service.sync_inventory(sample_inventory_sync_request)
         
@@ -181,6 +235,26 @@ class TestAgentService:
             assert result.latest_version == "1.1.0"
             assert result.download_url == "https://example.com/download"
     
+    @pytest.mark.asyncio
+    async def test_check_for_updates_patch_only_in_packages(self, agent_service, sample_update_check_request):
+        """Test a patch route is offered in packages while download_url stays the full installer"""
+        from app.services.update_store import UpdateArtifact
+        patch_artifact = UpdateArtifact(name="patches/1.0.0__1.1.0.bsdiff", kind="patch", to_version="1.1.0",
+                                        from_version="1.0.0", path="", size=10, sha256="ab", mtime=0.0)
+        with patch('app.services.agent_service.settings') as mock_settings, \
+                patch('app.services.agent_service.update_store') as store:
+            mock_settings.UPDATE_CHECK_ENABLED = True
+            mock_settings.LATEST_VERSION = "1.1.0"
+            mock_settings.UPDATE_DOWNLOAD_URL = "https://example.com/download"
+            store.best_route.return_value = [patch_artifact]
+            
+            result = await agent_service.check_for_updates(sample_update_check_request)
+            
+            assert result.download_url == "https://example.com/download"
+            assert [package.url for package in result.packages] == [
+                "/api/v1/update/download/patches/1.0.0__1.1.0.bsdiff"
+            ]
+    
     @pytest.mark.asyncio
     async def test_check_for_updates_not_available(self, agent_service, sample_update_check_request):
         """Test update check when no update is available"""
@@ -220,3 +294,123 @@ class TestAgentService:
             assert result.full_sync_time == "03:00"
             assert result.max_retry_attempts == 3
             assert result.retry_delay_seconds == 30
+    
+    @pytest.mark.asyncio
+    async def test_send_heartbeats_batch(self, agent_service, sample_heartbeat_request):
+        """Test heartbeat batch writes all rows with a single commit"""
+        agent = Mock()
+        agent.id = 1
+        agent.agent_guid = sample_heartbeat_request.agent_guid
+        missing = sample_heartbeat_request.model_copy(update={"agent_guid": "missing-guid"})
+        
+        agent_service._get_agents = AsyncMock(return_value={agent.agent_guid: agent})
+        agent_service.db.execute = AsyncMock()
+        agent_service.db.commit = AsyncMock()
+        
+        results = await agent_service.send_heartbeats_batch([
+            (0, sample_heartbeat_request),
+            (1, missing)
+        ])
+        
+        assert [r.status for r in results] == ["success", "error"]
+        assert results[1].message == "Agent not found"
+        assert agent_service.db.execute.call_count == 2  # heartbeat insert + agent update
+        agent_service.db.commit.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_sync_inventory_batch_rejects_full(self, agent_service, sample_inventory_sync_request):
+        """Test inventory batch only accepts delta items"""
+        full = sample_inventory_sync_request.model_copy(update={"sync_type": "full"})
+        
+        agent_service._get_agents = AsyncMock(return_value={})
+        agent_service.db.commit = AsyncMock()
+        
+        results = await agent_service.sync_inventory_batch([(0, full)])
+        
+        assert results[0].status == "error"
+        assert results[0].message == "Sync type must be 'delta'"
+        agent_service.db.commit.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_sync_inventory_batch_pushes_after_commit(self, agent_service, sample_inventory_sync_request):
+        """Test Snipe-IT is not updated when the inventory rows are not committed"""
+        agent = Mock(id=1, agent_guid=sample_inventory_sync_request.agent_guid)
+        agent_service._get_agents = AsyncMock(return_value={agent.agent_guid: agent})
+        agent_service._sync_to_snipeit = AsyncMock(return_value=True)
+        agent_service.db.scalars.return_value = Mock(all=Mock(return_value=[7]))
+        agent_service.db.commit.side_effect = OperationalError("COMMIT", {}, Exception("down"))
+        
+        with pytest.raises(OperationalError):
+            await agent_service.sync_inventory_batch([(0, sample_inventory_sync_request)])
+        
+        agent_service._sync_to_snipeit.assert_not_awaited()
+
+class TestAgentServiceQueryBudgets:
+    """SQL statement and commit budgets for the agent hot paths, on a real engine"""
+    
+    @pytest_asyncio.fixture
+    async def service(self, db_session):
+        for n in range(50):
+            db_session.add(Agent(agent_guid=f"guid-{n}", hostname=f"PC-{n}", serial_number=f"S{n}",
+                                 site_code="TEST", device_token=f"token-{n}", version="1.0.0"))
+        await db_session.commit()
+        service = AgentService(db_session)
+        service._sync_to_snipeit = AsyncMock(return_value=True)
+        return service
+    
+    @staticmethod
+    def heartbeat(n=0):
+        return HeartbeatRequest(agent_guid=f"guid-{n}", version="1.0.1", status="healthy")
+    
+    @staticmethod
+    def inventory(n=0, sync_type="delta"):
+        return InventorySyncRequest(agent_guid=f"guid-{n}", sync_type=sync_type,
+                                    inventory={"device_identity": {"hostname": f"PC-{n}"}})
+    
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_register_agent_budget(self, service, query_budget, sample_registration_request):
+        """Test registration: one upsert and one commit"""
+        with query_budget(statements=1, commits=1):
+            await service.register_agent(sample_registration_request)
+    
+    @pytest.mark.asyncio
+    async def test_send_heartbeat_budget(self, service, query_budget):
+        """Test heartbeat: agent lookup, heartbeat insert and agent update in one commit"""
+        with query_budget(statements=3, commits=1):
+            await service.send_heartbeat(self.heartbeat())
+    
+    @pytest.mark.asyncio
+    async def test_sync_inventory_budget(self, service, query_budget):
+        """Test inventory sync: lookup, inventory and agent writes, Snipe-IT flag and audit"""
+        with query_budget(statements=5, commits=3):
+            await service.sync_inventory(self.inventory(sync_type="full"))
+    
+    @pytest.mark.asyncio
+    async def test_send_heartbeats_batch_budget(self, service, query_budget):
+        """Test heartbeat batch cost does not grow with the batch size"""
+        items = [(n, self.heartbeat(n)) for n in range(50)]
+        with query_budget(statements=3, commits=1):
+            await service.send_heartbeats_batch(items)
+    
+    # SQLite cannot return ordered ids from a multi-row insert, so it runs one insert per row
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_sync_inventory_batch_budget(self, service, query_budget):
+        """Test inventory batch cost does not grow with the batch size"""
+        items = [(n, self.inventory(n)) for n in range(50)]
+        with query_budget(statements=5, commits=2):
+            await service.sync_inventory_batch(items)
+    
+    @pytest.mark.asyncio
+    async def test_rotate_device_token_budget(self, service, query_budget):
+        """Test token rotation: lookup, revocation and token writes, then the audit entry"""
+        claims = DeviceClaims("guid-0", "TEST", "jti-1", datetime.utcnow())
+        with query_budget(statements=4, commits=2):
+            await service.rotate_device_token(claims)
+    
+    @pytest.mark.asyncio
+    async def test_get_agent_config_budget(self, service, query_budget):
+        """Test config lookup does not touch the database"""
+        with query_budget(statements=0, commits=0):
+            await service.get_agent_config("guid-0")
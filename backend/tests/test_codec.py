@@ -0,0 +1,84 @@
+import importlib
+import sys
+from datetime import datetime
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from app.core import codec
+
+@pytest.fixture
+def stdlib_codec():
+    """The codec module as loaded without orjson installed"""
+    installed = sys.modules.get("orjson")
+    sys.modules["orjson"] = None
+    try:
+        yield importlib.reload(codec)
+    finally:
+        sys.modules["orjson"] = installed
+        importlib.reload(codec)
+
+def build_app(codec_module):
+    class Item(BaseModel):
+        name: str
+
+    router = APIRouter(route_class=codec_module.CodecRoute)
+
+    @router.post("/items")
+    async def create_item(item: Item):
+        return {"name": item.name, "created_at": datetime(2024, 6, 1, 12, 0)}
+
+    app = FastAPI(default_response_class=codec_module.DefaultJSONResponse)
+    app.include_router(router)
+    return app
+
+class TestCodec:
+
+    def test_uses_orjson_when_installed(self):
+        """Test the fast path is picked when orjson imports"""
+        assert codec.FAST_JSON is True
+        assert codec.DefaultJSONResponse.__name__ == "ORJSONResponse"
+
+    def test_round_trip(self):
+        """Test dumps/loads round trip, including non-string keys"""
+        assert codec.loads(codec.dumps({"a": [1, 2.5, None, True]})) == {"a": [1, 2.5, None, True]}
+        assert codec.loads(codec.dumps({1: "x"})) == {"1": "x"}
+        assert isinstance(codec.dumps({}), str) and isinstance(codec.dumps_bytes({}), bytes)
+
+    def test_default_hook(self):
+        """Test unknown types go through the default hook"""
+        class Opaque:
+            def __str__(self):
+                return "opaque"
+
+        assert codec.loads(codec.dumps({"x": Opaque()}, default=str)) == {"x": "opaque"}
+
+    @pytest.mark.parametrize("value,expected", [
+        (1, b"1"), (0.5, b"0.5"), (100.0, b"100.0"), (1e16, b"1e+16"), (1e-7, b"1e-07"), (-2.5e-5, b"-2.5e-05"),
+    ])
+    def test_canonical_numbers(self, value, expected):
+        """Test canonical JSON uses one number format"""
+        assert codec.canonical_dumps({"b": [value], "a": "\u00e9"}) == b'{"a":"\xc3\xa9","b":[' + expected + b"]}"
+
+    def test_canonical_rejects_nan(self):
+        """Test NaN has no canonical form"""
+        with pytest.raises(ValueError):
+            codec.canonical_dumps({"a": float("nan")})
+
+    def test_falls_back_to_stdlib(self, stdlib_codec):
+        """Test the module works without orjson"""
+        assert stdlib_codec.FAST_JSON is False
+        assert stdlib_codec.loads(stdlib_codec.dumps({"a": 1})) == {"a": 1}
+        assert stdlib_codec.DefaultJSONResponse.__name__ == "JSONResponse"
+
+    @pytest.mark.parametrize("fast", [True, False])
+    def test_codec_route(self, fast, request):
+        """Test bodies are decoded and responses encoded on both paths"""
+        codec_module = codec if fast else request.getfixturevalue("stdlib_codec")
+        client = TestClient(build_app(codec_module))
+
+        response = client.post("/items", json={"name": "disk"})
+        assert response.json() == {"name": "disk", "created_at": "2024-06-01T12:00:00"}
+
+        response = client.post("/items", content=b"{not json", headers={"Content-Type": "application/json"})
+        assert response.status_code == 422
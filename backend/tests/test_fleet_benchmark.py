@@ -0,0 +1,61 @@
+import random
+import pytest
+from fastapi import FastAPI, Response
+from benchmarks.fleet import FleetConfig, percentile, run_fleet
+from benchmarks.inventory import make_inventory, software_count_for
+
+@pytest.fixture
+def stub_app():
+    app = FastAPI()
+
+    @app.post("/api/v1/agents/register")
+    async def register(response: Response):
+        response.headers["Server-Timing"] = 'db;dur=1.00;desc="2 statements, 2 commits"'
+        return {"device_token": "token", "policy": {}}
+
+    @app.post("/api/v1/agents/heartbeat")
+    async def heartbeat(response: Response):
+        response.headers["Server-Timing"] = 'db;dur=0.50;desc="1 statements, 1 commits"'
+        return {"status": "success"}
+
+    @app.post("/api/v1/inventory/{sync_type}")
+    async def inventory(sync_type: str):
+        return {"status": "success"}
+
+    return app
+
+class TestFleetBenchmark:
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 95) == 0.0
+
+    def test_inventory_shape(self):
+        """Test generated inventory follows the agent's InventoryData shape"""
+        rng = random.Random(1)
+        inventory = make_inventory(rng, 7, 25, "HQ")
+
+        assert set(inventory) == {
+            "device_identity", "hardware", "software", "network", "bios", "usage", "tagging", "collected_at"
+        }
+        assert len(inventory["software"]["installed_software"]) == 25
+        assert inventory["tagging"]["site_code"] == "HQ"
+        assert 10 <= software_count_for(rng) <= 5000
+
+    @pytest.mark.asyncio
+    async def test_run_fleet_report(self, stub_app):
+        """Test a short simulated run reports every endpoint with DB counts"""
+        config = FleetConfig(agents=20, duration=1.0, time_scale=3600, seed=3)
+
+        report = await run_fleet(config, app=stub_app)
+
+        endpoints = report["endpoints"]
+        assert endpoints["register"]["requests"] == 20
+        assert endpoints["register"]["db_statements_per_request"] == 2.0
+        assert endpoints["heartbeat"]["requests"] > 0
+        assert endpoints["inventory_full"]["requests"] >= 20
+        assert set(endpoints["heartbeat"]["latency_ms"]) == {"p50", "p95", "p99", "max"}
+        assert report["config"]["seed"] == 3
@@ -0,0 +1,195 @@
+import asyncio
+import random
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.idempotency import IdempotencyCache, derive_key, idempotent_replays
+from app.models.agent import Inventory
+from app.schemas.agent import InventorySyncRequest, SectionUploadRequest
+from app.schemas.inventory import SECTION_NAMES, section_hash
+from app.services.agent_service import AgentService
+from benchmarks.inventory import make_inventory
+
+@pytest.fixture
+def mock_db():
+    db = AsyncMock(spec=AsyncSession)
+    db.add = Mock()
+    return db
+
+@pytest.fixture
+def agent():
+    agent = Mock()
+    agent.id = 1
+    agent.agent_guid = "test-guid-123"
+    return agent
+
+@pytest.fixture
+def agent_service(mock_db, agent):
+    result = Mock()
+    result.scalar_one_or_none.return_value = agent
+    mock_db.execute.return_value = result
+    service = AgentService(mock_db)
+    service._sync_to_snipeit = AsyncMock(return_value=True)
+    service._log_audit = AsyncMock()
+    return service
+
+@pytest.fixture
+def inventory():
+    return make_inventory(random.Random(1), 0, 10, "HQ")
+
+def sync_request(inventory):
+    return InventorySyncRequest(agent_guid="test-guid-123", sync_type="full", inventory=inventory)
+
+def replays(source):
+    return idempotent_replays.labels(source).value
+
+class TestDeriveKey:
+
+    def test_header_key_scoped_to_agent(self):
+        """Test the same Idempotency-Key from two agents gives two keys"""
+        assert derive_key("a", "retry-1") == derive_key("a", "retry-1", b"ignored")
+        assert derive_key("a", "retry-1") != derive_key("b", "retry-1")
+
+    def test_fingerprint_fallback(self):
+        """Test content fingerprints are used without a header, and nothing without either"""
+        assert derive_key("a", None, b"payload") == derive_key("a", None, b"payload")
+        assert derive_key("a", None, b"payload") != derive_key("a", None, b"other")
+        assert derive_key("a") is None
+
+class TestIdempotencyCache:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_processed_once(self):
+        """Test duplicates arriving mid-processing wait for the first response"""
+        cache = IdempotencyCache(max_entries=10, ttl_seconds=60)
+        calls = 0
+
+        async def process():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "response"
+
+        results = await asyncio.gather(*(cache.run("k", process) for _ in range(3)))
+
+        assert results == ["response"] * 3
+        assert calls == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self):
+        """Test a failed or non-cacheable attempt lets the retry process the request"""
+        cache = IdempotencyCache(max_entries=10, ttl_seconds=60)
+
+        async def fail():
+            raise RuntimeError("database down")
+
+        with pytest.raises(RuntimeError):
+            await cache.run("k", fail)
+        assert await cache.run("k", AsyncMock(return_value="error"), lambda r: r == "ok") == "error"
+        assert await cache.run("k", AsyncMock(return_value="ok")) == "ok"
+        assert len(cache) == 1
+
+    @pytest.mark.asyncio
+    async def test_bounded_by_size_and_age(self):
+        """Test the oldest keys are evicted and expired keys are processed again"""
+        cache = IdempotencyCache(max_entries=2, ttl_seconds=60)
+        for key in ("a", "b", "c"):
+            await cache.run(key, AsyncMock(return_value=key))
+        assert len(cache) == 2
+        assert await cache.run("a", AsyncMock(return_value="again")) == "again"
+
+        cache.ttl_seconds = 0
+        await cache.run("d", AsyncMock(return_value="first"))
+        assert await cache.run("d", AsyncMock(return_value="second")) == "second"
+
+class TestIdempotentInventorySync:
+
+    @pytest.mark.asyncio
+    async def test_retry_answered_from_memory(self, agent_service, mock_db, inventory):
+        """Test a retry with the same Idempotency-Key gets the original response without a query"""
+        first = await agent_service.sync_inventory(sync_request(inventory), "upload-1")
+        before = replays("memory")
+        assert mock_db.add.call_args_list[0].args[0].idempotency_key == derive_key("test-guid-123", "upload-1")
+        mock_db.reset_mock()
+
+        retry = await agent_service.sync_inventory(sync_request(inventory), "upload-1")
+
+        assert retry == first
+        assert replays("memory") == before + 1
+        agent_service._sync_to_snipeit.assert_awaited_once()
+        assert mock_db.method_calls == []
+
+    @pytest.mark.asyncio
+    async def test_retry_without_header_uses_payload(self, agent_service, inventory):
+        """Test an identical payload with collected_at is deduplicated; a changed one is not"""
+        await agent_service.sync_inventory(sync_request(inventory))
+        await agent_service.sync_inventory(sync_request(inventory))
+        assert agent_service._sync_to_snipeit.await_count == 1
+
+        inventory["collected_at"] = "2024-06-02T12:00:00Z"
+        await agent_service.sync_inventory(sync_request(inventory))
+        assert agent_service._sync_to_snipeit.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_no_dedup_without_key_or_collected_at(self, agent_service, inventory):
+        """Test uploads that cannot be told apart from a new sync are always processed"""
+        del inventory["collected_at"]
+        await agent_service.sync_inventory(sync_request(inventory))
+        await agent_service.sync_inventory(sync_request(inventory))
+
+        assert agent_service._sync_to_snipeit.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_answered_from_database(self, agent_service, mock_db, agent, inventory):
+        """Test a retry that another replica stored fails its insert and replays the stored row"""
+        stored = Inventory(id=7, agent_id=1, agent_guid="test-guid-123", snipeit_updated=True,
+                           synced_at=datetime(2024, 6, 1, 12, 0))
+        agent_result = Mock()
+        agent_result.scalar_one_or_none.return_value = agent
+        stored_result = Mock()
+        stored_result.scalar_one_or_none.return_value = stored
+        mock_db.execute.side_effect = [agent_result, stored_result]
+        mock_db.commit.side_effect = IntegrityError("INSERT", {}, Exception("duplicate key"))
+        before = replays("database")
+
+        response = await agent_service.sync_inventory(sync_request(inventory), "upload-1")
+
+        assert response.status == "success"
+        assert response.snipeit_updated is True
+        assert response.next_sync > stored.synced_at
+        assert replays("database") == before + 1
+        mock_db.rollback.assert_awaited_once()
+        agent_service._sync_to_snipeit.assert_not_awaited()
+        agent_service._log_audit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_other_integrity_errors_raise(self, agent_service, mock_db, agent, inventory):
+        """Test a failed insert without an earlier row is not mistaken for a retry"""
+        mock_db.commit.side_effect = IntegrityError("INSERT", {}, Exception("not null"))
+        mock_db.execute.return_value.scalar_one_or_none.side_effect = [agent, None]
+
+        with pytest.raises(IntegrityError):
+            await agent_service.sync_inventory(sync_request(inventory), "upload-1")
+
+    @pytest.mark.asyncio
+    async def test_section_upload_retry(self, agent_service, mock_db, agent, inventory):
+        """Test a retried section upload is answered from memory"""
+        hashes = {name: section_hash(inventory[name]) for name in SECTION_NAMES}
+        request = SectionUploadRequest(
+            agent_guid="test-guid-123", hashes=hashes, sections=inventory,
+            collected_at=inventory["collected_at"]
+        )
+        agent_result = Mock()
+        agent_result.scalar_one_or_none.return_value = agent
+        sections_result = Mock()
+        sections_result.scalars.return_value = []
+        mock_db.execute.side_effect = [agent_result, sections_result, Mock()]
+
+        first = await agent_service.sync_sections(request)
+        retry = await agent_service.sync_sections(request)
+
+        assert first.status == "success"
+        assert retry == first
+        agent_service._sync_to_snipeit.assert_awaited_once()
@@ -0,0 +1,59 @@
+import random
+import pytest
+from pydantic import ValidationError
+from app.schemas.agent import InventorySyncRequest
+from app.schemas.inventory import InventoryData
+from benchmarks.inventory import make_inventory
+
+@pytest.fixture
+def inventory():
+    return make_inventory(random.Random(1), 0, 20, "HQ")
+
+class TestInventorySchema:
+
+    def test_typed_sections(self, inventory):
+        """Test the agent's payload validates into typed sections"""
+        data = InventoryData.model_validate(inventory)
+
+        assert data.device_identity.serial_number == "SN00000000"
+        assert data.hardware.disks[0].capacity_gb == 512.0
+        assert data.network.adapters[0].is_connected is True
+        assert data.tagging.site_code == "HQ"
+        assert data.collected_at.year == 2024
+
+    def test_missing_sections_get_agent_defaults(self):
+        """Test absent sections fall back to the agent's defaults"""
+        data = InventoryData.model_validate({"device_identity": {"hostname": "PC"}})
+
+        assert data.hardware.memory.total_gb == 0.0
+        assert data.software.installed() == []
+        assert data.collected_at is None
+
+    def test_rejects_malformed_sections(self, inventory):
+        """Test a malformed section is rejected with the request"""
+        inventory["hardware"]["memory"]["total_gb"] = "lots"
+
+        with pytest.raises(ValidationError):
+            InventorySyncRequest(agent_guid="a", sync_type="full", inventory=inventory)
+
+    def test_installed_software_is_validated_on_use(self, inventory):
+        """Test software entries are only checked when a handler asks for them"""
+        inventory["software"]["installed_software"][5]["install_date"] = "not a date"
+        data = InventoryData.model_validate(inventory)
+
+        with pytest.raises(ValidationError):
+            data.software.installed()
+
+    def test_installed_software_is_cached(self, inventory):
+        """Test software entries are validated once"""
+        software = InventoryData.model_validate(inventory).software
+
+        assert software.installed() is software.installed()
+        assert software.installed()[0].name == inventory["software"]["installed_software"][0]["name"]
+
+    def test_as_dict_returns_payload_unchanged(self, inventory):
+        """Test storage gets the original payload, including unknown keys"""
+        inventory["future_section"] = {"x": 1}
+
+        assert InventoryData.model_validate(inventory).as_dict() is inventory
+        assert InventoryData(tagging={"site_code": "HQ"}).as_dict() == {"tagging": {"site_code": "HQ"}}
@@ -0,0 +1,180 @@
+import random
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, Mock
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.agent import Agent, Inventory, InventorySection
+from app.schemas.agent import SectionHashes, SectionUploadRequest
+from app.schemas.inventory import SECTION_NAMES, section_hash
+from app.services.agent_service import AgentService
+from benchmarks.inventory import make_inventory
+
+@pytest.fixture
+def mock_db():
+    db = AsyncMock(spec=AsyncSession)
+    db.add = Mock()
+    return db
+
+@pytest.fixture
+def agent_service(mock_db):
+    service = AgentService(mock_db)
+    service._sync_to_snipeit = AsyncMock(return_value=True)
+    service._log_audit = AsyncMock()
+    return service
+
+@pytest.fixture
+def inventory():
+    return make_inventory(random.Random(1), 0, 50, "HQ")
+
+@pytest.fixture
+def hashes(inventory):
+    return {name: section_hash(inventory[name]) for name in SECTION_NAMES}
+
+@pytest.fixture
+def agent():
+    agent = Mock()
+    agent.id = 1
+    agent.agent_guid = "test-guid-123"
+    return agent
+
+def stored_rows(inventory, names):
+    return [
+        InventorySection(agent_id=1, agent_guid="test-guid-123", section=name,
+                         content_hash=section_hash(inventory[name]), data=inventory[name])
+        for name in names
+    ]
+
+def results(agent, rows):
+    """db.execute results for the agent lookup, the stored sections and the section upsert"""
+    agent_result = Mock()
+    agent_result.scalar_one_or_none.return_value = agent
+    sections_result = Mock()
+    sections_result.scalars.return_value = rows
+    return [agent_result, sections_result, Mock()]
+
+class TestSectionHashes:
+
+    def test_hash_ignores_key_order(self):
+        """Test the hash is computed over canonical JSON"""
+        assert section_hash({"a": 1, "b": [1, 2]}) == section_hash({"b": [1, 2], "a": 1})
+        assert section_hash({"a": 1}) != section_hash({"a": 2})
+
+    def test_rejects_unknown_sections(self):
+        """Test only the agent's InventoryData sections can be negotiated"""
+        with pytest.raises(ValidationError):
+            SectionHashes(agent_guid="a", hashes={"registry": "00"})
+
+class TestSectionSync:
+
+    @pytest.mark.asyncio
+    async def test_negotiate_returns_changed_sections(self, agent_service, mock_db, inventory, hashes):
+        """Test only sections whose stored hash differs are requested"""
+        result = Mock()
+        result.all.return_value = [(name, hashes[name]) for name in SECTION_NAMES if name != "usage"]
+        mock_db.execute.return_value = result
+
+        response = await agent_service.negotiate_sections(SectionHashes(agent_guid="test-guid-123", hashes=hashes))
+
+        assert response.missing == ["usage"]
+        mock_db.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_negotiate_unchanged_completes_sync(self, agent_service, mock_db, hashes):
+        """Test an unchanged inventory records the sync without an upload"""
+        result = Mock()
+        result.all.return_value = list(hashes.items())
+        mock_db.execute.return_value = result
+
+        response = await agent_service.negotiate_sections(SectionHashes(agent_guid="test-guid-123", hashes=hashes))
+
+        assert response.missing == []
+        mock_db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_upload_stores_changed_sections(self, agent_service, mock_db, agent, inventory, hashes):
+        """Test uploaded sections are stored and Snipe-IT sees the merged inventory"""
+        rows = stored_rows(inventory, [name for name in SECTION_NAMES if name != "usage"])
+        mock_db.execute.side_effect = results(agent, rows)
+        inventory["usage"]["uptime_hours"] = 1234.5
+        hashes["usage"] = section_hash(inventory["usage"])
+
+        request = SectionUploadRequest(agent_guid="test-guid-123", hashes=hashes,
+                                       sections={"usage": inventory["usage"]})
+        response = await agent_service.sync_sections(request)
+
+        assert response.status == "success"
+        upsert = mock_db.execute.await_args_list[2].args[0].compile(dialect=postgresql.dialect())
+        assert "ON CONFLICT (agent_id, section) DO UPDATE" in str(upsert)
+        assert (upsert.params["section_m0"], upsert.params["content_hash_m0"]) == ("usage", hashes["usage"])
+        history = next(call.args[0] for call in mock_db.add.call_args_list
+                       if isinstance(call.args[0], Inventory))
+        assert set(history.inventory_data) == {"usage"}
+
+        merged = agent_service._sync_to_snipeit.await_args.args[1]
+        assert merged.usage.uptime_hours == 1234.5
+        assert merged.device_identity.serial_number == inventory["device_identity"]["serial_number"]
+
+    @pytest.mark.asyncio
+    async def test_upload_rejects_hash_mismatch(self, agent_service, mock_db, agent, inventory, hashes):
+        """Test a section that does not match its declared hash is refused"""
+        mock_db.execute.side_effect = results(agent, [])
+        inventory["usage"]["uptime_hours"] = 1.0
+
+        request = SectionUploadRequest(agent_guid="test-guid-123", hashes=hashes,
+                                       sections={"usage": inventory["usage"]})
+        response = await agent_service.sync_sections(request)
+
+        assert response.status == "error"
+        assert response.missing == ["usage"]
+        mock_db.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_upload_reports_sections_still_missing(self, agent_service, mock_db, agent, inventory, hashes):
+        """Test sections the server lost since negotiation are requested again"""
+        mock_db.execute.side_effect = results(agent, stored_rows(inventory, ["device_identity"]))
+
+        request = SectionUploadRequest(agent_guid="test-guid-123", hashes=hashes,
+                                       sections={"usage": inventory["usage"]})
+        response = await agent_service.sync_sections(request)
+
+        assert response.status == "incomplete"
+        assert response.missing == ["hardware", "software", "network", "bios", "tagging"]
+        agent_service._sync_to_snipeit.assert_not_awaited()
+
+class TestSectionSyncQueryBudgets:
+    """SQL statement and commit budgets for section sync, on a real engine"""
+
+    @pytest_asyncio.fixture
+    async def service(self, db_session, inventory):
+        agent = Agent(agent_guid="test-guid-123", hostname="PC-1", serial_number="S1",
+                      site_code="HQ", device_token="token", version="1.0.0")
+        db_session.add(agent)
+        await db_session.flush()
+        for row in stored_rows(inventory, [name for name in SECTION_NAMES if name != "usage"]):
+            row.agent_id = agent.id
+            db_session.add(row)
+        await db_session.commit()
+        service = AgentService(db_session)
+        service._sync_to_snipeit = AsyncMock(return_value=True)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_negotiate_budget(self, service, query_budget, hashes):
+        """Test negotiation with changed sections: one section lookup and no transaction"""
+        with query_budget(statements=1, commits=0):
+            response = await service.negotiate_sections(SectionHashes(agent_guid="test-guid-123", hashes=hashes))
+
+        assert response.missing == ["usage"]
+
+    @pytest.mark.postgres
+    @pytest.mark.asyncio
+    async def test_upload_budget(self, service, query_budget, inventory, hashes):
+        """Test upload: agent and section lookups, the writes, Snipe-IT flag and audit"""
+        request = SectionUploadRequest(agent_guid="test-guid-123", hashes=hashes,
+                                       sections={"usage": inventory["usage"]})
+        with query_budget(statements=7, commits=3):
+            response = await service.sync_sections(request)
+
+        assert response.status == "success"
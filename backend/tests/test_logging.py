@@ -0,0 +1,75 @@
+import json
+import logging
+import queue
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.logging import (
+    ContextFilter, DroppingQueueHandler, JsonFormatter, RequestContextMiddleware,
+    bind_agent_guid, log_records_dropped, request_id_var
+)
+
+def make_record(message="hello %s", args=("world",)):
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, args, None)
+
+class TestLogFormatting:
+
+    def test_context_filter_defaults(self):
+        """Test records outside a request get placeholder ids"""
+        record = make_record()
+        ContextFilter().filter(record)
+
+        assert record.request_id == "-"
+        assert record.agent_guid == "-"
+
+    def test_json_formatter(self):
+        """Test JSON output carries the lazily formatted message and context"""
+        record = make_record()
+        ContextFilter().filter(record)
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["message"] == "hello world"
+        assert entry["level"] == "INFO"
+        assert entry["request_id"] == "-"
+
+    def test_full_queue_drops_records(self):
+        """Test a full queue drops records instead of blocking the caller"""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        before = log_records_dropped.labels().value
+
+        handler.emit(make_record())
+        handler.emit(make_record())
+
+        assert handler.queue.qsize() == 1
+        assert log_records_dropped.labels().value == before + 1
+
+class TestRequestContextMiddleware:
+
+    def make_app(self):
+        app = FastAPI()
+
+        @app.get("/agents/{agent_guid}")
+        async def agent(agent_guid: str):
+            bind_agent_guid(agent_guid)
+            record = make_record()
+            ContextFilter().filter(record)
+            return {"request_id": record.request_id, "agent_guid": record.agent_guid}
+
+        app.add_middleware(RequestContextMiddleware)
+        return app
+
+    def test_generates_request_id(self):
+        """Test each request gets an id echoed in X-Request-ID"""
+        response = TestClient(self.make_app()).get("/agents/guid-1")
+
+        body = response.json()
+        assert body["request_id"] == response.headers["x-request-id"]
+        assert body["agent_guid"] == "guid-1"
+        assert request_id_var.get() == "-"
+
+    def test_reuses_incoming_request_id(self):
+        """Test an upstream X-Request-ID is kept for correlation"""
+        response = TestClient(self.make_app()).get("/agents/guid-1", headers={"X-Request-ID": "edge-123"})
+
+        assert response.json()["request_id"] == "edge-123"
+        assert response.headers["x-request-id"] == "edge-123"
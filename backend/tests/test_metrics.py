@@ -0,0 +1,116 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.metrics import (
+    CollectedMetric, MetricsMiddleware, MetricsRegistry, http_request_body_bytes, http_request_duration
+)
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    @app.post("/api/v1/inventory/delta")
+    async def delta(payload: dict):
+        return {"ok": True}
+
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+class TestMetricsRegistry:
+
+    def test_counter_and_gauge_render(self, registry):
+        """Test counters are exposed as <name>_total and labels are escaped"""
+        counter = registry.counter("jobs", "Jobs processed", ("type",))
+        counter.labels('say "hi"').inc(2)
+        gauge = registry.gauge("queue_depth", "Queue depth")
+        gauge.set(7)
+
+        text = registry.render()
+
+        assert "# TYPE jobs_total counter" in text
+        assert 'jobs_total{type="say \\"hi\\""} 2' in text
+        assert "queue_depth 7" in text
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test histogram bucket counts, sum and count"""
+        histogram = registry.histogram("latency", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value)
+
+        text = registry.render()
+
+        assert 'latency_bucket{le="0.1"} 1' in text
+        assert 'latency_bucket{le="1"} 3' in text
+        assert 'latency_bucket{le="+Inf"} 4' in text
+        assert "latency_sum 6.05" in text
+        assert "latency_count 4" in text
+
+    def test_register_is_idempotent(self, registry):
+        """Test registering the same name returns the existing metric"""
+        first = registry.counter("requests", "Requests")
+        assert registry.counter("requests", "Requests") is first
+
+    def test_label_count_mismatch(self, registry):
+        """Test wrong number of labels is rejected"""
+        counter = registry.counter("requests", "Requests", ("route",))
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+    def test_collectors_render_at_scrape_time(self, registry):
+        """Test collector callbacks are called on every render"""
+        state = {"value": 1}
+
+        def collector():
+            yield CollectedMetric("live", "gauge", "Live value", [({}, state["value"])])
+            yield CollectedMetric("seen", "counter", "Seen", [({"kind": "a"}, state["value"])])
+
+        registry.register_collector(collector)
+        assert "live 1" in registry.render()
+        state["value"] = 3
+        text = registry.render()
+        assert "live 3" in text
+        assert "# TYPE seen_total counter" in text
+        assert 'seen_total{kind="a"} 3' in text
+
+    def test_metric_interface_is_abstract(self):
+        """Test metric types must provide children and samples"""
+        from app.core.metrics import _Metric
+        with pytest.raises(TypeError):
+            _Metric("broken", "Broken")
+
+class TestMetricsMiddleware:
+
+    def test_records_route_template(self, app):
+        """Test latency is labelled by route template, not the raw path"""
+        client = TestClient(app)
+        client.get("/items/1")
+        client.get("/items/2")
+
+        child = http_request_duration.labels("GET", "/items/{item_id}", "200")
+        assert sum(child.counts) >= 2
+
+    def test_unmatched_routes_share_a_label(self, app):
+        """Test 404s do not create a series per path"""
+        client = TestClient(app)
+        client.get("/nope/1")
+
+        child = http_request_duration.labels("GET", "unmatched", "404")
+        assert sum(child.counts) >= 1
+
+    def test_inventory_body_size(self, app):
+        """Test inventory payload sizes are recorded"""
+        client = TestClient(app)
+        before = http_request_body_bytes.labels("/api/v1/inventory/delta").sum
+
+        response = client.post("/api/v1/inventory/delta", json={"software": ["x" * 100]})
+
+        assert response.status_code == 200
+        assert http_request_body_bytes.labels("/api/v1/inventory/delta").sum > before + 100
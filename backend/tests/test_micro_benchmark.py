@@ -0,0 +1,44 @@
+import json
+from benchmarks.micro import compare, main, measure, run
+
+def report(**results):
+    return {"results": {key: {"ops_per_sec": ops, "peak_alloc_bytes": alloc} for key, (ops, alloc) in results.items()}}
+
+class TestMicroBenchmark:
+
+    def test_measure(self):
+        """Test a measurement reports throughput and allocation"""
+        result = measure(lambda: [0] * 1000, min_time=0.01, rounds=2)
+
+        assert result["ops_per_sec"] > 0
+        assert result["peak_alloc_bytes"] >= 8000
+
+    def test_run_covers_sizes(self):
+        """Test sized cases run once per size and the rest once"""
+        results = run(sizes=(10, 20), min_time=0.001, rounds=1)["results"]
+
+        assert "json_dumps_inventory[10]" in results and "json_dumps_inventory[20]" in results
+        assert "get_disk_info" in results
+
+    def test_compare_flags_regressions(self):
+        """Test slowdowns and allocation growth beyond the threshold are reported"""
+        baseline = report(fast=(1000, 100), lean=(1000, 100), steady=(1000, 100))
+        current = report(fast=(700, 100), lean=(1000, 200), steady=(900, 110), new=(1, 1))
+
+        regressions = compare(baseline, current, threshold=0.2)
+
+        assert len(regressions) == 2
+        assert regressions[0].startswith("fast:") and "ops/sec" in regressions[0]
+        assert regressions[1].startswith("lean:") and "bytes allocated" in regressions[1]
+
+    def test_compare_exit_code(self, tmp_path):
+        """Test the compare command fails only on regressions"""
+        baseline = tmp_path / "baseline.json"
+        current = tmp_path / "current.json"
+        baseline.write_text(json.dumps(report(case=(1000, 100))))
+
+        current.write_text(json.dumps(report(case=(950, 100))))
+        assert main(["compare", str(baseline), str(current)]) == 0
+
+        current.write_text(json.dumps(report(case=(500, 100))))
+        assert main(["compare", str(baseline), str(current)]) == 1
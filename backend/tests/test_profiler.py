@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.profiler import (
+    LoopLagMonitor, Profiler, ProfilingMiddleware, StackSampler, render_collapsed, render_flamegraph
+)
+
+def busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+@pytest.fixture
+def profiler():
+    return Profiler(interval=0.001, max_seconds=1)
+
+@pytest.fixture
+def app(profiler):
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        busy_wait(0.05)
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return app
+
+class TestStackSampler:
+
+    def test_samples_busy_function(self):
+        """Test the sampler attributes time to the running function"""
+        sampler = StackSampler(0.001)
+        sampler.start()
+        busy_wait(0.05)
+        counts = sampler.stop()
+
+        assert sampler.samples > 0
+        assert any("busy_wait" in stack for stack in counts)
+
+    def test_renderers(self):
+        """Test collapsed and SVG output"""
+        counts = {"MainThread;main (a.py:1);work (a.py:5)": 3, "MainThread;main (a.py:1)": 1}
+
+        assert render_collapsed(counts).splitlines()[1] == "MainThread;main (a.py:1);work (a.py:5) 3"
+        svg = render_flamegraph(counts)
+        assert svg.startswith("<svg") and "work (a.py:5) (3 samples, 75.0%)" in svg
+
+class TestProfiler:
+
+    @pytest.mark.asyncio
+    async def test_one_profile_at_a_time(self, profiler):
+        """Test a second concurrent profile is refused"""
+        first = asyncio.create_task(profiler.profile(0.05))
+        await asyncio.sleep(0.01)
+
+        assert await profiler.profile(0.05) is None
+        assert profiler.get(await first) is not None
+        assert profiler.busy is False
+
+    def test_keeps_recent_results(self):
+        """Test old profiles are dropped"""
+        profiler = Profiler(interval=0.001, max_seconds=1, keep=2)
+        ids = [profiler.finish(profiler.start()) for _ in range(3)]
+
+        assert profiler.get(ids[0]) is None
+        assert profiler.get(ids[2]) is not None
+
+class TestProfilingMiddleware:
+
+    def test_profiles_with_admin_token(self, app, profiler):
+        """Test the admin header yields a profile id"""
+        with patch("app.core.profiler.settings") as mock_settings:
+            mock_settings.ADMIN_API_TOKEN = "admin-secret"
+            response = TestClient(app).get("/work", headers={"X-Debug-Profile": "admin-secret"})
+
+        profile_id = response.headers["x-debug-profile-id"]
+        assert any("busy_wait" in stack for stack in profiler.get(profile_id))
+
+    def test_ignores_wrong_token(self, app):
+        """Test requests without the admin token are not profiled"""
+        with patch("app.core.profiler.settings") as mock_settings:
+            mock_settings.ADMIN_API_TOKEN = "admin-secret"
+            response = TestClient(app).get("/work", headers={"X-Debug-Profile": "guess"})
+
+        assert "x-debug-profile-id" not in response.headers
+
+class TestLoopLagMonitor:
+
+    @pytest.mark.asyncio
+    async def test_reports_blocking_code(self, caplog):
+        """Test the watchdog logs the stack of code blocking the loop"""
+        monitor = LoopLagMonitor(threshold=0.05, interval=0.01)
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.03)
+
+        with caplog.at_level(logging.WARNING, logger="app.core.profiler"):
+            busy_wait(0.3)
+            await asyncio.sleep(0.03)
+        task.cancel()
+
+        assert monitor.blocked >= 1
+        assert any("blocked" in r.message and "busy_wait" in r.message for r in caplog.records)
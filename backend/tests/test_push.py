@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, Mock
+from app.core.pubsub import MemoryPubSub, PubSub
+from app.core.push import PushConnection, PushHub
+
+@pytest_asyncio.fixture
+async def hub():
+    hub = PushHub(MemoryPubSub())
+    await hub.start()
+    return hub
+
+def connection(queue_size=4, send_json=None):
+    websocket = Mock()
+    websocket.send_json = send_json or AsyncMock()
+    return PushConnection(websocket, queue_size)
+
+class TestPushHub:
+
+    @pytest.mark.asyncio
+    async def test_publish_to_websocket(self, hub):
+        """Test published jobs are queued for the socket and sent by its sender"""
+        conn = connection()
+        hub.attach("guid-1", conn)
+        sent = asyncio.Queue()
+
+        await hub.publish("guid-1", {"type": "job", "job": {"id": 1}})
+        sender = asyncio.create_task(conn.send_outbox(sent.put, 1))
+        message = await asyncio.wait_for(sent.get(), 1)
+        sender.cancel()
+
+        conn.websocket.send_json.assert_called_once_with({"type": "job", "job": {"id": 1}})
+        assert message == {"type": "job", "job": {"id": 1}}
+        assert hub.delivered == 1
+
+    @pytest.mark.asyncio
+    async def test_publish_to_long_poll_waiter(self, hub):
+        """Test published jobs resolve a long-poll waiter"""
+        future = hub.wait("guid-1")
+        assert hub.waiting == 1
+
+        await hub.publish("guid-1", {"type": "job", "job": {"id": 2}})
+
+        assert (await asyncio.wait_for(future, 1))["job"]["id"] == 2
+        assert hub.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_socket_does_not_block_publish(self, hub):
+        """Test a stalled socket neither delays the publisher nor other agents"""
+        async def stall(message):
+            await asyncio.sleep(3600)
+
+        stalled = connection(send_json=stall)
+        healthy = connection()
+        hub.attach("slow", stalled)
+        hub.attach("fast", healthy)
+        sender = asyncio.create_task(stalled.send_outbox(AsyncMock(), 0.01))
+
+        await asyncio.wait_for(hub.publish("slow", {"type": "job"}), 0.1)
+        await asyncio.wait_for(hub.publish("fast", {"type": "job"}), 0.1)
+
+        assert healthy.outbox.qsize() == 1
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(sender, 1)
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_message(self, hub):
+        """Test messages beyond the per-socket queue are not delivered"""
+        hub.attach("guid-1", connection(queue_size=1))
+
+        assert await hub.deliver("guid-1", {"type": "job"}) is True
+        assert await hub.deliver("guid-1", {"type": "job"}) is False
+
+    @pytest.mark.asyncio
+    async def test_reconnect_replaces_socket(self, hub):
+        """Test a new connection replaces the old one and stale detach is ignored"""
+        old, new = connection(), connection()
+
+        assert hub.attach("guid-1", old) is None
+        assert hub.attach("guid-1", new) is old
+        hub.detach("guid-1", old)
+
+        assert hub.connected == 1
+
+    def test_pubsub_interface_is_abstract(self):
+        """Test backends must implement publish and subscribe"""
+        with pytest.raises(TypeError):
+            PubSub()
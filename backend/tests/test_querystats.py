@@ -0,0 +1,73 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app.core.querystats import (
+    QueryStats, QueryStatsMiddleware, current_query_stats, db_statements_per_request, instrument_engine
+)
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    return engine
+
+@pytest.fixture
+def app(engine):
+    app = FastAPI()
+
+    @app.post("/agents/{agent_guid}/touch")
+    def touch(agent_guid: str):
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS t (x TEXT)"))
+            conn.execute(text("INSERT INTO t VALUES (:x)"), {"x": agent_guid})
+            conn.execute(text("SELECT count(*) FROM t")).scalar()
+        return {"ok": True}
+
+    @app.get("/stats")
+    async def stats():
+        stats = current_query_stats()
+        return {"statements": stats.statements}
+
+    app.add_middleware(QueryStatsMiddleware)
+    return app
+
+class TestQueryStats:
+
+    def test_server_timing_format(self):
+        """Test Server-Timing value reports milliseconds and counts"""
+        stats = QueryStats(statements=3, commits=1, db_time=0.0125)
+        assert stats.server_timing() == 'db;dur=12.50;desc="3 statements, 1 commits"'
+
+    def test_no_counting_outside_requests(self, engine):
+        """Test engine events are inert without a request context"""
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert current_query_stats() is None
+
+class TestQueryStatsMiddleware:
+
+    def test_counts_statements_and_commits(self, app):
+        """Test statements and commits are reported in Server-Timing"""
+        client = TestClient(app)
+        response = client.post("/agents/guid-1/touch")
+
+        assert response.status_code == 200
+        assert 'desc="3 statements, 1 commits"' in response.headers["server-timing"]
+
+    def test_metrics_by_route(self, app):
+        """Test per-request statement counts are recorded by route template"""
+        client = TestClient(app)
+        child = db_statements_per_request.labels("/agents/{agent_guid}/touch")
+        before = child.sum
+
+        client.post("/agents/guid-2/touch")
+
+        assert child.sum == before + 3
+
+    def test_requests_are_isolated(self, app):
+        """Test each request starts from zero"""
+        client = TestClient(app)
+        client.post("/agents/guid-3/touch")
+
+        assert client.get("/stats").json() == {"statements": 0}
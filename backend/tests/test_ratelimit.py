@@ -0,0 +1,128 @@
+import pytest
+from unittest.mock import AsyncMock
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.core import ratelimit
+from app.core.ratelimit import BucketLimit, BucketStore, MemoryBucketStore, RateLimiter, RateLimitMiddleware
+from app.core.security import create_device_token
+
+@pytest.fixture
+def limiter():
+    agent_limits = {"heartbeat": BucketLimit(rate=1.0, capacity=2)}
+    return RateLimiter(MemoryBucketStore(), agent_limits, site_limit=BucketLimit(rate=1.0, capacity=3))
+
+class TestMemoryBucketStore:
+
+    @pytest.mark.asyncio
+    async def test_burst_then_limited(self):
+        """Test bucket allows its burst and then reports retry time"""
+        store = MemoryBucketStore()
+        limit = BucketLimit(rate=0.5, capacity=2)
+
+        assert await store.consume([("a", limit)]) == 0.0
+        assert await store.consume([("a", limit)]) == 0.0
+        retry_after = await store.consume([("a", limit)])
+        assert 0 < retry_after <= 2.0
+
+    @pytest.mark.asyncio
+    async def test_all_or_nothing(self):
+        """Test a rejected multi-bucket consume takes no tokens"""
+        store = MemoryBucketStore()
+        roomy = BucketLimit(rate=0.001, capacity=10)
+        tight = BucketLimit(rate=0.001, capacity=1)
+
+        assert await store.consume([("roomy", roomy), ("tight", tight)]) == 0.0
+        assert await store.consume([("roomy", roomy), ("tight", tight)]) > 0
+        assert store._buckets["roomy"][0] == pytest.approx(9.0, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_full_store_evicts_least_recently_used(self):
+        """Test a full store drops the least recently used bucket, not every bucket"""
+        store = MemoryBucketStore(max_keys=2)
+        limit = BucketLimit(rate=0.001, capacity=5)
+
+        for key in ("a", "b", "a", "c"):
+            await store.consume([(key, limit)])
+
+        assert list(store._buckets) == ["a", "c"]
+        assert store._buckets["a"][0] == pytest.approx(3.0, abs=0.01)
+
+    def test_store_interface_is_abstract(self):
+        """Test stores must implement consume"""
+        with pytest.raises(TypeError):
+            BucketStore()
+
+class TestRateLimiter:
+
+    @pytest.mark.asyncio
+    async def test_agent_limit_raises_429(self, limiter):
+        """Test per-agent limit returns 429 with Retry-After"""
+        await limiter.check("heartbeat", "guid-1")
+        await limiter.check("heartbeat", "guid-1")
+
+        with pytest.raises(HTTPException) as exc_info:
+            await limiter.check("heartbeat", "guid-1")
+
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "1"
+        assert limiter.rejected["heartbeat"] == 1
+
+        # Other agents have their own bucket
+        await limiter.check("heartbeat", "guid-2")
+
+    @pytest.mark.asyncio
+    async def test_site_limit_shared_across_agents(self, limiter):
+        """Test site bucket is shared by every agent at the site"""
+        for guid in ("a", "b", "c"):
+            await limiter.check("heartbeat", guid, "SITE")
+
+        with pytest.raises(HTTPException):
+            await limiter.check("heartbeat", "d", "SITE")
+
+    @pytest.mark.asyncio
+    async def test_store_error_fails_open(self, limiter):
+        """Test store outages do not reject requests"""
+        limiter.store.consume = AsyncMock(side_effect=ConnectionError("down"))
+
+        await limiter.check("heartbeat", "guid-1")
+
+class TestRateLimitMiddleware:
+
+    @pytest.fixture
+    def client(self, limiter, monkeypatch):
+        monkeypatch.setattr(ratelimit.settings, "DEVICE_AUTH_ENABLED", True)
+        self.reached = []
+
+        async def app(scope, receive, send):
+            self.reached.append(scope["path"])
+            await send({"type": "http.response.start", "status": 204, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = RateLimitMiddleware(app, limiter, routes={"/heartbeat": "heartbeat"})
+        return TestClient(middleware)
+
+    def test_over_limit_rejected_before_body(self, client):
+        """Test an over-limit agent is refused from its token without reaching the endpoint"""
+        headers = {"Authorization": f"Bearer {create_device_token('guid-1', 'SITE')}"}
+
+        statuses = [client.post("/heartbeat", content=b"{}", headers=headers).status_code for _ in range(3)]
+
+        assert statuses == [204, 204, 429]
+        assert len(self.reached) == 2
+
+    def test_requests_without_token_pass_through(self, client, limiter):
+        """Test unauthenticated and unlisted requests are left to the endpoint"""
+        for _ in range(3):
+            assert client.post("/heartbeat", content=b"{}").status_code == 204
+            assert client.post("/other", headers={"Authorization": "Bearer junk"}).status_code == 204
+
+        assert limiter.rejected["heartbeat"] == 0
+
+    @pytest.mark.asyncio
+    async def test_endpoint_check_skipped_once_prechecked(self, limiter):
+        """Test the endpoint does not charge a request the middleware already charged"""
+        ratelimit._prechecked_var.set("heartbeat")
+        for _ in range(3):
+            await limiter.check("heartbeat", "guid-1")
+
+        assert limiter.rejected["heartbeat"] == 0
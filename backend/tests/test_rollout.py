@@ -0,0 +1,134 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, Mock
+from app.services.rollout import (
+    MemoryDownloadLeases, RolloutPolicy, parse_version, rollout_bucket
+)
+
+class TestParseVersion:
+
+    def test_ordering(self):
+        """Test semver ordering including prereleases and 4-part versions"""
+        ordered = ["1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-beta", "1.0.0-rc.1", "1.0.0", "1.0.1", "1.2.0", "1.10.0"]
+        versions = [parse_version(text) for text in ordered]
+
+        assert versions == sorted(versions)
+        assert parse_version("1.0.0") == parse_version("1.0.0.0")
+        assert parse_version("v2.0.0+build.5") == parse_version("2.0.0")
+
+    def test_invalid(self):
+        """Test unparseable versions return None"""
+        assert parse_version("latest") is None
+        assert parse_version("") is None
+
+    def test_cached(self):
+        """Test parsed versions are cached"""
+        assert parse_version("3.4.5") is parse_version("3.4.5")
+
+class TestRolloutPolicy:
+
+    def test_rings_progress_over_time(self):
+        """Test the fleet share follows the ring schedule"""
+        start = datetime(2026, 1, 1)
+        policy = RolloutPolicy([5, 25, 100], ring_hours=24, started_at=start, pilot_sites=[])
+
+        assert policy.current_percent(start - timedelta(hours=1)) == 0
+        assert policy.current_percent(start) == 5
+        assert policy.current_percent(start + timedelta(hours=30)) == 25
+        assert policy.current_percent(start + timedelta(days=10)) == 100
+
+    def test_eligibility_is_deterministic(self):
+        """Test eligibility follows the agent's stable bucket"""
+        start = datetime(2026, 1, 1)
+        policy = RolloutPolicy([50], ring_hours=24, started_at=start, pilot_sites=["PILOT"])
+        guids = [f"guid-{i}" for i in range(200)]
+
+        eligible = [g for g in guids if policy.is_eligible(g, "2.0.0", now=start)]
+
+        assert all(rollout_bucket(g, "2.0.0") < 50 for g in eligible)
+        assert 60 < len(eligible) < 140
+        assert policy.is_eligible(guids[0], "2.0.0", now=start) == policy.is_eligible(guids[0], "2.0.0", now=start)
+
+    def test_pilot_sites_first(self):
+        """Test pilot sites get the update as soon as the rollout starts"""
+        start = datetime(2026, 1, 1)
+        policy = RolloutPolicy([0, 100], ring_hours=24, started_at=start, pilot_sites=["PILOT"])
+
+        assert policy.is_eligible("guid-1", "2.0.0", "PILOT", now=start)
+        assert not policy.is_eligible("guid-1", "2.0.0", "OTHER", now=start)
+
+    def test_no_rollout_configured(self):
+        """Test everyone is eligible without a rollout start time"""
+        policy = RolloutPolicy([5], ring_hours=24, started_at=None, pilot_sites=[])
+
+        assert policy.is_eligible("guid-1", "2.0.0")
+
+class TestDownloadLeases:
+
+    @pytest.mark.asyncio
+    async def test_cap_and_expiry(self):
+        """Test the cap defers agents until a lease expires or is released"""
+        now = [0]
+        leases = MemoryDownloadLeases(max_concurrent=2, lease_seconds=100, clock=lambda: now[0])
+
+        assert await leases.acquire("a") == 0
+        assert await leases.acquire("b") == 0
+        now[0] = 10
+        assert await leases.acquire("a") == 0  # renewal while holding a lease
+        assert await leases.acquire("c") == 90
+        assert (leases.active, leases.deferred) == (2, 1)
+
+        await leases.release("a")
+        now[0] = 20
+        assert await leases.acquire("c") == 0
+        now[0] = 50
+        assert await leases.acquire("d") > 0
+        now[0] = 150
+        assert await leases.acquire("d") == 0
+
+    @pytest.mark.asyncio
+    async def test_store_error_fails_open(self, monkeypatch):
+        """Test a lease store outage grants the download"""
+        leases = MemoryDownloadLeases(max_concurrent=1, lease_seconds=100)
+        monkeypatch.setattr(leases, "_acquire", AsyncMock(side_effect=ConnectionError("down")))
+
+        assert await leases.acquire("a") == 0
+
+    @pytest.mark.asyncio
+    async def test_capped_check_offers_no_update(self, monkeypatch):
+        """Test an agent over the cap is told no update is available yet, with a retry time"""
+        from app.schemas.agent import UpdateCheckRequest
+        from app.services import agent_service
+        leases = MemoryDownloadLeases(max_concurrent=1, lease_seconds=100)
+        monkeypatch.setattr(agent_service, "download_leases", leases)
+        monkeypatch.setattr(agent_service.settings, "LATEST_VERSION", "2.0.0")
+        monkeypatch.setattr(agent_service.rollout_policy, "started_at", None)
+        await leases.acquire("other-guid")
+
+        result = await agent_service.AgentService(AsyncMock()).check_for_updates(
+            UpdateCheckRequest(agent_guid="guid-1", current_version="1.0.0")
+        )
+
+        assert result.update_available is False
+        assert 90 <= result.retry_after_seconds <= 100
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("site_code,available", [("PILOT", True), ("HQ", False)])
+    async def test_pilot_site_from_agent_record(self, monkeypatch, site_code, available):
+        """Test without token claims the pilot site is looked up from the agent's record"""
+        from app.schemas.agent import UpdateCheckRequest
+        from app.services import agent_service
+        policy = RolloutPolicy([0], ring_hours=24, started_at=datetime.utcnow() - timedelta(hours=1),
+                               pilot_sites=["PILOT"])
+        monkeypatch.setattr(agent_service, "rollout_policy", policy)
+        monkeypatch.setattr(agent_service, "download_leases", MemoryDownloadLeases(0, 100))
+        monkeypatch.setattr(agent_service.settings, "LATEST_VERSION", "2.0.0")
+        db = AsyncMock()
+        db.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=site_code))
+
+        result = await agent_service.AgentService(db).check_for_updates(
+            UpdateCheckRequest(agent_guid="guid-1", current_version="1.0.0")
+        )
+
+        assert result.update_available is available
+        db.execute.assert_awaited_once()
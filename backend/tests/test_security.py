@@ -0,0 +1,86 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app.core import security
+from fastapi import HTTPException
+from jose import jwt
+from app.core.config import settings
+from app.core.security import (
+    create_device_token, verify_device_token, read_token_claims,
+    ensure_agent, token_needs_renewal
+)
+
+class TestDeviceTokens:
+
+    def test_roundtrip(self):
+        """Test a freshly issued token verifies with its claims"""
+        token = create_device_token("test-guid-123", "TEST")
+
+        claims = verify_device_token(token)
+
+        assert claims.agent_guid == "test-guid-123"
+        assert claims.site_code == "TEST"
+        assert claims.expires_at > datetime.utcnow()
+        assert len(token) <= 512
+
+    def test_tampered_token_rejected(self):
+        """Test a token signed with another key is rejected"""
+        token = jwt.encode({"sub": "test-guid-123", "jti": "x"}, "other-key", algorithm=settings.ALGORITHM)
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_device_token(token)
+
+        assert exc_info.value.status_code == 401
+
+    def test_expired_token_rejected(self):
+        """Test an expired token is rejected"""
+        with patch('app.core.security.settings') as mock_settings:
+            mock_settings.SECRET_KEY = settings.SECRET_KEY
+            mock_settings.ALGORITHM = settings.ALGORITHM
+            mock_settings.DEVICE_TOKEN_EXPIRE_DAYS = -1
+            token = create_device_token("test-guid-123", "TEST")
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_device_token(token)
+
+        assert exc_info.value.status_code == 401
+
+    def test_revoked_token_rejected(self, revocation_list):
+        """Test a revoked token is rejected without a database lookup"""
+        token = create_device_token("test-guid-123", "TEST")
+        claims = read_token_claims(token)
+
+        revocation_list.add(claims["jti"], datetime.utcnow() + timedelta(days=1))
+
+        with pytest.raises(HTTPException) as exc_info:
+            verify_device_token(token)
+
+        assert exc_info.value.detail == "Device token revoked"
+
+    def test_legacy_token_has_no_claims(self):
+        """Test opaque tokens from older registrations are ignored"""
+        assert read_token_claims("not-a-jwt") is None
+
+    def test_ensure_agent(self):
+        """Test tokens cannot act on behalf of another agent"""
+        claims = verify_device_token(create_device_token("test-guid-123", "TEST"))
+
+        ensure_agent(claims, "test-guid-123")
+        ensure_agent(None, "any-guid")
+        with pytest.raises(HTTPException) as exc_info:
+            ensure_agent(claims, "other-guid")
+
+        assert exc_info.value.status_code == 403
+
+    def test_renewal_due(self, monkeypatch):
+        """Test legacy tokens of record and nearly expired tokens are renewed"""
+        fresh = create_device_token("test-guid-123", "TEST")
+
+        assert token_needs_renewal("legacy", "test-guid-123", "legacy")
+        assert not token_needs_renewal("legacy", "test-guid-123", fresh)
+        assert not token_needs_renewal(fresh, "test-guid-123", fresh)
+        assert not token_needs_renewal(None, "test-guid-123", fresh)
+
+        monkeypatch.setattr(security.settings, "DEVICE_TOKEN_RENEW_DAYS", settings.DEVICE_TOKEN_EXPIRE_DAYS)
+        assert token_needs_renewal(fresh, "test-guid-123", fresh)
+        assert not token_needs_renewal(fresh, "other-guid", fresh)
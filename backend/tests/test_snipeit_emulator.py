@@ -0,0 +1,103 @@
+import random
+import time
+import httpx
+import pytest
+from app.services.snipeit_service import SnipeItService
+from benchmarks.inventory import make_inventory
+from benchmarks.snipeit_emulator import EmulatorConfig, LatencyProfile, SnipeItEmulator
+
+def service_for(emulator, api_token="test-token"):
+    return SnipeItService(
+        base_url="http://snipeit",
+        api_token=api_token,
+        transport=httpx.ASGITransport(app=emulator.app)
+    )
+
+@pytest.fixture
+def inventory():
+    return make_inventory(random.Random(1), 0, 10, "SITE001")
+
+class TestSnipeItEmulator:
+
+    @pytest.mark.asyncio
+    async def test_sync_creates_then_updates(self, inventory):
+        """Test the first sync creates the asset and the next one patches it"""
+        emulator = SnipeItEmulator()
+        service = service_for(emulator)
+
+        assert await service.sync_inventory_to_snipeit("agent-1", inventory) is True
+        assert await service.sync_inventory_to_snipeit("agent-1", inventory) is True
+
+        assert len(emulator.hardware) == 1
+        assert emulator.requests["POST /api/v1/hardware"] == 1
+        assert emulator.requests["PATCH /api/v1/hardware/{id}"] == 1
+        assert emulator.hardware[1]["serial"] == inventory["device_identity"]["serial_number"]
+
+    @pytest.mark.asyncio
+    async def test_lookups_are_paginated(self):
+        """Test list endpoints return Snipe-IT's default page of rows"""
+        service = service_for(SnipeItEmulator())
+
+        assert len(await service.get_models()) == 50
+        assert len(await service.get_categories()) == 15
+        assert len(await service.get_status_labels()) == 3
+
+    @pytest.mark.asyncio
+    async def test_limit_and_offset(self):
+        """Test explicit paging is honoured and the limit capped"""
+        transport = httpx.ASGITransport(app=SnipeItEmulator().app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://snipeit") as client:
+            response = await client.get("/api/v1/models", params={"limit": 1000, "offset": 100},
+                                        headers={"Authorization": "Bearer t"})
+
+        page = response.json()
+        assert page["total"] == 120
+        assert [row["id"] for row in page["rows"]] == list(range(101, 121))
+
+    @pytest.mark.asyncio
+    async def test_rejects_wrong_token(self):
+        """Test a wrong API token gets 401"""
+        emulator = SnipeItEmulator(EmulatorConfig(api_token="right"))
+
+        assert await service_for(emulator, api_token="wrong").get_models() == []
+        assert len(await service_for(emulator, api_token="right").get_models()) == 50
+
+    @pytest.mark.asyncio
+    async def test_rate_limit(self):
+        """Test requests over the per-minute limit get 429 with Retry-After"""
+        emulator = SnipeItEmulator(EmulatorConfig(rate_limit_per_minute=2))
+        transport = httpx.ASGITransport(app=emulator.app)
+        headers = {"Authorization": "Bearer t"}
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://snipeit") as client:
+            statuses = [(await client.get("/api/v1/models", headers=headers)) for _ in range(3)]
+
+        assert [r.status_code for r in statuses] == [200, 200, 429]
+        assert int(statuses[2].headers["retry-after"]) >= 1
+        assert statuses[2].headers["x-ratelimit-remaining"] == "0"
+
+    @pytest.mark.asyncio
+    async def test_injected_errors(self):
+        """Test error_rate=1 answers every request with a 5xx"""
+        emulator = SnipeItEmulator(EmulatorConfig(error_rate=1.0))
+
+        assert await service_for(emulator).search_hardware(serial="X") is None
+        assert emulator.hardware == {}
+
+    @pytest.mark.asyncio
+    async def test_latency(self):
+        """Test the latency profile delays responses"""
+        emulator = SnipeItEmulator(EmulatorConfig(latency=LatencyProfile.parse("fixed:0.05")))
+
+        started = time.perf_counter()
+        await service_for(emulator).get_status_labels()
+
+        assert time.perf_counter() - started >= 0.05
+
+    def test_parse_latency_profile(self):
+        """Test latency profile strings"""
+        rng = random.Random(0)
+
+        assert LatencyProfile.parse("fixed:0.2").sample(rng) == 0.2
+        assert 0.01 <= LatencyProfile.parse("uniform:0.01:0.02").sample(rng) <= 0.02
+        assert LatencyProfile.parse("lognormal:0.08:0.5").sample(rng) > 0
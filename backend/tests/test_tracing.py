@@ -0,0 +1,145 @@
+import json
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from app.core import tracing
+from app.core.tracing import (
+    NOOP_SPAN, NdjsonFileExporter, OtlpHttpExporter, SpanExporter, Tracer, TracingMiddleware,
+    inject_traceparent, parse_traceparent, trace_engine, traced
+)
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+@pytest.fixture
+def exporter(monkeypatch):
+    exporter = ListExporter()
+    test_tracer = Tracer(exporter, sample_rate=1.0)
+    monkeypatch.setattr(tracing, "tracer", test_tracer)
+    yield exporter
+    test_tracer.shutdown()
+
+def finished(exporter):
+    tracing.tracer.shutdown()
+    return {span.name: span for span in exporter.spans}
+
+class TestTracer:
+
+    def test_parse_traceparent(self):
+        """Test W3C traceparent parsing"""
+        header = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        assert parse_traceparent(header) == ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", True)
+        assert parse_traceparent("garbage") is None
+
+    def test_unsampled_traces_are_noops(self):
+        """Test sample rate 0 creates no spans"""
+        tracer = Tracer(ListExporter(), sample_rate=0.0)
+        assert tracer.start_span("root") is NOOP_SPAN
+        assert tracer.span("child") is NOOP_SPAN
+
+    def test_disabled_tracer(self):
+        """Test a tracer without an exporter never samples"""
+        tracer = Tracer(None, sample_rate=1.0)
+        assert tracer.start_span("root") is NOOP_SPAN
+
+    @pytest.mark.asyncio
+    async def test_traced_nests_spans(self, exporter):
+        """Test decorated coroutines become children of the current span"""
+        @traced("inner")
+        async def inner():
+            return 42
+
+        with tracing.tracer.start_span("root") as root:
+            assert await inner() == 42
+
+        spans = finished(exporter)
+        assert spans["inner"].parent_id == root.span_id
+        assert spans["inner"].trace_id == root.trace_id
+
+    def test_errors_are_recorded(self, exporter):
+        """Test exceptions mark the span as failed"""
+        with pytest.raises(ValueError):
+            with tracing.tracer.start_span("root"):
+                raise ValueError("boom")
+
+        assert finished(exporter)["root"].status == "error"
+
+    def test_db_spans(self, exporter):
+        """Test statements inside a trace get db.query spans"""
+        engine = create_engine("sqlite://")
+        trace_engine(engine)
+
+        with tracing.tracer.start_span("root"):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 2"))
+
+        finished(exporter)
+        queries = [span for span in exporter.spans if span.name == "db.query"]
+        assert len(queries) == 1
+        assert queries[0].attributes["statement"] == "SELECT 1"
+
+    def test_inject_traceparent(self, exporter):
+        """Test outgoing requests carry the current trace"""
+        request = httpx.Request("GET", "https://snipeit.example/api/v1/hardware")
+        with tracing.tracer.start_span("root") as root:
+            inject_traceparent(request)
+
+        assert request.headers["traceparent"] == f"00-{root.trace_id}-{root.span_id}-01"
+
+class TestTracingMiddleware:
+
+    def test_continues_incoming_trace(self, exporter):
+        """Test the root span joins an incoming trace and uses the route template"""
+        app = FastAPI()
+
+        @app.get("/agents/{agent_guid}")
+        async def agent(agent_guid: str):
+            return {}
+
+        app.add_middleware(TracingMiddleware)
+        trace_id = "0af7651916cd43dd8448eb211c80319c"
+        TestClient(app).get("/agents/g1", headers={"traceparent": f"00-{trace_id}-b7ad6b7169203331-01"})
+
+        span = finished(exporter)["GET /agents/{agent_guid}"]
+        assert span.trace_id == trace_id
+        assert span.parent_id == "b7ad6b7169203331"
+        assert span.attributes["status_code"] == 200
+
+class TestExporters:
+
+    def test_exporter_interface_is_abstract(self):
+        """Test exporters must implement export"""
+        with pytest.raises(TypeError):
+            SpanExporter()
+
+    def test_ndjson_file_exporter(self, tmp_path):
+        """Test spans are written one JSON object per line"""
+        path = tmp_path / "traces.ndjson"
+        tracer = Tracer(NdjsonFileExporter(str(path)), sample_rate=1.0)
+        tracer.finish(tracer.start_span("a"))
+        tracer.finish(tracer.start_span("b"))
+        tracer.shutdown()
+
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line["name"] for line in lines] == ["a", "b"]
+
+    def test_otlp_encoding(self):
+        """Test OTLP/HTTP JSON span encoding"""
+        exporter = OtlpHttpExporter("http://collector:4318/v1/traces")
+        span = Tracer(exporter, sample_rate=1.0).start_span("root", agent_guid="g1", items=3)
+        span.end = span.start + 0.5
+
+        encoded = exporter._encode(span)
+        exporter.shutdown()
+
+        assert encoded["traceId"] == span.trace_id
+        assert "parentSpanId" not in encoded
+        assert {"key": "items", "value": {"intValue": "3"}} in encoded["attributes"]
@@ -0,0 +1,91 @@
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.files import RangeFileResponse, parse_range
+from app.services.update_store import UpdateArtifactStore, file_sha256
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(bytes(range(256)) * (size // 256) + bytes(size % 256))
+
+@pytest.fixture
+def store(tmp_path):
+    write(str(tmp_path / "full" / "1.0.0.msi"), 10_000)
+    write(str(tmp_path / "full" / "1.1.0.msi"), 10_000)
+    write(str(tmp_path / "full" / "1.2.0.msi"), 10_000)
+    write(str(tmp_path / "patches" / "1.0.0__1.1.0.bsdiff"), 1_000)
+    write(str(tmp_path / "patches" / "1.1.0__1.2.0.bsdiff"), 1_500)
+    store = UpdateArtifactStore(str(tmp_path))
+    store.refresh()
+    return store
+
+class TestUpdateArtifactStore:
+
+    def test_scan_and_hash(self, store, tmp_path):
+        """Test artifacts are indexed with their content hash"""
+        artifact = store.get("full/1.2.0.msi")
+
+        assert artifact.kind == "full"
+        assert artifact.to_version == "1.2.0"
+        assert artifact.sha256 == file_sha256(str(tmp_path / "full" / "1.2.0.msi"))
+        assert store.get("patches/1.0.0__1.1.0.bsdiff").from_version == "1.0.0"
+
+    def test_best_route_prefers_patch_chain(self, store):
+        """Test consecutive patches are chained when smaller than the full package"""
+        route = store.best_route("1.0.0", "1.2.0")
+
+        assert [a.name for a in route] == ["patches/1.0.0__1.1.0.bsdiff", "patches/1.1.0__1.2.0.bsdiff"]
+
+    def test_best_route_falls_back_to_full(self, store):
+        """Test the full package is offered when no patch chain exists"""
+        route = store.best_route("0.9.0", "1.2.0")
+
+        assert [a.name for a in route] == ["full/1.2.0.msi"]
+        assert store.best_route("0.9.0", "9.9.9") == []
+
+    def test_unchanged_files_not_rehashed(self, store, monkeypatch):
+        """Test rescans reuse cached hashes for unchanged files"""
+        monkeypatch.setattr("app.services.update_store.file_sha256", lambda path: pytest.fail("rehashed"))
+
+        store.refresh()
+
+        assert len(store._artifacts) == 5
+
+class TestRangeFileResponse:
+
+    def test_parse_range(self):
+        """Test single byte range parsing"""
+        assert parse_range(None, 100) is None
+        assert parse_range("bytes=0-9", 100) == (0, 9)
+        assert parse_range("bytes=90-", 100) == (90, 99)
+        assert parse_range("bytes=-10", 100) == (90, 99)
+        assert parse_range("bytes=0-1,5-6", 100) is None
+        with pytest.raises(ValueError):
+            parse_range("bytes=100-", 100)
+
+    def test_partial_and_resume(self, store):
+        """Test Range, If-Range and unsatisfiable requests"""
+        artifact = store.get("full/1.1.0.msi")
+        etag = f'"{artifact.sha256}"'
+        app = FastAPI()
+
+        @app.get("/file")
+        async def file(range: str = None, if_range: str = None):
+            return RangeFileResponse(artifact.path, artifact.size, etag, range, if_range)
+
+        with open(artifact.path, "rb") as f:
+            content = f.read()
+
+        client = TestClient(app)
+        partial = client.get("/file", params={"range": "bytes=100-199"})
+        assert partial.status_code == 206
+        assert partial.content == content[100:200]
+        assert partial.headers["content-range"] == f"bytes 100-199/{artifact.size}"
+
+        stale = client.get("/file", params={"range": "bytes=100-199", "if_range": '"other"'})
+        assert stale.status_code == 200
+        assert stale.content == content
+
+        assert client.get("/file", params={"range": "bytes=99999-"}).status_code == 416
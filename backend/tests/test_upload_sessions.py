@@ -0,0 +1,164 @@
+import hashlib
+import json
+import random
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock
+from app.api.v1.endpoints import uploads
+from app.core.database import get_db
+from app.core.jsonstream import ObjectMemberParser
+from app.core.ratelimit import rate_limiter
+from app.core.security import get_device_claims
+from app.schemas.agent import InventorySyncResponse
+from app.services.agent_service import AgentService
+from app.services.upload_sessions import upload_sessions
+from benchmarks.inventory import make_inventory
+
+def parse_in_blocks(data: bytes, size: int):
+    parser = ObjectMemberParser()
+    members = {}
+    for start in range(0, len(data), size):
+        members.update(parser.feed(data[start:start + size]))
+    parser.close()
+    return members
+
+@pytest.fixture
+def body():
+    return json.dumps(make_inventory(random.Random(1), 0, 200, "HQ"), indent=1).encode()
+
+@pytest.fixture
+def sync_inventory(monkeypatch):
+    mock = AsyncMock(return_value=InventorySyncResponse(status="success", message="Inventory synced successfully"))
+    monkeypatch.setattr(AgentService, "sync_inventory", mock)
+    return mock
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, sync_inventory):
+    monkeypatch.setattr(upload_sessions, "root", str(tmp_path))
+    monkeypatch.setattr(rate_limiter, "enabled", False)
+    app = FastAPI()
+    app.include_router(uploads.router, prefix="/api/v1/inventory/uploads")
+    app.dependency_overrides[get_db] = lambda: AsyncMock()
+    app.dependency_overrides[get_device_claims] = lambda: None
+    return TestClient(app)
+
+def create(client, body, **extra):
+    response = client.post("/api/v1/inventory/uploads", json={
+        "agent_guid": "test-guid-123", "sync_type": "full", "total_size": len(body), **extra
+    })
+    assert response.status_code == 201
+    return response.json()["session_id"]
+
+class TestObjectMemberParser:
+
+    @pytest.mark.parametrize("size", [1, 7, 4096])
+    def test_any_block_size(self, body, size):
+        """Test members are decoded correctly however the bytes are split"""
+        assert parse_in_blocks(body, size) == json.loads(body)
+
+    def test_escapes_and_nesting(self):
+        """Test brackets and quotes inside strings do not end a member"""
+        data = json.dumps({"a": 'x\\"}],{', "b": [1, {"c": []}], "d": None, "e": {}}).encode()
+
+        assert parse_in_blocks(data, 1) == json.loads(data)
+
+    def test_only_current_member_is_buffered(self, body):
+        """Test consumed members are dropped from the buffer"""
+        parser = ObjectMemberParser()
+        members = parser.feed(body[:len(body) // 2])
+
+        assert members
+        assert len(parser._buffer) < len(body) // 2
+
+    @pytest.mark.parametrize("data", [b"[1]", b'{"a":1,}', b'{"a":1]', b'{"a":1} x', b'{"a":'])
+    def test_rejects_malformed(self, data):
+        """Test non-objects, trailing data and truncated bodies raise ValueError"""
+        with pytest.raises(ValueError):
+            parse_in_blocks(data, 3)
+
+class TestUploadSessions:
+
+    def test_chunked_upload_and_commit(self, client, body, sync_inventory):
+        """Test chunks are spooled to disk and the commit feeds the normal sync"""
+        session_id = create(client, body, sha256=hashlib.sha256(body).hexdigest())
+        chunk = 4096
+        for offset in range(0, len(body), chunk):
+            response = client.put(f"/api/v1/inventory/uploads/{session_id}", params={"offset": offset},
+                                  content=body[offset:offset + chunk])
+            assert response.json()["offset"] == min(offset + chunk, len(body))
+
+        response = client.post(f"/api/v1/inventory/uploads/{session_id}/commit")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "success"
+        request, key = sync_inventory.await_args.args
+        assert request.inventory.as_dict() == json.loads(body)
+        assert key == f"upload:{session_id}"
+
+    def test_resume_after_interrupted_chunk(self, client, body):
+        """Test a re-sent chunk may overlap what was received, but not skip ahead"""
+        session_id = create(client, body)
+        url = f"/api/v1/inventory/uploads/{session_id}"
+        client.put(url, params={"offset": 0}, content=body[:1000])
+
+        assert client.put(url, params={"offset": 2000}, content=body[2000:3000]).status_code == 409
+        assert client.get(url).json()["offset"] == 1000
+
+        client.put(url, params={"offset": 500}, content=body[500:])
+        assert client.get(url).json()["offset"] == len(body)
+
+    def test_commit_requires_complete_upload(self, client, body, sync_inventory):
+        """Test committing a partial upload is refused"""
+        session_id = create(client, body)
+        client.put(f"/api/v1/inventory/uploads/{session_id}", params={"offset": 0}, content=body[:10])
+
+        assert client.post(f"/api/v1/inventory/uploads/{session_id}/commit").status_code == 409
+        sync_inventory.assert_not_awaited()
+
+    def test_oversized_chunk(self, client, body):
+        """Test bytes beyond the declared size are rejected"""
+        session_id = create(client, body)
+
+        response = client.put(f"/api/v1/inventory/uploads/{session_id}", params={"offset": 0}, content=body + b" ")
+
+        assert response.status_code == 413
+
+    def test_checksum_mismatch_discards_session(self, client, body, sync_inventory):
+        """Test a body not matching its sha256 is not ingested"""
+        session_id = create(client, body, sha256="0" * 64)
+        client.put(f"/api/v1/inventory/uploads/{session_id}", params={"offset": 0}, content=body)
+
+        assert client.post(f"/api/v1/inventory/uploads/{session_id}/commit").status_code == 400
+        assert client.get(f"/api/v1/inventory/uploads/{session_id}").status_code == 404
+        sync_inventory.assert_not_awaited()
+
+    def test_retried_commit_returns_first_response(self, client, body, sync_inventory):
+        """Test a commit retried after a lost response is not ingested twice"""
+        session_id = create(client, body)
+        client.put(f"/api/v1/inventory/uploads/{session_id}", params={"offset": 0}, content=body)
+
+        first = client.post(f"/api/v1/inventory/uploads/{session_id}/commit")
+        retry = client.post(f"/api/v1/inventory/uploads/{session_id}/commit")
+
+        assert retry.json() == first.json()
+        sync_inventory.assert_awaited_once()
+
+    def test_sessions_expire(self, client, body, monkeypatch, tmp_path):
+        """Test expired sessions are not found and are purged from disk"""
+        session_id = create(client, body)
+        monkeypatch.setattr(uploads.settings, "UPLOAD_SESSION_TTL_SECONDS", -1)
+
+        assert client.get(f"/api/v1/inventory/uploads/{session_id}").status_code == 404
+        assert upload_sessions.purge_expired() == 1
+        assert list(tmp_path.iterdir()) == []
+
+    def test_size_limit(self, client, monkeypatch):
+        """Test sessions larger than UPLOAD_MAX_BYTES are refused up front"""
+        monkeypatch.setattr(uploads.settings, "UPLOAD_MAX_BYTES", 100)
+
+        response = client.post("/api/v1/inventory/uploads", json={
+            "agent_guid": "test-guid-123", "sync_type": "full", "total_size": 101
+        })
+
+        assert response.status_code == 413
@@ -0,0 +1,88 @@
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from app.core import codec
+
+class Item(BaseModel):
+    name: str
+    size: int
+
+@pytest.fixture
+def client():
+    router = APIRouter(route_class=codec.CodecRoute)
+
+    @router.post("/items")
+    async def create_item(item: Item):
+        return {"name": item.name, "size": item.size * 2}
+
+    app = FastAPI(default_response_class=codec.NegotiatedResponse)
+    app.include_router(router)
+    return TestClient(app)
+
+class TestNegotiation:
+
+    def test_json_by_default(self):
+        """Test JSON is used without a preference, for */* and on ties"""
+        assert codec.request_format(None) is codec.JSON_FORMAT
+        assert codec.request_format("application/json; charset=utf-8") is codec.JSON_FORMAT
+        assert codec.response_format("") is codec.JSON_FORMAT
+        assert codec.response_format("*/*") is codec.JSON_FORMAT
+
+    def test_unavailable_binary_format(self, client):
+        """Test a binary body is refused with 415 when its library is missing"""
+        if "cbor" in codec.BINARY_FORMATS:
+            pytest.skip("cbor2 is installed")
+
+        with pytest.raises(HTTPException) as error:
+            codec.request_format("application/cbor")
+        assert error.value.status_code == 415
+        assert codec.response_format("application/cbor") is codec.JSON_FORMAT
+
+        response = client.post("/items", content=b"\xa0", headers={"Content-Type": "application/cbor"})
+        assert response.status_code == 415
+
+    def test_json_round_trip(self, client):
+        """Test JSON clients are unaffected"""
+        response = client.post("/items", json={"name": "disk", "size": 2})
+
+        assert response.json() == {"name": "disk", "size": 4}
+        assert response.headers["content-type"] == "application/json"
+
+class TestMessagePack:
+
+    @pytest.fixture(autouse=True)
+    def msgpack(self):
+        msgpack = pytest.importorskip("msgpack")
+        if "msgpack" not in codec.BINARY_FORMATS:
+            pytest.skip("binary wire formats disabled")
+        return msgpack
+
+    def test_preference_order(self):
+        """Test q-values decide between JSON and MessagePack"""
+        assert codec.response_format("application/msgpack").name == "msgpack"
+        assert codec.response_format("application/json;q=0.5, application/x-msgpack").name == "msgpack"
+        assert codec.response_format("application/msgpack;q=0.5, application/json") is codec.JSON_FORMAT
+
+    def test_msgpack_request_and_response(self, client, msgpack):
+        """Test a MessagePack body is validated like JSON and answered in kind"""
+        response = client.post(
+            "/items",
+            content=msgpack.packb({"name": "disk", "size": 2}),
+            headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+        )
+
+        assert response.headers["content-type"] == "application/msgpack"
+        assert response.headers["vary"] == "Accept"
+        assert msgpack.unpackb(response.content) == {"name": "disk", "size": 4}
+
+    def test_msgpack_validation_errors(self, client, msgpack):
+        """Test schema errors in a MessagePack body are reported as 422"""
+        response = client.post(
+            "/items",
+            content=msgpack.packb({"name": "disk"}),
+            headers={"Content-Type": "application/msgpack"}
+        )
+
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", "size"]